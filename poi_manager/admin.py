@@ -4,7 +4,7 @@ from django.urls import reverse
 from django.utils.safestring import mark_safe
 import json
 
-from poi_manager.models import PointOfInterest, ImportBatch
+from poi_manager.models import PointOfInterest, ImportBatch, ImportRecordError
 
 
 class PointOfInterestAdmin(admin.ModelAdmin):
@@ -93,12 +93,10 @@ class PointOfInterestAdmin(admin.ModelAdmin):
     def recalculate_ratings(self, request, queryset):
         """Recalculate average ratings for selected POIs."""
         updated = 0
-        for poi in queryset:
-            if poi.ratings:
-                poi.avg_rating = sum(poi.ratings) / len(poi.ratings)
-                poi.rating_count = len(poi.ratings)
-                poi.save()
-                updated += 1
+        for poi in queryset.only("id", "ratings"):
+            # Derives the aggregates from the imported ratings and the rating events
+            PointOfInterest.objects.set_ratings(poi.pk, poi.ratings)
+            updated += 1
 
         self.message_user(
             request, f"Successfully recalculated ratings for {updated} POIs."
@@ -173,6 +171,7 @@ class ImportBatchAdmin(admin.ModelAdmin):
         "completed_at",
         "processing_time",
         "job_id",
+        "checkpoint",
         "error_log_display",
         "statistics_display",
     ]
@@ -180,7 +179,7 @@ class ImportBatchAdmin(admin.ModelAdmin):
     fieldsets = (
         (
             "File Information",
-            {"fields": ("file_path", "file_name", "file_type", "file_size")},
+            {"fields": ("file_path", "file_name", "file_type", "file_size", "uncompressed_size")},
         ),
         (
             "Processing Status",
@@ -191,6 +190,7 @@ class ImportBatchAdmin(admin.ModelAdmin):
                     "completed_at",
                     "processing_time",
                     "job_id",
+                    "checkpoint",
                 )
             },
         ),
@@ -272,13 +272,20 @@ class ImportBatchAdmin(admin.ModelAdmin):
     processing_time_display.short_description = "Duration"
 
     def error_log_display(self, obj):
-        """Display error log in formatted JSON."""
-        if obj.error_log:
-            formatted = json.dumps(obj.error_log, indent=2)
-            return format_html(
-                '<pre style="max-height: 300px; overflow-y: auto;">{}</pre>', formatted
-            )
-        return "No errors"
+        """Display the sampled errors with a link to all recorded errors."""
+        total = obj.error_count()
+        if not total:
+            return "No errors"
+
+        url = reverse("admin:poi_manager_importrecorderror_changelist") + f"?import_batch__id__exact={obj.pk}"
+        formatted = json.dumps(obj.error_log.get("errors", []), indent=2)
+        return format_html(
+            '<p><a href="{}">View all {} errors</a></p>'
+            '<pre style="max-height: 300px; overflow-y: auto;">{}</pre>',
+            url,
+            total,
+            formatted,
+        )
 
     error_log_display.short_description = "Error Log"
 
@@ -290,11 +297,19 @@ class ImportBatchAdmin(admin.ModelAdmin):
             size_mb = obj.file_size / (1024 * 1024)
             stats.append(f"File Size: {size_mb:.2f} MB")
 
+        if obj.uncompressed_size and obj.uncompressed_size != obj.file_size:
+            size_mb = obj.uncompressed_size / (1024 * 1024)
+            stats.append(f"Uncompressed Size: {size_mb:.2f} MB")
+
         if obj.processing_time and obj.records_processed > 0:
             seconds = obj.processing_time.total_seconds()
             rate = obj.records_processed / seconds if seconds > 0 else 0
             stats.append(f"Processing Rate: {rate:.0f} records/sec")
 
+            size = obj.uncompressed_size or obj.file_size
+            if size and seconds > 0:
+                stats.append(f"Throughput: {size / (1024 * 1024) / seconds:.2f} MB/sec")
+
         success_rate = 0
         if obj.records_processed + obj.records_failed > 0:
             success_rate = (
@@ -324,22 +339,30 @@ class ImportBatchAdmin(admin.ModelAdmin):
     actions = ["retry_failed_imports", "delete_with_pois"]
 
     def retry_failed_imports(self, request, queryset):
-        """Retry failed import batches."""
+        """
+        Retry failed imports and imports stuck in processing after their worker
+        died or timed out. Imports resume from their last checkpoint.
+        """
         import django_rq
-        from poi_manager.jobs import import_poi_file_async
+        from poi_manager.jobs import import_poi_file_async, job_is_alive
 
         queue = django_rq.get_queue("default")
         retried = 0
 
-        for batch in queryset.filter(status="failed"):
-            queue.enqueue(import_poi_file_async, batch.id, batch.file_path, {})
+        for batch in queryset.filter(status__in=["failed", "processing"]):
+            if batch.status == "processing" and job_is_alive(batch.job_id, queue.connection):
+                continue
+
+            options = (batch.checkpoint or {}).get("options", {})
+            job = queue.enqueue(import_poi_file_async, batch.id, batch.file_path, options)
+            batch.job_id = job.id
             batch.status = "pending"
             batch.save()
             retried += 1
 
-        self.message_user(request, f"Retrying {retried} failed import(s).")
+        self.message_user(request, f"Retrying {retried} failed or stalled import(s).")
 
-    retry_failed_imports.short_description = "Retry failed imports"
+    retry_failed_imports.short_description = "Retry failed or stalled imports"
 
     def delete_with_pois(self, request, queryset):
         """Delete import batches and associated POIs."""
@@ -355,5 +378,36 @@ class ImportBatchAdmin(admin.ModelAdmin):
     delete_with_pois.short_description = "Delete batches with POIs"
 
 
+class ImportRecordErrorAdmin(admin.ModelAdmin):
+    list_display = ["id", "import_batch", "created", "message"]
+
+    list_filter = ["import_batch"]
+
+    search_fields = ["message"]
+
+    list_select_related = ["import_batch"]
+
+    list_per_page = 100
+
+    # Counting every error of a large import on each page is slow
+    show_full_result_count = False
+
+    readonly_fields = ["import_batch", "created", "message", "record_display"]
+
+    fields = ["import_batch", "created", "message", "record_display"]
+
+    def record_display(self, obj):
+        """Display the failing record in formatted JSON."""
+        if obj.record:
+            return format_html("<pre>{}</pre>", json.dumps(obj.record, indent=2))
+        return "-"
+
+    record_display.short_description = "Record"
+
+    def has_add_permission(self, request):
+        return False
+
+
 admin.site.register(PointOfInterest, PointOfInterestAdmin)
 admin.site.register(ImportBatch, ImportBatchAdmin)
+admin.site.register(ImportRecordError, ImportRecordErrorAdmin)
@@ -1,9 +1,14 @@
 from rest_framework import serializers
-from poi_manager.models import PointOfInterest, ImportBatch
+from poi_manager.models import PointOfInterest, ImportBatch, ImportRecordError
 
 __all__ = (
     "PointOfInterestSerializer",
+    "NearbyPointOfInterestSerializer",
+    "RatingsSerializer",
+    "RatingEventSerializer",
+    "BulkRatingsSerializer",
     "ImportBatchSerializer",
+    "ImportRecordErrorSerializer",
 )
 
 
@@ -23,13 +28,44 @@ class PointOfInterestSerializer(serializers.ModelSerializer):
             "ratings",
             "avg_rating",
             "rating_count",
+            "rating_histogram",
             "description",
             "source_file",
             "import_batch",
             "created",
             "last_updated",
         ]
-        read_only_fields = ["avg_rating", "rating_count", "created", "last_updated"]
+        read_only_fields = ["avg_rating", "rating_count", "rating_histogram", "created", "last_updated"]
+
+
+class NearbyPointOfInterestSerializer(PointOfInterestSerializer):
+    distance = serializers.FloatField(read_only=True, help_text="Distance in metres")
+
+    class Meta(PointOfInterestSerializer.Meta):
+        fields = PointOfInterestSerializer.Meta.fields + ["distance"]
+
+
+class RatingsSerializer(serializers.Serializer):
+    ratings = serializers.ListField(
+        child=serializers.FloatField(min_value=0, max_value=5), allow_empty=False, max_length=10000
+    )
+
+
+class RatingEventSerializer(serializers.Serializer):
+    poi = serializers.IntegerField()
+    rating = serializers.FloatField(min_value=0, max_value=5)
+
+
+class BulkRatingsSerializer(serializers.Serializer):
+    events = RatingEventSerializer(many=True, allow_empty=False, max_length=100000)
+
+    def validate_events(self, events):
+        poi_ids = {event["poi"] for event in events}
+        known = set(PointOfInterest.objects.filter(id__in=poi_ids).values_list("id", flat=True))
+        unknown = sorted(poi_ids - known)
+        if unknown:
+            raise serializers.ValidationError(f"Unknown POI ids: {', '.join(map(str, unknown[:20]))}")
+        return events
 
 
 class ImportBatchSerializer(serializers.ModelSerializer):
@@ -38,6 +74,7 @@ class ImportBatchSerializer(serializers.ModelSerializer):
         source="get_file_type_display", read_only=True
     )
     poi_count = serializers.IntegerField(source="pois.count", read_only=True)
+    error_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = ImportBatch
@@ -48,6 +85,7 @@ class ImportBatchSerializer(serializers.ModelSerializer):
             "file_type",
             "file_type_display",
             "file_size",
+            "uncompressed_size",
             "status",
             "status_display",
             "started_at",
@@ -57,6 +95,7 @@ class ImportBatchSerializer(serializers.ModelSerializer):
             "records_failed",
             "records_skipped",
             "error_log",
+            "error_count",
             "poi_count",
         ]
         read_only_fields = [
@@ -65,6 +104,7 @@ class ImportBatchSerializer(serializers.ModelSerializer):
             "file_name",
             "file_type",
             "file_size",
+            "uncompressed_size",
             "status",
             "started_at",
             "completed_at",
@@ -73,3 +113,10 @@ class ImportBatchSerializer(serializers.ModelSerializer):
             "records_skipped",
             "error_log",
         ]
+
+
+class ImportRecordErrorSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportRecordError
+        fields = ["id", "created", "message", "record"]
+        read_only_fields = fields
@@ -1,3 +1,4 @@
+from django.urls import re_path
 from rest_framework.routers import DefaultRouter
 from . import views
 
@@ -7,4 +8,7 @@ router.register("pois", views.PointOfInterestViewSet, basename="poi")
 router.register("import-batches", views.ImportBatchViewSet, basename="importbatch")
 
 # URL patterns
-urlpatterns = router.urls
+urlpatterns = [
+    re_path(r"^pois/tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.mvt$", views.poi_tile, name="poi-tile"),
+    *router.urls,
+]
@@ -1,25 +1,45 @@
 from rest_framework import viewsets, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.pagination import CursorPagination
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
 from django.contrib.gis.geos import Point
 from django.contrib.gis.measure import Distance
-from django.contrib.postgres.search import TrigramSimilarity
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count, Prefetch
+from django.db.models import Count, Prefetch, Q
 from django.views.decorators.cache import cache_page
 from django.utils.decorators import method_decorator
 from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET
+from redis.exceptions import RedisError
 
 from poi_manager.models import PointOfInterest, ImportBatch
 from poi_manager.filtersets import PointOfInterestFilterSet, ImportBatchFilterSet
-from .serializers import PointOfInterestSerializer, ImportBatchSerializer
+from poi_manager.clusters import get_clusters
+from poi_manager.nearby import find_nearest
+from poi_manager.progress import ImportProgress
+from poi_manager.tiles import MAX_ZOOM, get_tile
+from poi_manager.utils import parse_bbox
+from .serializers import (
+    PointOfInterestSerializer,
+    NearbyPointOfInterestSerializer,
+    RatingsSerializer,
+    BulkRatingsSerializer,
+    ImportBatchSerializer,
+    ImportRecordErrorSerializer,
+)
 
 __all__ = (
     "PointOfInterestViewSet",
     "ImportBatchViewSet",
+    "poi_tile",
 )
 
+MVT_CONTENT_TYPE = "application/vnd.mapbox-vector-tile"
+
 
 class FastPagination(CursorPagination):
     page_size = 100
@@ -28,64 +48,223 @@ class FastPagination(CursorPagination):
     ordering = "-created"
 
 
+class ErrorPagination(CursorPagination):
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering = "id"
+
+
+class DistanceCursorPagination(CursorPagination):
+    """
+    Keyset pagination of nearest-first POIs by (distance, id). The cursor
+    holds the distance and id of the last POI of the page, and the next page
+    keeps only POIs past it, so earlier pages are not sorted, fetched or
+    serialized again. The KNN index scan still starts from the nearest POI
+    and filters out the earlier ones, so on the database path its cost grows
+    with the page depth. Only forward pagination is supported.
+    """
+
+    page_size = 20
+    page_size_query_param = "limit"
+    max_page_size = 1000
+    ordering = ("distance", "id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.prepare(request)
+        if self.position is not None:
+            distance, pk = self.position
+            queryset = queryset.filter(Q(distance__gt=distance) | Q(distance=distance, id__gt=pk)).exclude(id=pk)
+
+        return self.set_page(list(queryset.order_by(*self.ordering)[: self.page_size + 1]))
+
+    def paginate_nearest(self, nearest, queryset, request):
+        """
+        Paginate the matches of nearby.find_nearest, which are already ordered
+        and past the cursor, loading their POIs by id. Returns None when a POI
+        was deleted, moved or recategorized since its cell was cached, as the
+        order and the next page could then be wrong; the caller should query
+        the database instead.
+        """
+        self.prepare(request)
+        matches = nearest[: self.page_size + 1]
+        pois = queryset.in_bulk([pk for _, pk, _, _, _ in matches])
+
+        results = []
+        for distance, pk, longitude, latitude, category in matches:
+            poi = pois.get(pk)
+            if poi is None or (poi.location.x, poi.location.y, poi.category) != (longitude, latitude, category):
+                return None
+            poi.distance = distance
+            results.append(poi)
+        return self.set_page(results)
+
+    def prepare(self, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.position = self.get_position(request)
+
+    def get_position(self, request):
+        """The ``(distance, id)`` of the last POI of the previous page, or None."""
+        cursor = self.decode_cursor(request)
+        if cursor is None:
+            return None
+        try:
+            distance, pk = cursor.position.split("_")
+            return float(distance), int(pk)
+        except (AttributeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def set_page(self, results):
+        self.has_next = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        # repr() round-trips the float, so ties on distance compare equal
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=f"{last.distance!r}_{last.id}"))
+
+    def get_previous_link(self):
+        return None
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+
+class RankedOrderingFilter(filters.OrderingFilter):
+    """Orders search results by relevance unless ``ordering`` is given."""
+
+    def get_default_ordering(self, view):
+        if view.request.query_params.get("search"):
+            return ["-rank"]
+        return super().get_default_ordering(view)
+
+
 class PointOfInterestViewSet(viewsets.ModelViewSet):
     serializer_class = PointOfInterestSerializer
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
-        filters.OrderingFilter,
+        RankedOrderingFilter,
     ]
     filterset_class = PointOfInterestFilterSet
-    search_fields = ["name", "external_id", "description"]
     ordering_fields = ["name", "category", "avg_rating", "created"]
     ordering = ["name"]
     pagination_class = FastPagination
 
     def get_queryset(self):
-        queryset = PointOfInterest.objects.select_related("import_batch")
-
         search = self.request.query_params.get("search")
-        if search and len(search) >= 3:
-            queryset = (
-                queryset.annotate(similarity=TrigramSimilarity("name", search))
-                .filter(similarity__gt=0.1)
-                .order_by("-similarity")
-            )
+        if search:
+            queryset = PointOfInterest.objects.search(search)
+        else:
+            queryset = PointOfInterest.objects.all()
 
-        return queryset
+        return queryset.select_related("import_batch")
 
     @action(detail=False, methods=["get"])
     def nearby(self, request):
+        """
+        POIs closest to ``latitude``/``longitude``, nearest first, each with
+        its ``distance`` in metres, in pages of ``limit`` followed through the
+        ``next`` cursor. ``radius`` (km) and a comma-separated ``category``
+        list optionally narrow the search.
+        """
         try:
             lat = float(request.query_params.get("latitude"))
             lon = float(request.query_params.get("longitude"))
-            radius = float(request.query_params.get("radius", 5))
-            limit = int(request.query_params.get("limit", 20))
-
-            cache_key = f"nearby_{lat:.4f}_{lon:.4f}_{radius}_{limit}"
-            cached_result = cache.get(cache_key)
-            if cached_result:
-                return Response(cached_result)
-
-            point = Point(lon, lat, srid=4326)
-            nearby_pois = (
-                PointOfInterest.objects.filter(
-                    location__distance_lte=(point, Distance(km=radius))
-                )
-                .select_related("import_batch")
-                .order_by("location")[:limit]
+            radius = request.query_params.get("radius")
+            radius = float(radius) if radius else None
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "Invalid parameters. Required: latitude, longitude (floats)"},
+                status=400,
             )
 
-            serializer = self.get_serializer(nearby_pois, many=True)
-            cache.set(cache_key, serializer.data, 300)
-            return Response(serializer.data)
+        categories = sorted(c for c in request.query_params.get("category", "").split(",") if c)
 
+        paginator = DistanceCursorPagination()
+
+        # Served from the cached cell candidates when they are conclusive and
+        # still match the POIs
+        page = None
+        nearest = find_nearest(
+            lon,
+            lat,
+            paginator.get_page_size(request) + 1,
+            radius=radius * 1000 if radius is not None else None,
+            categories=categories,
+            after=paginator.get_position(request),
+        )
+        if nearest is not None:
+            page = paginator.paginate_nearest(
+                nearest, PointOfInterest.objects.select_related("import_batch"), request
+            )
+        if page is None:
+            nearby_pois = PointOfInterest.objects.nearest(
+                Point(lon, lat, srid=4326),
+                radius=Distance(km=radius) if radius is not None else None,
+                categories=categories,
+            ).select_related("import_batch")
+            page = paginator.paginate_queryset(nearby_pois, request, view=self)
+
+        serializer = NearbyPointOfInterestSerializer(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=["get"])
+    def clusters(self, request):
+        """
+        Count, centroid and average rating per grid cell for a ``bbox`` at a
+        map ``zoom``, so zoomed-out maps never fetch individual POIs.
+        """
+        try:
+            bbox = parse_bbox(request.query_params.get("bbox"))
+            zoom = int(request.query_params.get("zoom"))
         except (TypeError, ValueError):
             return Response(
-                {"error": "Invalid parameters. Required: latitude, longitude (floats)"},
+                {"error": "Invalid parameters. Required: bbox (minLon,minLat,maxLon,maxLat), zoom (int)"},
                 status=400,
             )
 
+        categories = [c for c in request.query_params.get("category", "").split(",") if c]
+        try:
+            clusters = get_clusters(bbox, zoom, categories)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        return Response({"zoom": zoom, "clusters": clusters})
+
+    @action(detail=True, methods=["post"], url_path="ratings")
+    def add_ratings(self, request, pk=None):
+        serializer = RatingsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        poi = get_object_or_404(PointOfInterest.objects.only("id"), pk=pk)
+        poi.add_ratings(serializer.validated_data["ratings"])
+
+        return Response(
+            {
+                "id": poi.id,
+                "avg_rating": poi.avg_rating,
+                "rating_count": poi.rating_count,
+                "rating_histogram": poi.rating_histogram,
+            }
+        )
+
+    @action(detail=False, methods=["post"], url_path="ratings")
+    def bulk_add_ratings(self, request):
+        serializer = BulkRatingsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        events = serializer.validated_data["events"]
+        updated = PointOfInterest.objects.add_ratings((event["poi"], event["rating"]) for event in events)
+
+        return Response({"events": len(events), "updated_pois": updated})
+
     @action(detail=False, methods=["get"])
     @method_decorator(cache_page(60 * 15))
     def categories(self, request):
@@ -116,6 +295,43 @@ class ImportBatchViewSet(viewsets.ReadOnlyModelViewSet):
             Prefetch("pois", queryset=PointOfInterest.objects.only("id"))
         )
 
+    @action(detail=True, methods=["get"])
+    def errors(self, request, pk=None):
+        # get_queryset() prefetches the POIs of the batch, which are not needed here
+        batch = get_object_or_404(ImportBatch.objects.only("id"), pk=pk)
+        paginator = ErrorPagination()
+        page = paginator.paginate_queryset(batch.record_errors.all(), request, view=self)
+        serializer = ImportRecordErrorSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=["get"])
+    def progress(self, request, pk=None):
+        """
+        Live counters from Redis, cheap enough to poll every second. Falls back
+        to the last saved counters once the Redis entry has expired.
+        """
+        try:
+            progress = ImportProgress(pk).read()
+        except RedisError:
+            progress = None
+
+        if progress is None:
+            batch = get_object_or_404(
+                ImportBatch.objects.only(
+                    "status", "file_size", "records_processed", "records_failed", "records_skipped"
+                ),
+                pk=pk,
+            )
+            progress = {
+                "status": batch.status,
+                "written": batch.records_processed,
+                "failed": batch.records_failed,
+                "skipped": batch.records_skipped,
+                "total_bytes": batch.file_size,
+            }
+
+        return Response(progress)
+
     @action(detail=False, methods=["get"])
     def recent(self, request):
         recent_batches = self.get_queryset()[:10]
@@ -139,3 +355,22 @@ class ImportBatchViewSet(viewsets.ReadOnlyModelViewSet):
             cache.set(cache_key, stats, 300)
 
         return Response(stats)
+
+
+@require_GET
+def poi_tile(request, z, x, y):
+    """
+    Mapbox Vector Tile of the POIs in tile ``z/x/y``, optionally limited to a
+    comma-separated ``category`` list. A plain view rather than a viewset
+    action, as tiles bypass serializers and content negotiation.
+    """
+    z, x, y = int(z), int(x), int(y)
+    if z > MAX_ZOOM or x >= 2 ** z or y >= 2 ** z:
+        return JsonResponse({"error": f"Invalid tile {z}/{x}/{y}"}, status=400)
+
+    categories = [c for c in request.GET.get("category", "").split(",") if c]
+    tile = get_tile(z, x, y, categories)
+
+    response = HttpResponse(tile, content_type=MVT_CONTENT_TYPE, status=200 if tile else 204)
+    patch_cache_control(response, public=True, max_age=60)
+    return response
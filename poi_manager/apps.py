@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class PoiManagerConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "poi_manager"
+
+    def ready(self):
+        # Connects tile cache invalidation and cluster refreshes to import_completed
+        # and pois_changed
+        from poi_manager import clusters, tiles  # noqa: F401
@@ -0,0 +1,268 @@
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+from django.dispatch import receiver
+
+from poi_manager.models import PointOfInterest, POIClusterCell
+from poi_manager.models.poi import LOCATION_GEOMETRY_SQL, category_sql
+from poi_manager.signals import POIState, import_completed, pois_changed
+from poi_manager.tiles import MAX_LATITUDE, Bounds, tile_bounds, tile_range
+
+__all__ = (
+    "CLUSTER_CELL_OFFSET",
+    "MAX_CLUSTER_LEVEL",
+    "adjust_clusters",
+    "get_clusters",
+    "rebuild_clusters",
+)
+
+logger = logging.getLogger("poi_manager.clusters")
+
+# Cells are the tiles this many zoom levels below the map zoom, so every map
+# tile is split into 8 x 8 cells
+CLUSTER_CELL_OFFSET = 3
+
+# The finest pyramid level, aggregated directly from the POIs
+MAX_CLUSTER_LEVEL = 17
+
+# Requests covering more cells than this are rejected
+MAX_CLUSTER_CELLS = 16384
+
+# Serializes pyramid rebuilds, which delete and insert overlapping cells, with
+# each other and with adjustments, which only take it shared
+CLUSTER_LOCK_ID = 7243951
+
+CELL_COLUMNS = "level, x, y, count, longitude_sum, latitude_sum, rating_sum, rating_count"
+
+# Web Mercator tile coordinates of a lon/lat geometry; see tiles.tile_at
+CELL_X_SQL = "LEAST(GREATEST(floor((ST_X(geom) + 180) / 360 * {n})::int, 0), {n} - 1)"
+CELL_Y_SQL = (
+    "LEAST(GREATEST(floor((1 - asinh(tan(radians("
+    "LEAST(GREATEST(ST_Y(geom), -{max_latitude}), {max_latitude})"
+    "))) / pi()) / 2 * {n})::int, 0), {n} - 1)"
+)
+
+CellRange = Tuple[int, int, int, int]
+
+
+def get_clusters(bounds: Bounds, zoom: int, categories: Sequence[str] = ()) -> List[Dict[str, Any]]:
+    """
+    Clustered POIs in ``bounds`` at map zoom ``zoom``: the count, centroid
+    and average rating of every non-empty cell. Read from the pyramid, or
+    aggregated from the POIs when filtering by category.
+
+    Raises:
+        ValueError: if the bounds cover more than MAX_CLUSTER_CELLS cells
+    """
+    level = min(max(zoom, 0) + CLUSTER_CELL_OFFSET, MAX_CLUSTER_LEVEL)
+    ranges = cell_ranges(bounds, level)
+
+    cells = sum((max_x - min_x + 1) * (max_y - min_y + 1) for min_x, min_y, max_x, max_y in ranges)
+    if cells > MAX_CLUSTER_CELLS:
+        raise ValueError(f"bbox covers {cells} cells at zoom {zoom}, at most {MAX_CLUSTER_CELLS} are allowed")
+
+    if categories:
+        clusters = []
+        with connection.cursor() as cursor:
+            for cell_range in ranges:
+                sql, params = aggregate_pois_sql(level, cell_range, categories)
+                cursor.execute(sql, params)
+                clusters.extend(
+                    POIClusterCell(level=level, x=x, y=y, count=count, longitude_sum=lon, latitude_sum=lat,
+                                   rating_sum=rating_sum, rating_count=rating_count).to_cluster()
+                    for x, y, count, lon, lat, rating_sum, rating_count in cursor.fetchall()
+                )
+        return clusters
+
+    in_ranges = Q()
+    for min_x, min_y, max_x, max_y in ranges:
+        in_ranges |= Q(x__range=(min_x, max_x), y__range=(min_y, max_y))
+    return [cell.to_cluster() for cell in POIClusterCell.objects.filter(in_ranges, level=level)]
+
+
+def rebuild_clusters(bounds: Optional[Bounds] = None):
+    """
+    Recompute the pyramid cells covering ``bounds``, or all cells without
+    bounds. The finest level is aggregated from the POIs and every coarser
+    level from the one below it, in a single transaction.
+    """
+    table = connection.ops.quote_name(POIClusterCell._meta.db_table)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [CLUSTER_LOCK_ID])
+
+        for level in range(MAX_CLUSTER_LEVEL, -1, -1):
+            cell_range = tile_range(bounds, level) if bounds is not None else None
+
+            range_sql, params = "", {"level": level}
+            if cell_range is not None:
+                range_sql = "AND x BETWEEN %(min_x)s AND %(max_x)s AND y BETWEEN %(min_y)s AND %(max_y)s"
+                params.update(zip(("min_x", "min_y", "max_x", "max_y"), cell_range))
+
+            cursor.execute(f"DELETE FROM {table} WHERE level = %(level)s {range_sql}", params)
+
+            if level == MAX_CLUSTER_LEVEL:
+                sql, params = aggregate_pois_sql(level, cell_range)
+                cursor.execute(f"INSERT INTO {table} ({CELL_COLUMNS}) SELECT {level}, * FROM ({sql}) AS cell", params)
+                continue
+
+            # Children of the cells in range are x * 2 .. x * 2 + 1
+            child_range_sql = ""
+            if cell_range is not None:
+                child_range_sql = (
+                    "AND x BETWEEN %(min_x)s * 2 AND %(max_x)s * 2 + 1 "
+                    "AND y BETWEEN %(min_y)s * 2 AND %(max_y)s * 2 + 1"
+                )
+            cursor.execute(
+                f"""
+                INSERT INTO {table} ({CELL_COLUMNS})
+                SELECT %(level)s, x / 2, y / 2, sum(count), sum(longitude_sum), sum(latitude_sum),
+                       sum(rating_sum), sum(rating_count)
+                FROM {table}
+                WHERE level = %(level)s + 1 {child_range_sql}
+                GROUP BY x / 2, y / 2
+                """,
+                params,
+            )
+
+    logger.info(f"Rebuilt cluster cells {'in ' + str(bounds) if bounds else 'for all POIs'}")
+
+
+def adjust_clusters(removed: Sequence[POIState], added: Sequence[POIState]):
+    """
+    Subtract the ``removed`` POI states from the cells of every pyramid
+    level and add the ``added`` ones, in the current transaction. Cells left
+    without POIs are deleted.
+    """
+    # A state both removed and added, such as an unmoved POI, changes nothing
+    delta = Counter(added)
+    delta.subtract(removed)
+    states = [(sign, state) for state, sign in delta.items() if sign]
+    if not states:
+        return
+
+    table = connection.ops.quote_name(POIClusterCell._meta.db_table)
+    cell_x = CELL_X_SQL.format(n="(1 << level)")
+    cell_y = CELL_Y_SQL.format(n="(1 << level)", max_latitude=MAX_LATITUDE)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock_shared(%s)", [CLUSTER_LOCK_ID])
+
+        # Cells are upserted in key order, so concurrent adjustments cannot deadlock
+        cursor.execute(
+            f"""
+            INSERT INTO {table} AS cell ({CELL_COLUMNS})
+            SELECT level, x, y, sum(sign), sum(sign * longitude), sum(sign * latitude),
+                   sum(sign * rating_sum), sum(sign * rating_count)
+            FROM (
+                SELECT level, {cell_x} AS x, {cell_y} AS y, sign, ST_X(geom) AS longitude, ST_Y(geom) AS latitude,
+                       rating_sum, rating_count
+                FROM (
+                    SELECT ST_SetSRID(ST_MakePoint(longitude, latitude), 4326) AS geom, sign, rating_sum, rating_count
+                    FROM unnest(%s::int[], %s::float8[], %s::float8[], %s::float8[], %s::bigint[])
+                        AS state(sign, longitude, latitude, rating_sum, rating_count)
+                ) AS state
+                CROSS JOIN generate_series(0, %s) AS level
+            ) AS state_cell
+            GROUP BY level, x, y
+            ORDER BY level, x, y
+            ON CONFLICT (level, x, y) DO UPDATE SET
+                count = cell.count + EXCLUDED.count,
+                longitude_sum = cell.longitude_sum + EXCLUDED.longitude_sum,
+                latitude_sum = cell.latitude_sum + EXCLUDED.latitude_sum,
+                rating_sum = cell.rating_sum + EXCLUDED.rating_sum,
+                rating_count = cell.rating_count + EXCLUDED.rating_count
+            RETURNING id, count
+            """,
+            [
+                [sign for sign, _ in states],
+                *([state[i] for _, state in states] for i in range(len(POIState._fields))),
+                MAX_CLUSTER_LEVEL,
+            ],
+        )
+        empty = [cell_id for cell_id, count in cursor.fetchall() if count <= 0]
+        if empty:
+            cursor.execute(f"DELETE FROM {table} WHERE id = ANY(%s)", [empty])
+
+
+def aggregate_pois_sql(
+    level: int, cell_range: Optional[CellRange] = None, categories: Sequence[str] = ()
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    SQL aggregating the POIs into the cells of ``level``, returning the
+    cell columns after ``level``. A cell range is first narrowed down to its
+    lon/lat envelope through the geometry index.
+    """
+    n = 2 ** level
+    conditions = ["TRUE"]
+    params: Dict[str, Any] = {}
+
+    if cell_range is not None:
+        min_x, min_y, max_x, max_y = cell_range
+        west, _, _, north = tile_bounds(level, min_x, min_y)
+        _, south, east, _ = tile_bounds(level, max_x, max_y)
+        conditions.append(f"{LOCATION_GEOMETRY_SQL} && ST_MakeEnvelope(%(west)s, %(south)s, %(east)s, %(north)s, 4326)")
+        params.update(west=west, south=south, east=east, north=north)
+
+    if categories:
+        condition, category_params = category_sql(categories)
+        conditions.append(condition)
+        params.update(category_params)
+
+    # Points on the envelope edge may fall into cells just outside the range
+    range_sql = ""
+    if cell_range is not None:
+        range_sql = "WHERE x BETWEEN %(min_x)s AND %(max_x)s AND y BETWEEN %(min_y)s AND %(max_y)s"
+        params.update(zip(("min_x", "min_y", "max_x", "max_y"), cell_range))
+
+    table = connection.ops.quote_name(PointOfInterest._meta.db_table)
+    cell_x = CELL_X_SQL.format(n=n)
+    cell_y = CELL_Y_SQL.format(n=n, max_latitude=MAX_LATITUDE)
+
+    sql = f"""
+        SELECT x, y, count(*), sum(longitude), sum(latitude), sum(rating_sum), sum(rating_count)
+        FROM (
+            SELECT {cell_x} AS x, {cell_y} AS y, ST_X(geom) AS longitude, ST_Y(geom) AS latitude,
+                   rating_sum, rating_count
+            FROM (
+                SELECT {LOCATION_GEOMETRY_SQL} AS geom, rating_sum, rating_count
+                FROM {table}
+                WHERE {' AND '.join(conditions)}
+            ) AS poi
+        ) AS cell
+        {range_sql}
+        GROUP BY x, y
+    """
+    return sql, params
+
+
+def cell_ranges(bounds: Bounds, level: int) -> List[CellRange]:
+    """Cell ranges covering ``bounds``, split in two when crossing the antimeridian."""
+    min_lon, min_lat, max_lon, max_lat = bounds
+    if min_lon > max_lon:
+        return [
+            tile_range((min_lon, min_lat, 180, max_lat), level),
+            tile_range((-180, min_lat, max_lon, max_lat), level),
+        ]
+    return [tile_range(bounds, level)]
+
+
+@receiver(import_completed)
+def refresh_imported_clusters(sender, import_batch=None, **kwargs):
+    try:
+        if import_batch is None:
+            rebuild_clusters()
+        elif import_batch.extent is not None:
+            rebuild_clusters(import_batch.extent)
+    except DatabaseError as e:
+        logger.error(f"Could not refresh cluster cells, run rebuild_clusters: {e}")
+
+
+@receiver(pois_changed)
+def adjust_changed_clusters(sender, removed=(), added=(), **kwargs):
+    # Runs in the transaction of the change, so a failure rolls it back
+    # rather than leaving the pyramid out of step with the POIs
+    adjust_clusters(removed, added)
@@ -0,0 +1,81 @@
+import logging
+
+from django.db import transaction
+
+from poi_manager.models import ImportBatch, ImportRecordError
+
+__all__ = ("ImportErrorSink", "ERROR_SAMPLE_SIZE")
+
+logger = logging.getLogger("poi_manager.error_sink")
+
+# Number of errors copied into ImportBatch.error_log; all errors are kept as
+# ImportRecordError rows
+ERROR_SAMPLE_SIZE = 100
+
+
+class ImportErrorSink:
+    """
+    Buffers the errors of an import and writes them in bulk.
+
+    Each flush inserts the buffered errors as ImportRecordError rows with one
+    bulk_create and updates the ImportBatch row once, topping up the sample in
+    ``error_log`` and the total error count. The batch row is locked while it
+    is updated, so sinks of concurrent chunk jobs do not lose each other's
+    counts.
+    """
+
+    def __init__(self, import_batch, buffer_size: int = 1000, sample_size: int = ERROR_SAMPLE_SIZE):
+        self.import_batch = import_batch
+        self.buffer_size = buffer_size
+        self.sample_size = sample_size
+        self.pending = []
+        self.failed = 0
+
+    def __len__(self):
+        return len(self.pending)
+
+    def add(self, error_message, record_data=None, failed: int = 1):
+        """
+        Buffer an error. ``failed`` is added to ``records_failed`` on the
+        next flush.
+        """
+        self.pending.append(
+            ImportRecordError(
+                import_batch_id=self.import_batch.pk,
+                message=str(error_message),
+                record=record_data or None,
+            )
+        )
+        self.failed += failed
+
+        if len(self.pending) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+
+        errors, failed = self.pending, self.failed
+        self.pending = []
+        self.failed = 0
+
+        with transaction.atomic():
+            ImportRecordError.objects.bulk_create(errors, batch_size=self.buffer_size)
+
+            current = (
+                ImportBatch.objects.select_for_update()
+                .only("error_log", "records_failed")
+                .get(pk=self.import_batch.pk)
+            )
+            error_log = current.error_log or {}
+            sample = error_log.setdefault("errors", [])
+            # Logs written before the sink existed hold every error and no total
+            error_log["total"] = error_log.get("total", len(sample)) + len(errors)
+            room = max(self.sample_size - len(sample), 0)
+            sample.extend(error.to_log_entry() for error in errors[:room])
+
+            self.import_batch.error_log = error_log
+            self.import_batch.records_failed = current.records_failed + failed
+            self.import_batch.save(update_fields=["error_log", "records_failed"])
+
+        logger.debug(f"Recorded {len(errors)} errors for import {self.import_batch.pk}")
@@ -1,8 +1,13 @@
 import django_filters
 from django_filters import FilterSet
-from django.contrib.gis.geos import Point
+from django import forms
+from django.contrib.gis.db import models
+from django.contrib.gis.geos import Point, Polygon
 from django.contrib.gis.measure import Distance
+from django.db.models import Q
+from django.db.models.functions import Cast
 from .models import PointOfInterest, ImportBatch
+from .utils import parse_bbox
 
 __all__ = (
     "PointOfInterestFilterSet",
@@ -10,6 +15,45 @@ __all__ = (
 )
 
 
+class BBoxField(forms.CharField):
+    def to_python(self, value):
+        value = super().to_python(value)
+        if not value:
+            return None
+        try:
+            return parse_bbox(value)
+        except ValueError as e:
+            raise forms.ValidationError(str(e))
+
+
+class BBoxFilter(django_filters.Filter):
+    """``minLon,minLat,maxLon,maxLat``, with ``minLon > maxLon`` crossing the antimeridian."""
+
+    field_class = BBoxField
+
+
+def filter_in_bbox(queryset, bbox):
+    """
+    POIs inside ``bbox``, matched with ``&&`` against the location as a
+    geometry so the GiST expression indexes are used. Boxes crossing the
+    antimeridian are split in two.
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    boxes = [bbox]
+    if min_lon > max_lon:
+        boxes = [(min_lon, min_lat, 180, max_lat), (-180, min_lat, max_lon, max_lat)]
+
+    condition = Q()
+    for box in boxes:
+        envelope = Polygon.from_bbox(box)
+        envelope.srid = 4326
+        condition |= Q(location_geometry__bboverlaps=envelope)
+
+    return queryset.alias(
+        location_geometry=Cast("location", output_field=models.PointField(srid=4326))
+    ).filter(condition)
+
+
 class PointOfInterestFilterSet(FilterSet):
     id = django_filters.NumberFilter(field_name="id", lookup_expr="exact")
     external_id = django_filters.CharFilter(
@@ -26,14 +70,37 @@ class PointOfInterestFilterSet(FilterSet):
     min_rating = django_filters.NumberFilter(field_name="avg_rating", lookup_expr="gte")
     max_rating = django_filters.NumberFilter(field_name="avg_rating", lookup_expr="lte")
 
-    min_latitude = django_filters.NumberFilter(field_name="latitude", lookup_expr="gte")
-    max_latitude = django_filters.NumberFilter(field_name="latitude", lookup_expr="lte")
-    min_longitude = django_filters.NumberFilter(
-        field_name="longitude", lookup_expr="gte"
-    )
-    max_longitude = django_filters.NumberFilter(
-        field_name="longitude", lookup_expr="lte"
-    )
+    bbox = BBoxFilter(method="filter_bbox")
+
+    # Combined into one box in filter_queryset, so they share the bbox index
+    min_latitude = django_filters.NumberFilter(method="filter_bounds")
+    max_latitude = django_filters.NumberFilter(method="filter_bounds")
+    min_longitude = django_filters.NumberFilter(method="filter_bounds")
+    max_longitude = django_filters.NumberFilter(method="filter_bounds")
+
+    def filter_bbox(self, queryset, name, value):
+        return filter_in_bbox(queryset, value)
+
+    def filter_bounds(self, queryset, name, value):
+        return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+
+        bounds = [
+            self.form.cleaned_data.get(name)
+            for name in ("min_longitude", "min_latitude", "max_longitude", "max_latitude")
+        ]
+        if all(value is None for value in bounds):
+            return queryset
+
+        defaults = (-180, -90, 180, 90)
+        min_lon, min_lat, max_lon, max_lat = (
+            float(value) if value is not None else default for value, default in zip(bounds, defaults)
+        )
+        if min_lat > max_lat or min_lon > max_lon:
+            return queryset.none()
+        return filter_in_bbox(queryset, (min_lon, min_lat, max_lon, max_lat))
 
     def filter_nearby(self, queryset, name, value):
         if not value:
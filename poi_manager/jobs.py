@@ -1,87 +1,159 @@
 import logging
 import os
+from datetime import timedelta
 from django.db import transaction
-from django.contrib.gis.geos import Point
+from django.db.models import F
+from django.utils import timezone
+from rq import get_current_job
+from rq.exceptions import NoSuchJobError
+from rq.job import Dependency, Job, JobStatus
 
-from poi_manager.models import PointOfInterest, ImportBatch
-from poi_manager.parsers.csv_parser import CSVParser
-from poi_manager.parsers.json_parser import JSONParser
-from poi_manager.parsers.xml_parser import XMLParser
+from poi_manager.models import ImportBatch
+from poi_manager.loaders import get_loader_class
+from poi_manager.pipeline import pipelined
+from poi_manager.progress import ImportProgress
+from poi_manager.parsers import get_parser_class
 from poi_manager.utils import get_file_type
 
 logger = logging.getLogger("poi_manager.jobs")
 
+# Options kept in the checkpoint so a retried import runs the way it started
+CHECKPOINT_OPTIONS = (
+    "batch_size",
+    "loader",
+    "update_existing",
+    "columnar",
+    "pipeline_depth",
+)
+
+CHECKPOINT_FIELDS = ["records_processed", "records_failed", "records_skipped", "checkpoint"]
+
+
+# Workers refresh the heartbeat of a running job every 30 seconds by default
+STALE_HEARTBEAT = timedelta(minutes=2)
+
+
+def checkpoint_options(options):
+    return {name: options[name] for name in CHECKPOINT_OPTIONS if name in options}
+
+
+def job_is_alive(job_id, connection) -> bool:
+    """
+    Whether the RQ job ``job_id`` is still waiting to run or running on a
+    worker that has sent a heartbeat recently.
+    """
+    if not job_id:
+        return False
+
+    try:
+        job = Job.fetch(job_id, connection=connection)
+    except NoSuchJobError:
+        return False
+
+    status = job.get_status()
+    if status in (JobStatus.QUEUED, JobStatus.DEFERRED, JobStatus.SCHEDULED):
+        return True
+    if status == JobStatus.STARTED:
+        return job.last_heartbeat is not None and timezone.now() - job.last_heartbeat < STALE_HEARTBEAT
+    return False
+
 
 def import_poi_file_async(batch_id, file_path, options=None):
     options = options or {}
 
     try:
         batch = ImportBatch.objects.get(id=batch_id)
+        checkpoint = batch.checkpoint or {}
+        start_record = checkpoint.get("records") or 0
+        start_batch = checkpoint.get("batch", 0) if start_record else 0
+
+        if start_record:
+            # Counters were committed together with the checkpoint
+            processed = batch.records_processed
+            failed = batch.records_failed
+            skipped = batch.records_skipped
+            logger.info(f"Resuming import of {file_path} after batch {start_batch} (record {start_record})")
+        else:
+            processed = 0
+            failed = 0
+            skipped = 0
+            batch.checkpoint = {"options": checkpoint_options(options)}
+            logger.info(f"Starting async import for {file_path}")
+
         batch.status = "processing"
         batch.save()
 
-        logger.info(f"Starting async import for {file_path}")
+        progress = ImportProgress(batch_id)
+        progress.start(
+            batch.file_size,
+            parsed=processed + failed + skipped,
+            written=processed,
+            failed=failed,
+            skipped=skipped,
+        )
 
         file_type = get_file_type(file_path)
-        parser_class = {
-            "csv": CSVParser,
-            "json": JSONParser,
-            "xml": XMLParser,
-        }.get(file_type)
-
-        if not parser_class:
-            raise ValueError(f"Unsupported file type: {file_type}")
+        parser_class = get_parser_class(file_type)
 
         batch_size = options.get("batch_size", 1000)
-        parser = parser_class(file_path, batch_size)
+        parser = parser_class(
+            file_path,
+            batch_size,
+            workers=options.get("workers", 1),
+            ordered=not options.get("unordered", False),
+            columnar=options.get("columnar", False),
+            start_record=start_record,
+        )
+
+        loader_class = get_loader_class(
+            options.get("loader", "copy"), options.get("update_existing", False)
+        )
+        loader = loader_class(batch, os.path.basename(file_path))
 
-        processed = 0
-        failed = 0
+        batches = pipelined(parser.parse(), options.get("pipeline_depth", 2))
+
+        for batch_num, batch_data in enumerate(batches, start_batch + 1):
+            # Parallel parsing emits batches without source positions; those
+            # imports checkpoint the batch number only and restart on retry.
+            position = parser.positions.popleft() if parser.positions else None
 
-        for batch_num, batch_data in enumerate(parser.parse(), 1):
             try:
                 with transaction.atomic():
-                    pois = []
-
-                    for record in batch_data:
-                        try:
-                            poi = PointOfInterest(
-                                external_id=record["external_id"],
-                                name=record["name"],
-                                category=record["category"],
-                                latitude=record["latitude"],
-                                longitude=record["longitude"],
-                                location=Point(record["longitude"], record["latitude"]),
-                                ratings=record["ratings"],
-                                description=record.get("description", ""),
-                                source_file=os.path.basename(file_path),
-                                import_batch=batch,
-                            )
-                            pois.append(poi)
-
-                        except Exception as e:
-                            logger.error(f"Error creating POI: {e}")
-                            failed += 1
-                            batch.add_error(str(e), record)
-
-                    if pois:
-                        created = PointOfInterest.objects.bulk_create(
-                            pois, ignore_conflicts=True, batch_size=500
-                        )
-                        processed += len(created)
+                    result = loader.load(batch_data)
+                    processed += result.processed
+                    failed += result.failed
+                    skipped += result.skipped
 
+                    # One row update in the transaction of the batch, so the
+                    # counters always match the records committed so far
                     batch.records_processed = processed
                     batch.records_failed = failed
-                    batch.save()
+                    batch.records_skipped = skipped
+                    batch.set_checkpoint(batch_num, position)
+                    batch.save(update_fields=CHECKPOINT_FIELDS)
 
-                    logger.info(f"Batch {batch_num}: Processed {len(pois)} records")
+                progress.add(
+                    parsed=len(batch_data),
+                    written=result.processed,
+                    failed=result.failed,
+                    skipped=result.skipped,
+                    bytes_consumed=parser.bytes_consumed,
+                )
+                logger.info(f"Batch {batch_num}: Processed {result.processed} records")
 
             except Exception as e:
                 logger.error(f"Batch processing error: {e}")
                 batch.add_error(f"Batch {batch_num} error: {e}")
                 failed += len(batch_data)
+                progress.add(parsed=len(batch_data), failed=len(batch_data))
 
+        batch.records_processed = processed
+        batch.records_failed = failed
+        batch.records_skipped = skipped
+        batch.uncompressed_size = parser.uncompressed_size
         batch.mark_completed()
+        progress.add(bytes_consumed=batch.file_size)
+        progress.finish(batch.status)
 
         logger.info(f"Import complete: {processed} processed, {failed} failed")
 
@@ -89,6 +161,7 @@ def import_poi_file_async(batch_id, file_path, options=None):
             "status": "completed",
             "processed": processed,
             "failed": failed,
+            "skipped": skipped,
             "batch_id": str(batch_id),
         }
 
@@ -104,6 +177,158 @@ def import_poi_file_async(batch_id, file_path, options=None):
             batch.add_error(f"Job failed: {e}")
             batch.save()
 
+        if "progress" in locals():
+            progress.finish("failed")
+
         raise
 
 
+def enqueue_import(queue, batch, file_path, options=None):
+    """
+    Enqueue the import of ``file_path`` into ``batch``.
+
+    Files larger than ``options["chunk_size"]`` MB (default 64, 0 disables
+    splitting) whose parser can split them are cut into record-aligned
+    chunks, each imported by its own job, so that additional RQ workers
+    share the load. A coordinator job that depends on all chunk jobs then
+    finalizes the batch. Returns the job tracking the import and the number
+    of chunks.
+    """
+    options = options or {}
+    chunk_bytes = options.get("chunk_size", 64) * 1024 * 1024
+    chunks = None
+
+    if chunk_bytes and batch.file_size and batch.file_size > chunk_bytes:
+        parser = get_parser_class(batch.file_type)(file_path, options.get("batch_size", 1000))
+        chunks = parser.split_chunks(chunk_bytes)
+
+    if not chunks or len(chunks) < 2:
+        return queue.enqueue(import_poi_file_async, batch.id, file_path, options), 1
+
+    chunk_jobs = [
+        queue.enqueue(import_poi_chunk_async, batch.id, file_path, {**chunk, "index": index}, options)
+        for index, chunk in enumerate(chunks)
+    ]
+    coordinator = queue.enqueue(
+        finalize_chunked_import,
+        batch.id,
+        [job.id for job in chunk_jobs],
+        depends_on=Dependency(jobs=chunk_jobs, allow_failure=True),
+    )
+
+    logger.info(f"Split {file_path} into {len(chunks)} chunk jobs")
+    return coordinator, len(chunks)
+
+
+def import_poi_chunk_async(batch_id, file_path, chunk, options=None):
+    """
+    Import one chunk of a file split by ``enqueue_import``. Counters are added
+    to the shared ImportBatch with F() expressions in the same transaction as
+    each loaded batch, so concurrent chunk jobs never overwrite each other.
+    """
+    options = options or {}
+
+    ImportBatch.objects.filter(id=batch_id, status="pending").update(status="processing")
+    batch = ImportBatch.objects.get(id=batch_id)
+
+    logger.info(f"Starting chunk {chunk['index']} of {file_path} (bytes {chunk['start']}-{chunk['end']})")
+
+    progress = ImportProgress(batch_id)
+    progress.start(batch.file_size, reset=False)
+
+    parser = get_parser_class(get_file_type(file_path))(
+        file_path,
+        options.get("batch_size", 1000),
+        columnar=options.get("columnar", False),
+    )
+    loader_class = get_loader_class(
+        options.get("loader", "copy"), options.get("update_existing", False)
+    )
+    loader = loader_class(batch, os.path.basename(file_path))
+
+    processed = 0
+    failed = 0
+    skipped = 0
+
+    batches = pipelined(parser.parse_chunk(chunk), options.get("pipeline_depth", 2))
+
+    for batch_num, batch_data in enumerate(batches, 1):
+        try:
+            with transaction.atomic():
+                result = loader.load(batch_data)
+                ImportBatch.objects.filter(id=batch_id).update(
+                    records_processed=F("records_processed") + result.processed,
+                    records_failed=F("records_failed") + result.failed,
+                    records_skipped=F("records_skipped") + result.skipped,
+                )
+
+            processed += result.processed
+            failed += result.failed
+            skipped += result.skipped
+            progress.add(
+                parsed=len(batch_data),
+                written=result.processed,
+                failed=result.failed,
+                skipped=result.skipped,
+            )
+
+        except Exception as e:
+            logger.error(f"Batch processing error: {e}")
+            batch.add_error(f"Chunk {chunk['index']} batch {batch_num} error: {e}", failed=len(batch_data))
+            failed += len(batch_data)
+            progress.add(parsed=len(batch_data), failed=len(batch_data))
+
+    progress.add(bytes_consumed=chunk["end"] - chunk["start"])
+
+    logger.info(f"Chunk {chunk['index']} complete: {processed} processed, {failed} failed")
+
+    return {
+        "chunk": chunk["index"],
+        "processed": processed,
+        "failed": failed,
+        "skipped": skipped,
+    }
+
+
+def finalize_chunked_import(batch_id, chunk_job_ids):
+    """
+    Runs once every chunk job has finished or failed. Records chunks that did
+    not complete and sets the final status of the batch.
+    """
+    batch = ImportBatch.objects.get(id=batch_id)
+    connection = get_current_job().connection
+
+    incomplete = 0
+    for index, job in enumerate(Job.fetch_many(chunk_job_ids, connection=connection)):
+        if job is not None and job.is_finished:
+            continue
+
+        incomplete += 1
+        status = job.get_status() if job is not None else "missing"
+        result = job.latest_result() if job is not None else None
+        reason = result.exc_string.strip().splitlines()[-1] if result and result.exc_string else status
+        batch.add_error(f"Chunk {index} did not complete: {reason}", failed=0)
+
+    batch.refresh_from_db()
+    batch.mark_completed()
+
+    if incomplete:
+        batch.status = "failed" if batch.records_processed == 0 else "partial"
+        batch.save(update_fields=["status"])
+
+    ImportProgress(batch_id).finish(batch.status)
+
+    logger.info(
+        f"Chunked import {batch_id} finished: {batch.records_processed} processed, "
+        f"{batch.records_failed} failed, {incomplete} of {len(chunk_job_ids)} chunks incomplete"
+    )
+
+    return {
+        "status": batch.status,
+        "processed": batch.records_processed,
+        "failed": batch.records_failed,
+        "skipped": batch.records_skipped,
+        "chunks": len(chunk_job_ids),
+        "incomplete_chunks": incomplete,
+        "batch_id": str(batch_id),
+    }
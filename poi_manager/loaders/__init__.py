@@ -0,0 +1,32 @@
+from .base import BaseLoader, LoadResult
+from .orm_loader import ORMLoader
+from .copy_loader import CopyLoader
+from .upsert_loader import UpsertLoader
+from .reload_loader import ReloadLoader
+from .shadow import ShadowTable
+
+__all__ = (
+    "BaseLoader",
+    "LoadResult",
+    "ORMLoader",
+    "CopyLoader",
+    "UpsertLoader",
+    "ReloadLoader",
+    "ShadowTable",
+    "LOADER_CLASSES",
+    "get_loader_class",
+)
+
+LOADER_CLASSES = {
+    "orm": ORMLoader,
+    "copy": CopyLoader,
+}
+
+
+def get_loader_class(name: str, update_existing: bool = False):
+    if update_existing:
+        return UpsertLoader
+    try:
+        return LOADER_CLASSES[name]
+    except KeyError:
+        raise ValueError(f"Unknown loader: {name}")
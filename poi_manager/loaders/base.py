@@ -0,0 +1,37 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, NamedTuple, Union
+import logging
+
+from poi_manager.error_sink import ImportErrorSink
+from poi_manager.parsers.columnar import ColumnarBatch
+
+logger = logging.getLogger("poi_manager.loaders")
+
+
+class LoadResult(NamedTuple):
+    processed: int
+    skipped: int
+    failed: int
+    updated: int = 0
+
+
+class BaseLoader(ABC):
+    """
+    Writes normalized parser batches into the PointOfInterest table.
+    """
+
+    def __init__(self, import_batch, source_file: str):
+        self.import_batch = import_batch
+        self.source_file = source_file
+        self.errors = ImportErrorSink(import_batch)
+
+    @abstractmethod
+    def load(self, records: Union[List[Dict[str, Any]], ColumnarBatch]) -> LoadResult:
+        """Write one parser batch. Must be called inside a transaction."""
+        pass
+
+    @staticmethod
+    def rating_stats(ratings: List[float]):
+        if ratings:
+            return sum(ratings) / len(ratings), len(ratings)
+        return None, 0
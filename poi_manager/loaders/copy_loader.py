@@ -0,0 +1,100 @@
+from typing import Any, Dict, List, Optional, Union
+import logging
+
+from django.db import connection
+
+from poi_manager.models import PointOfInterest
+from poi_manager.parsers.columnar import ColumnarBatch, iter_row_tuples
+from poi_manager.ratings import rating_columns_sql
+from .base import BaseLoader, LoadResult
+
+logger = logging.getLogger("poi_manager.loaders.copy")
+
+STAGING_TABLE = "poi_import_staging"
+
+STAGING_COLUMNS = (
+    ("external_id", "text"),
+    ("name", "text"),
+    ("category", "text"),
+    ("latitude", "float8"),
+    ("longitude", "float8"),
+    ("ratings", "float8[]"),
+    ("description", "text"),
+)
+
+# Columns derived from the staged values in the INSERT ... SELECT
+DERIVED_COLUMNS = "location, avg_rating, rating_count, rating_sum, rating_histogram"
+
+LOCATION_SQL = "ST_SetSRID(ST_MakePoint({prefix}longitude, {prefix}latitude), 4326)::geography"
+
+
+def derived_columns_sql(prefix: str = "", ratings: Optional[str] = None) -> str:
+    """
+    SQL for the DERIVED_COLUMNS of staged rows. The rating aggregates are
+    derived from ``ratings``, by default the staged ratings array.
+    """
+    return ", ".join(
+        (LOCATION_SQL.format(prefix=prefix), *rating_columns_sql(ratings or f"{prefix}ratings").values())
+    )
+
+
+class CopyLoader(BaseLoader):
+    """
+    Streams batches into a temporary staging table with COPY ... FROM STDIN and
+    moves them into the POI table with a single INSERT ... SELECT.
+
+    Only the raw values are sent. The point geography and rating aggregates
+    are derived in PostgreSQL, so no model instances or GEOS objects are
+    created on the Python side.
+    """
+
+    def __init__(self, import_batch, source_file: str):
+        super().__init__(import_batch, source_file)
+        self.table = PointOfInterest._meta.db_table
+
+    def load(self, records: Union[List[Dict[str, Any]], ColumnarBatch]) -> LoadResult:
+        if not records:
+            return LoadResult(processed=0, skipped=0, failed=0)
+
+        with connection.cursor() as cursor:
+            self.prepare_staging(cursor)
+            self.copy_records(cursor, records)
+            cursor.execute(self.insert_sql(), [self.source_file, self.import_batch.pk])
+            inserted = cursor.rowcount
+
+        return LoadResult(processed=inserted, skipped=len(records) - inserted, failed=0)
+
+    def prepare_staging(self, cursor):
+        columns = ", ".join(f"{name} {db_type}" for name, db_type in STAGING_COLUMNS)
+        cursor.execute(f"CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} ({columns})")
+        cursor.execute(f"TRUNCATE {STAGING_TABLE}")
+
+    def copy_records(self, cursor, records: Union[List[Dict[str, Any]], ColumnarBatch]):
+        columns = ", ".join(name for name, _ in STAGING_COLUMNS)
+
+        with cursor.copy(f"COPY {STAGING_TABLE} ({columns}) FROM STDIN") as copy:
+            copy.set_types([db_type for _, db_type in STAGING_COLUMNS])
+            for row in iter_row_tuples(records):
+                copy.write_row(row)
+
+    def insert_sql(self) -> str:
+        return f"""
+            {self.insert_select_sql()}
+            ON CONFLICT (external_id) DO NOTHING
+        """
+
+    def insert_select_sql(self) -> str:
+        return f"""
+            INSERT INTO {self.table} (
+                created, last_updated, custom_field_data,
+                external_id, name, category, latitude, longitude, ratings, description,
+                {DERIVED_COLUMNS},
+                source_file, import_batch_id
+            )
+            SELECT
+                now(), now(), '{{}}'::jsonb,
+                external_id, name, category, latitude, longitude, ratings, description,
+                {derived_columns_sql()},
+                %s, %s
+            FROM {STAGING_TABLE}
+        """
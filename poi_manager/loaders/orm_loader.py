@@ -0,0 +1,59 @@
+from typing import Any, Dict, List
+import logging
+
+from django.contrib.gis.geos import Point
+
+from poi_manager.models import PointOfInterest
+from poi_manager.ratings import rating_histogram
+from .base import BaseLoader, LoadResult
+
+logger = logging.getLogger("poi_manager.loaders.orm")
+
+
+class ORMLoader(BaseLoader):
+    """
+    Builds one PointOfInterest instance per record and writes them with bulk_create.
+    """
+
+    def load(self, records: List[Dict[str, Any]]) -> LoadResult:
+        pois = []
+        failed = 0
+
+        for record in records:
+            try:
+                pois.append(self.build_instance(record))
+            except Exception as e:
+                logger.error(f"Error creating POI record: {e}")
+                failed += 1
+                # Counted through LoadResult.failed
+                self.errors.add(str(e), record, failed=0)
+
+        if pois:
+            PointOfInterest.objects.bulk_create(
+                pois, ignore_conflicts=True, batch_size=500
+            )
+
+        # Written in the transaction of the batch they belong to
+        self.errors.flush()
+
+        return LoadResult(processed=len(pois), skipped=0, failed=failed)
+
+    def build_instance(self, record: Dict[str, Any]) -> PointOfInterest:
+        avg_rating, rating_count = self.rating_stats(record["ratings"])
+
+        return PointOfInterest(
+            external_id=record["external_id"],
+            name=record["name"],
+            category=record["category"],
+            latitude=record["latitude"],
+            longitude=record["longitude"],
+            location=Point(record["longitude"], record["latitude"]),
+            ratings=record["ratings"],
+            avg_rating=avg_rating,
+            rating_count=rating_count,
+            rating_sum=sum(record["ratings"]),
+            rating_histogram=rating_histogram(record["ratings"]),
+            description=record.get("description", ""),
+            source_file=self.source_file,
+            import_batch=self.import_batch,
+        )
@@ -0,0 +1,48 @@
+import logging
+
+from django.db import connection
+
+from poi_manager.models import RatingEvent
+from poi_manager.ratings import ALL_RATINGS_SQL
+from .copy_loader import CopyLoader, DERIVED_COLUMNS, STAGING_TABLE, derived_columns_sql
+
+logger = logging.getLogger("poi_manager.loaders.reload")
+
+
+class ReloadLoader(CopyLoader):
+    """
+    Loads batches into the shadow table of a full reload.
+
+    POIs already in the live table keep their id, creation time, custom
+    field data and rating events; new POIs draw ids from the live table's
+    sequence, so ids stay unique once the shadow table is swapped in.
+    """
+
+    def __init__(self, import_batch, source_file: str, table: str):
+        super().__init__(import_batch, source_file)
+        self.live_table = self.table
+        self.table = table
+
+    def insert_select_sql(self) -> str:
+        ratings = ALL_RATINGS_SQL.format(
+            ratings="s.ratings",
+            events=connection.ops.quote_name(RatingEvent._meta.db_table),
+            poi_id="live.id",
+        )
+        return f"""
+            INSERT INTO {self.table} (
+                id, created, last_updated, custom_field_data,
+                external_id, name, category, latitude, longitude, ratings, description,
+                {DERIVED_COLUMNS},
+                source_file, import_batch_id
+            )
+            SELECT
+                COALESCE(live.id, nextval(pg_get_serial_sequence('{self.live_table}', 'id'))),
+                COALESCE(live.created, now()), now(),
+                COALESCE(live.custom_field_data, '{{}}'::jsonb),
+                s.external_id, s.name, s.category, s.latitude, s.longitude, s.ratings, s.description,
+                {derived_columns_sql("s.", ratings)},
+                %s, %s
+            FROM {STAGING_TABLE} s
+            LEFT JOIN {self.live_table} live ON live.external_id = s.external_id
+        """
@@ -0,0 +1,150 @@
+import hashlib
+import re
+from typing import List, Tuple
+import logging
+
+from django.db import connection, transaction
+
+from poi_manager.models import PointOfInterest
+
+logger = logging.getLogger("poi_manager.loaders.shadow")
+
+INDEX_DEFINITION = re.compile(r"^(CREATE (?:UNIQUE )?INDEX )(\S+)( ON (?:ONLY )?)(\S+)( .*)$", re.S)
+
+
+class ShadowTable:
+    """
+    Unlogged copy of the POI table for full reloads.
+
+    The shadow table starts with the columns, generated columns and check
+    constraints of the live table and only the unique constraints that ON
+    CONFLICT needs. The primary key, foreign keys and secondary indexes are
+    built once after the load. ``swap`` then replaces the live table in one
+    short transaction, so readers see the old data until the new data is
+    complete.
+    """
+
+    def __init__(self, model=PointOfInterest):
+        self.live = model._meta.db_table
+        self.name = f"{self.live}_reload"
+        self.constraints: List[Tuple[str, str]] = []
+        self.indexes: List[Tuple[str, str]] = []
+
+    def create(self):
+        with connection.cursor() as cursor:
+            self.check_references(cursor)
+            self.read_definitions(cursor)
+
+            cursor.execute(f"DROP TABLE IF EXISTS {self.quote(self.name)}")
+            cursor.execute(
+                f"CREATE UNLOGGED TABLE {self.quote(self.name)} "
+                f"(LIKE {self.quote(self.live)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED)"
+            )
+            for name, definition in self.constraints:
+                if definition.startswith("UNIQUE"):
+                    self.add_constraint(cursor, name, definition)
+
+        logger.info(f"Created shadow table {self.name}")
+
+    def finish(self):
+        """Make the loaded table crash safe and build its constraints and indexes."""
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {self.quote(self.name)} SET LOGGED")
+
+            for name, definition in self.constraints:
+                if not definition.startswith("UNIQUE"):
+                    self.add_constraint(cursor, name, definition)
+
+            for name, definition in self.indexes:
+                match = INDEX_DEFINITION.match(definition)
+                cursor.execute(
+                    match.group(1)
+                    + self.quote(self.temporary_name(name))
+                    + match.group(3)
+                    + self.quote(self.name)
+                    + match.group(5)
+                )
+
+            cursor.execute(f"ANALYZE {self.quote(self.name)}")
+
+        logger.info(f"Built {len(self.constraints)} constraints and {len(self.indexes)} indexes on {self.name}")
+
+    def swap(self):
+        """Replace the live table with the shadow table, keeping all names."""
+        live = self.quote(self.live)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {live} IN ACCESS EXCLUSIVE MODE")
+            cursor.execute(f"DROP TABLE {live}")
+            cursor.execute(f"ALTER TABLE {self.quote(self.name)} RENAME TO {live}")
+
+            for name, _ in self.constraints:
+                cursor.execute(
+                    f"ALTER TABLE {live} RENAME CONSTRAINT "
+                    f"{self.quote(self.temporary_name(name))} TO {self.quote(name)}"
+                )
+            for name, _ in self.indexes:
+                cursor.execute(f"ALTER INDEX {self.quote(self.temporary_name(name))} RENAME TO {self.quote(name)}")
+
+            # The identity sequence was dropped with the old table; ids loaded
+            # into the shadow table were drawn from it, so continue after them.
+            cursor.execute(f"ALTER TABLE {live} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY")
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(max(id), 0) + 1, false) FROM {live}",
+                [self.live],
+            )
+
+        logger.info(f"Swapped {self.name} in as {self.live}")
+
+    def drop(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {self.quote(self.name)}")
+
+    def check_references(self, cursor):
+        cursor.execute(
+            "SELECT conrelid::regclass::text FROM pg_constraint "
+            "WHERE confrelid = %s::regclass AND contype = 'f' AND conrelid <> confrelid",
+            [self.live],
+        )
+        referencing = [row[0] for row in cursor.fetchall()]
+        if referencing:
+            raise RuntimeError(
+                f"Cannot swap {self.live}, it is referenced by foreign keys from {', '.join(referencing)}"
+            )
+
+    def read_definitions(self, cursor):
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f', 'x') ORDER BY conname",
+            [self.live],
+        )
+        self.constraints = cursor.fetchall()
+
+        # Indexes backing a constraint are recreated with the constraint
+        cursor.execute(
+            """
+            SELECT c.relname, pg_get_indexdef(i.indexrelid)
+            FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = %s::regclass
+              AND NOT EXISTS (
+                  SELECT 1 FROM pg_constraint k
+                  WHERE k.conrelid = i.indrelid AND k.conindid = i.indexrelid
+              )
+            ORDER BY c.relname
+            """,
+            [self.live],
+        )
+        self.indexes = cursor.fetchall()
+
+    def add_constraint(self, cursor, name: str, definition: str):
+        cursor.execute(
+            f"ALTER TABLE {self.quote(self.name)} ADD CONSTRAINT "
+            f"{self.quote(self.temporary_name(name))} {definition}"
+        )
+
+    def temporary_name(self, name: str) -> str:
+        """Index and constraint names are unique per schema while both tables exist."""
+        return f"reload_{hashlib.md5(name.encode()).hexdigest()[:16]}"
+
+    def quote(self, name: str) -> str:
+        return connection.ops.quote_name(name)
@@ -0,0 +1,128 @@
+from typing import Any, Dict, List, Union
+import logging
+
+from django.db import connection
+
+from poi_manager.models import PointOfInterest, RatingEvent
+from poi_manager.models.poi import LOCATION_GEOMETRY_SQL
+from poi_manager.parsers.columnar import ColumnarBatch
+from poi_manager.ratings import ALL_RATINGS_SQL, rating_columns_sql
+from poi_manager.signals import POIState, pois_changed
+from .base import LoadResult
+from .copy_loader import STAGING_TABLE, CopyLoader
+
+logger = logging.getLogger("poi_manager.loaders.upsert")
+
+UPDATED_COLUMNS = (
+    "name",
+    "category",
+    "location",
+    "latitude",
+    "longitude",
+    "ratings",
+    "avg_rating",
+    "rating_count",
+    "rating_sum",
+    "rating_histogram",
+    "description",
+    "source_file",
+    "import_batch_id",
+)
+
+COMPARED_COLUMNS = ("name", "category", "latitude", "longitude", "ratings", "description")
+
+
+class UpsertLoader(CopyLoader):
+    """
+    Merges a whole batch into the POI table with one
+    INSERT ... ON CONFLICT (external_id) DO UPDATE statement.
+
+    Rows whose data did not change are left untouched and reported as skipped.
+    The rating aggregates of updated rows cover the incoming ratings and the
+    rating events added since the POI was imported. POIs moved to another
+    location are reported through the pois_changed signal, as the import
+    extent only covers where they are now.
+    """
+
+    def load(self, records: Union[List[Dict[str, Any]], ColumnarBatch]) -> LoadResult:
+        if not records:
+            return LoadResult(processed=0, skipped=0, failed=0)
+
+        # ON CONFLICT DO UPDATE cannot touch the same row twice in one statement,
+        # so only the last occurrence of a repeated external_id is kept.
+        if isinstance(records, ColumnarBatch):
+            last_index = {external_id: i for i, external_id in enumerate(records.external_id)}
+            unique_records = records.take(sorted(last_index.values()))
+        else:
+            unique_records = list({r["external_id"]: r for r in records}.values())
+
+        with connection.cursor() as cursor:
+            self.prepare_staging(cursor)
+            self.copy_records(cursor, unique_records)
+            cursor.execute(self.upsert_sql(), [self.source_file, self.import_batch.pk])
+            inserted, updated, moved = cursor.fetchone()
+
+        if moved:
+            pois_changed.send(
+                sender=PointOfInterest,
+                removed=[POIState(*states[:4]) for states in moved],
+                added=[POIState(*states[4:]) for states in moved],
+            )
+
+        logger.info(
+            f"Upserted batch: {inserted} inserted, {updated} updated, "
+            f"{len(records) - inserted - updated} unchanged"
+        )
+
+        return LoadResult(
+            processed=inserted + updated,
+            skipped=len(records) - inserted - updated,
+            failed=0,
+            updated=updated,
+        )
+
+    def upsert_sql(self) -> str:
+        ratings = ALL_RATINGS_SQL.format(
+            ratings="EXCLUDED.ratings",
+            events=connection.ops.quote_name(RatingEvent._meta.db_table),
+            poi_id=f"{self.table}.id",
+        )
+        rating_columns = rating_columns_sql(ratings)
+        assignments = ", ".join(
+            f"{column} = {rating_columns.get(column, f'EXCLUDED.{column}')}" for column in UPDATED_COLUMNS
+        )
+        current = ", ".join(f"{self.table}.{column}" for column in COMPARED_COLUMNS)
+        incoming = ", ".join(f"EXCLUDED.{column}" for column in COMPARED_COLUMNS)
+
+        # The other CTEs see the POI table as it was before the upsert
+        return f"""
+            WITH moved AS (
+                SELECT p.id, ST_X(p.{LOCATION_GEOMETRY_SQL}) AS longitude, ST_Y(p.{LOCATION_GEOMETRY_SQL}) AS latitude,
+                       p.rating_sum, p.rating_count
+                FROM {self.table} AS p
+                JOIN {STAGING_TABLE} AS s USING (external_id)
+                WHERE (p.latitude, p.longitude)
+                    IS DISTINCT FROM (s.latitude::numeric(10, 7), s.longitude::numeric(10, 7))
+            ),
+            upserted AS (
+                {self.insert_select_sql()}
+                ON CONFLICT (external_id) DO UPDATE SET
+                    last_updated = now(), {assignments}
+                WHERE ({current}) IS DISTINCT FROM ({incoming})
+                RETURNING id, (xmax = 0) AS inserted,
+                    ST_X({LOCATION_GEOMETRY_SQL}) AS longitude, ST_Y({LOCATION_GEOMETRY_SQL}) AS latitude,
+                    rating_sum, rating_count
+            )
+            SELECT
+                count(*) FILTER (WHERE inserted),
+                count(*) FILTER (WHERE NOT inserted),
+                (
+                    SELECT json_agg(json_build_array(
+                        m.longitude, m.latitude, m.rating_sum, m.rating_count,
+                        u.longitude, u.latitude, u.rating_sum, u.rating_count
+                    ))
+                    FROM moved AS m
+                    JOIN upserted AS u USING (id)
+                )
+            FROM upserted
+        """
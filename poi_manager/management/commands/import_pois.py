@@ -6,11 +6,18 @@ from django.db import transaction, connection
 from django.utils import timezone
 import django_rq
 
-from poi_manager.models import PointOfInterest, ImportBatch
-from poi_manager.parsers.csv_parser import CSVParser
-from poi_manager.parsers.json_parser import JSONParser
-from poi_manager.parsers.xml_parser import XMLParser
-from poi_manager.jobs import import_poi_file_async
+from poi_manager.models import PointOfInterest, ImportBatch, RatingEvent
+from poi_manager.models.poi import invalidate_poi_cache
+from poi_manager.loaders import LOADER_CLASSES, ReloadLoader, ShadowTable, get_loader_class
+from poi_manager.parsers import get_parser_class
+from poi_manager.jobs import (
+    CHECKPOINT_FIELDS,
+    checkpoint_options,
+    enqueue_import,
+)
+from poi_manager.pipeline import pipelined
+from poi_manager.progress import ImportProgress
+from poi_manager.signals import import_completed
 from poi_manager.utils import get_file_type, format_duration
 
 import logging
@@ -19,7 +26,7 @@ logger = logging.getLogger("poi_manager.import")
 
 
 class Command(BaseCommand):
-    help = "Import Point of Interest data from CSV, JSON, or XML files"
+    help = "Import Point of Interest data from CSV, JSON, XML or Parquet files"
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -46,6 +53,14 @@ class Command(BaseCommand):
             help="Clear all existing POI data before import",
         )
 
+        parser.add_argument(
+            "--full-reload",
+            action="store_true",
+            help="Replace all POIs with the contents of the given files: load them into an "
+            "unlogged shadow table, build its indexes once and swap it in. The current "
+            "POIs stay readable until the swap",
+        )
+
         parser.add_argument(
             "--dry-run",
             action="store_true",
@@ -62,7 +77,52 @@ class Command(BaseCommand):
         parser.add_argument(
             "--update-existing",
             action="store_true",
-            help="Update existing records instead of skipping",
+            help="Update existing records instead of skipping, merging each batch "
+            "with a single INSERT ... ON CONFLICT statement",
+        )
+
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of worker processes used to parse CSV, JSON Lines and XML files (default: 1)",
+        )
+
+        parser.add_argument(
+            "--unordered",
+            action="store_true",
+            help="With --workers, load batches as soon as any worker finishes "
+            "instead of in file order",
+        )
+
+        parser.add_argument(
+            "--columnar",
+            action="store_true",
+            help="Have parsers emit column-oriented batches instead of one dict per record",
+        )
+
+        parser.add_argument(
+            "--pipeline-depth",
+            type=int,
+            default=2,
+            help="Number of parsed batches buffered while the previous batch is "
+            "written; parsing runs in a background thread (0 disables, default: 2)",
+        )
+
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=64,
+            help="With --async, split CSV, JSON Lines and XML files larger than this many MB "
+            "into chunks imported by separate jobs (0 disables, default: 64)",
+        )
+
+        parser.add_argument(
+            "--loader",
+            choices=sorted(LOADER_CLASSES),
+            default="copy",
+            help="Database loader backend: 'copy' streams batches with PostgreSQL COPY and "
+            "derives locations and rating aggregates in SQL, 'orm' uses bulk_create (default: copy)",
         )
 
     def handle(self, *args, **options):
@@ -71,6 +131,7 @@ class Command(BaseCommand):
         batch_size = options.get("batch_size", 1000)
         clear_existing = options.get("clear", False)
         dry_run = options.get("dry_run", False)
+        full_reload = options.get("full_reload", False)
 
         for file_path in files:
             if not os.path.exists(file_path):
@@ -80,9 +141,14 @@ class Command(BaseCommand):
             if not file_type:
                 raise CommandError(f"Unsupported file type: {file_path}")
 
-        if clear_existing and not dry_run:
+        if full_reload and (run_async or dry_run or options.get("update_existing")):
+            raise CommandError("--full-reload cannot be combined with --async, --dry-run or --update-existing")
+
+        if clear_existing and not dry_run and not full_reload:
             self.stdout.write("Clearing existing POI data...")
-            count = PointOfInterest.objects.all().delete()[0]
+            count = self.clear_pois()
+            invalidate_poi_cache(sender=PointOfInterest, instance=None)
+            import_completed.send(sender=ImportBatch, import_batch=None)
             self.stdout.write(
                 self.style.SUCCESS(f"Deleted {count} existing POI records")
             )
@@ -96,6 +162,12 @@ class Command(BaseCommand):
         total_start = time.time()
         total_processed = 0
         total_failed = 0
+        files_failed = 0
+
+        shadow = None
+        if options.get("full_reload"):
+            shadow = ShadowTable()
+            shadow.create()
 
         for file_path in files:
             self.stdout.write(f"\nProcessing: {file_path}")
@@ -109,7 +181,7 @@ class Command(BaseCommand):
                     status="processing",
                 )
 
-                processed, failed = self.process_file(file_path, batch, options)
+                processed, failed = self.process_file(file_path, batch, options, shadow)
 
                 total_processed += processed
                 total_failed += failed
@@ -124,6 +196,7 @@ class Command(BaseCommand):
                 )
 
             except Exception as e:
+                files_failed += 1
                 self.stdout.write(
                     self.style.ERROR(f"✗ Error processing {file_path}: {e}")
                 )
@@ -132,6 +205,9 @@ class Command(BaseCommand):
                     batch.add_error(str(e))
                     batch.save()
 
+        if shadow is not None:
+            self.finish_full_reload(shadow, files_failed)
+
         duration = time.time() - total_start
         self.stdout.write("\n" + "=" * 50)
         self.stdout.write(
@@ -143,6 +219,51 @@ class Command(BaseCommand):
             )
         )
 
+    def finish_full_reload(self, shadow, files_failed):
+        if files_failed:
+            shadow.drop()
+            raise CommandError(
+                f"Full reload aborted, {files_failed} file(s) failed to import. "
+                f"The existing POIs were left unchanged."
+            )
+
+        self.stdout.write("\nBuilding indexes and swapping in the reloaded table...")
+        try:
+            shadow.finish()
+            with transaction.atomic():
+                shadow.swap()
+                # Ids of POIs missing from the reload may be drawn again
+                self.delete_orphaned_rating_events()
+        except Exception:
+            shadow.drop()
+            raise
+
+        # Bulk loading bypasses the per-row cache invalidation signals
+        invalidate_poi_cache(sender=PointOfInterest, instance=None)
+        import_completed.send(sender=ImportBatch, import_batch=None)
+        self.stdout.write(self.style.SUCCESS("✓ Replaced all POIs"))
+
+    def clear_pois(self) -> int:
+        """
+        Delete all POIs and their rating events with TRUNCATE rather than one
+        delete signal per POI; import_completed then rebuilds the pyramid.
+        """
+        events = connection.ops.quote_name(RatingEvent._meta.db_table)
+        pois = connection.ops.quote_name(PointOfInterest._meta.db_table)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {pois}")
+            count = cursor.fetchone()[0]
+            cursor.execute(f"TRUNCATE {pois}, {events}")
+        return count
+
+    def delete_orphaned_rating_events(self):
+        events = connection.ops.quote_name(RatingEvent._meta.db_table)
+        pois = connection.ops.quote_name(PointOfInterest._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {events} e WHERE NOT EXISTS (SELECT 1 FROM {pois} p WHERE p.id = e.poi_id)"
+            )
+
     def handle_async(self, files, options):
         queue = django_rq.get_queue("default")
         jobs = []
@@ -156,15 +277,16 @@ class Command(BaseCommand):
                 status="pending",
             )
 
-            job = queue.enqueue(import_poi_file_async, batch.id, file_path, options)
+            job, chunks = enqueue_import(queue, batch, file_path, options)
 
             batch.job_id = job.id
             batch.save()
 
             jobs.append((batch, job))
 
+            chunk_note = f", split into {chunks} chunk jobs" if chunks > 1 else ""
             self.stdout.write(
-                f"Queued: {os.path.basename(file_path)} " f"(Job ID: {job.id})"
+                f"Queued: {os.path.basename(file_path)} " f"(Job ID: {job.id}{chunk_note})"
             )
 
         self.stdout.write(
@@ -174,28 +296,48 @@ class Command(BaseCommand):
             )
         )
 
-    def process_file(self, file_path, batch, options):
+    def process_file(self, file_path, batch, options, shadow=None):
         file_type = get_file_type(file_path)
         batch_size = options.get("batch_size", 1000)
         dry_run = options.get("dry_run", False)
         update_existing = options.get("update_existing", False)
 
-        parser_class = {
-            "csv": CSVParser,
-            "json": JSONParser,
-            "xml": XMLParser,
-        }.get(file_type)
-
-        if not parser_class:
+        try:
+            parser_class = get_parser_class(file_type)
+        except ValueError:
             raise CommandError(f"No parser available for {file_type}")
 
-        parser = parser_class(file_path, batch_size)
+        parser = parser_class(
+            file_path,
+            batch_size,
+            workers=options.get("workers", 1),
+            ordered=not options.get("unordered", False),
+            columnar=options.get("columnar", False),
+        )
+
+        if shadow is not None:
+            loader = ReloadLoader(batch, os.path.basename(file_path), shadow.name)
+        else:
+            loader_class = get_loader_class(options.get("loader", "copy"), update_existing)
+            loader = loader_class(batch, os.path.basename(file_path))
 
         processed = 0
         failed = 0
         skipped = 0
 
-        for batch_data in parser.parse():
+        progress = ImportProgress(batch.id)
+        progress.start(batch.file_size)
+
+        batch.checkpoint = {"options": checkpoint_options(options)}
+        batches = pipelined(parser.parse(), options.get("pipeline_depth", 2))
+
+        for batch_num, batch_data in enumerate(batches, 1):
+            position = parser.positions.popleft() if parser.positions else None
+            if shadow is not None:
+                # The shadow table does not outlive the command, so a retry
+                # must import the whole file again
+                position = None
+
             if dry_run:
                 processed += len(batch_data)
                 self.stdout.write(f"  [DRY RUN] Would import {len(batch_data)} records")
@@ -203,77 +345,37 @@ class Command(BaseCommand):
 
             try:
                 with transaction.atomic():
-                    pois = []
-
-                    for record in batch_data:
-                        try:
-                            if update_existing:
-                                poi, created = PointOfInterest.objects.update_or_create(
-                                    external_id=record["external_id"],
-                                    defaults={
-                                        "name": record["name"],
-                                        "category": record["category"],
-                                        "latitude": record["latitude"],
-                                        "longitude": record["longitude"],
-                                        "ratings": record["ratings"],
-                                        "description": record.get("description", ""),
-                                        "source_file": os.path.basename(file_path),
-                                        "import_batch": batch,
-                                    },
-                                )
-                                if not created:
-                                    skipped += 1
-                            else:
-                                from django.contrib.gis.geos import Point
-
-                                ratings_list = record["ratings"]
-                                avg_rating = None
-                                rating_count = 0
-                                if ratings_list and len(ratings_list) > 0:
-                                    avg_rating = sum(ratings_list) / len(ratings_list)
-                                    rating_count = len(ratings_list)
-                                
-                                poi = PointOfInterest(
-                                    external_id=record["external_id"],
-                                    name=record["name"],
-                                    category=record["category"],
-                                    latitude=record["latitude"],
-                                    longitude=record["longitude"],
-                                    location=Point(
-                                        record["longitude"], record["latitude"]
-                                    ),
-                                    ratings=record["ratings"],
-                                    avg_rating=avg_rating,
-                                    rating_count=rating_count,
-                                    description=record.get("description", ""),
-                                    source_file=os.path.basename(file_path),
-                                    import_batch=batch,
-                                )
-                                pois.append(poi)
-
-                            processed += 1
-
-                        except Exception as e:
-                            logger.error(f"Error creating POI record: {e}")
-                            failed += 1
-                            batch.add_error(str(e), record)
-
-                    if pois and not update_existing:
-                        PointOfInterest.objects.bulk_create(
-                            pois, ignore_conflicts=True, batch_size=500
-                        )
+                    result = loader.load(batch_data)
+                    processed += result.processed
+                    failed += result.failed
+                    skipped += result.skipped
 
                     batch.records_processed = processed
                     batch.records_failed = failed
                     batch.records_skipped = skipped
-                    batch.save()
-
-                    if processed % 10000 == 0:
-                        self.stdout.write(f"  Processed {processed} records...")
+                    batch.set_checkpoint(batch_num, position)
+                    batch.save(update_fields=CHECKPOINT_FIELDS)
+
+                progress.add(
+                    parsed=len(batch_data),
+                    written=result.processed,
+                    failed=result.failed,
+                    skipped=result.skipped,
+                    bytes_consumed=parser.bytes_consumed,
+                )
+                if processed % 10000 == 0:
+                    self.stdout.write(f"  Processed {processed} records...")
 
             except Exception as e:
                 logger.error(f"Batch processing error: {e}")
                 batch.add_error(f"Batch error: {e}")
                 failed += len(batch_data)
-
+                progress.add(parsed=len(batch_data), failed=len(batch_data))
+
+        batch.records_processed = processed
+        batch.records_failed = failed
+        batch.records_skipped = skipped
+        batch.uncompressed_size = parser.uncompressed_size
+        progress.add(bytes_consumed=batch.file_size)
+        progress.finish("partial" if failed else "completed")
         return processed, failed
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from poi_manager.clusters import MAX_CLUSTER_LEVEL, rebuild_clusters
+from poi_manager.models import POIClusterCell
+from poi_manager.utils import format_duration
+
+
+class Command(BaseCommand):
+    help = "Rebuild the POI cluster pyramid from all POIs"
+
+    def handle(self, *args, **options):
+        started = time.time()
+        rebuild_clusters()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Rebuilt {POIClusterCell.objects.count()} cluster cells on {MAX_CLUSTER_LEVEL + 1} levels '
+                f'in {format_duration(time.time() - started)}'
+            )
+        )
@@ -1,6 +1,37 @@
-from django.core.management.base import BaseCommand
-from django.db import transaction
-from poi_manager.models import PointOfInterest
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from poi_manager.models import PointOfInterest, RatingEvent
+from poi_manager.ratings import (
+    ALL_RATINGS_SQL,
+    AVG_RATING_SQL,
+    RATING_COUNT_SQL,
+    RATING_HISTOGRAM_SQL,
+    RATING_SUM_SQL,
+)
+from poi_manager.utils import format_duration
+
+# The imported ratings array followed by the POI's rating events
+RATINGS_SQL = ALL_RATINGS_SQL.format(
+    ratings='ratings',
+    events=RatingEvent._meta.db_table,
+    poi_id=f'{PointOfInterest._meta.db_table}.id',
+)
+
+# Rating columns and the SQL deriving them from all ratings
+DERIVED_COLUMNS = {
+    name: sql.format(ratings=RATINGS_SQL)
+    for name, sql in (
+        ('avg_rating', AVG_RATING_SQL),
+        ('rating_count', RATING_COUNT_SQL),
+        ('rating_sum', RATING_SUM_SQL),
+        ('rating_histogram', RATING_HISTOGRAM_SQL),
+    )
+}
 
 
 class Command(BaseCommand):
@@ -10,8 +41,21 @@ class Command(BaseCommand):
         parser.add_argument(
             '--batch-size',
             type=int,
-            default=1000,
-            help='Number of records to process in each batch'
+            default=10000,
+            help='Number of rows covered by each UPDATE statement (default: 10000)'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            dest='recalculate_all',
+            help='Recompute every POI instead of only those with uncalculated ratings; '
+                 'rows whose values are already correct are not rewritten'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of database connections updating disjoint id ranges in parallel (default: 1)'
         )
         parser.add_argument(
             '--dry-run',
@@ -20,61 +64,137 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
-        batch_size = options['batch_size']
-        dry_run = options['dry_run']
-        
-        pois_to_update = PointOfInterest.objects.filter(
-            ratings__isnull=False
-        ).exclude(
-            ratings=[]
-        ).filter(
-            avg_rating__isnull=True
-        )
-        
-        total = pois_to_update.count()
-        self.stdout.write(f"Found {total} POIs with uncalculated ratings")
-        
-        if dry_run:
-            self.stdout.write("DRY RUN - No changes will be made")
-            sample = pois_to_update[:5]
-            for poi in sample:
-                if poi.ratings:
-                    avg = sum(poi.ratings) / len(poi.ratings)
-                    count = len(poi.ratings)
-                    self.stdout.write(
-                        f"  Would update {poi.external_id}: "
-                        f"avg={avg:.2f}, count={count}"
-                    )
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--batch-size and --workers must be positive')
+
+        self.table = connection.ops.quote_name(PointOfInterest._meta.db_table)
+        self.batch_size = options['batch_size']
+        self.condition = self.stale_condition(options['recalculate_all'])
+
+        if options['dry_run']:
+            self.dry_run()
+            return
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT min(id), max(id) FROM {self.table}')
+            min_id, max_id = cursor.fetchone()
+
+        if min_id is None:
+            self.stdout.write('No POIs found')
             return
-        
-        updated = 0
-        
-        for i in range(0, total, batch_size):
-            batch = pois_to_update[i:i+batch_size]
-            
-            with transaction.atomic():
-                for poi in batch:
-                    if poi.ratings:
-                        poi.avg_rating = sum(poi.ratings) / len(poi.ratings)
-                        poi.rating_count = len(poi.ratings)
-                        poi.save(update_fields=['avg_rating', 'rating_count'])
-                        updated += 1
-            
-            if updated % 10000 == 0:
-                self.stdout.write(f"Processed {updated}/{total} POIs...")
-        
+
+        self.id_span = max_id - min_id + 1
+        self.scanned = 0
+        self.updated = 0
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+        # Ranges are (start, end]: the first starts just below the lowest id
+        ranges = self.split_id_range(min_id - 1, max_id, options['workers'])
+
+        if len(ranges) == 1:
+            self.recalculate_range(*ranges[0])
+        else:
+            self.stdout.write(f'Updating {len(ranges)} id ranges in parallel')
+            with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+                futures = [executor.submit(self.recalculate_range_in_thread, start, end) for start, end in ranges]
+                for future in futures:
+                    future.result()
+
         self.stdout.write(
             self.style.SUCCESS(
-                f"Successfully updated {updated} POIs with calculated ratings"
+                f'Successfully updated {self.updated} POIs with calculated ratings '
+                f'in {format_duration(time.time() - self.started)}'
             )
         )
-        
+
         sample_pois = PointOfInterest.objects.filter(
             avg_rating__isnull=False
         )[:5]
-        
-        self.stdout.write("\nSample updated POIs:")
+
+        self.stdout.write('\nSample updated POIs:')
         for poi in sample_pois:
             self.stdout.write(
-                f"  {poi.name}: avg={poi.avg_rating:.2f}, count={poi.rating_count}"
-            )
\ No newline at end of file
+                f'  {poi.name}: avg={poi.avg_rating:.2f}, count={poi.rating_count}'
+            )
+
+    def stale_condition(self, recalculate_all):
+        if recalculate_all:
+            return (
+                f'({", ".join(DERIVED_COLUMNS)}) IS DISTINCT FROM '
+                f'({", ".join(DERIVED_COLUMNS.values())})'
+            )
+        return 'avg_rating IS NULL AND cardinality(ratings) > 0'
+
+    def split_id_range(self, start, end, parts):
+        step = -(-(end - start) // parts)
+        return [
+            (lower, min(lower + step, end))
+            for lower in range(start, end, step)
+        ]
+
+    def recalculate_range_in_thread(self, start, end):
+        # Each thread uses its own connection, which must not outlive it
+        try:
+            self.recalculate_range(start, end)
+        finally:
+            connection.close()
+
+    def recalculate_range(self, start, end):
+        """
+        Walk ``(start, end]`` in keyset-paginated slices of ``batch_size``
+        rows, updating each slice with one statement. Every statement commits
+        on its own, so locks are held briefly and progress survives an abort.
+        """
+        assignments = ', '.join(f'{name} = {sql}' for name, sql in DERIVED_COLUMNS.items())
+        update_sql = f'''
+            UPDATE {self.table}
+            SET {assignments}
+            WHERE id > %s AND id <= %s AND {self.condition}
+        '''
+
+        last_id = start
+        while last_id < end:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT id FROM {self.table} WHERE id > %s AND id <= %s ORDER BY id OFFSET %s LIMIT 1',
+                    [last_id, end, self.batch_size - 1],
+                )
+                row = cursor.fetchone()
+                upper = row[0] if row else end
+
+                cursor.execute(update_sql, [last_id, upper])
+                self.report_progress(upper - last_id, cursor.rowcount)
+
+            last_id = upper
+
+    def report_progress(self, scanned, updated):
+        with self.lock:
+            self.scanned += scanned
+            self.updated += updated
+            self.stdout.write(
+                f'Updated {self.updated} POIs, scanned {self.scanned / self.id_span:.1%} '
+                f'of the id range in {format_duration(time.time() - self.started)}...'
+            )
+
+    def dry_run(self):
+        self.stdout.write('DRY RUN - No changes will be made')
+
+        avg_rating = DERIVED_COLUMNS['avg_rating']
+        rating_count = DERIVED_COLUMNS['rating_count']
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {self.table} WHERE {self.condition}')
+            total = cursor.fetchone()[0]
+            self.stdout.write(f'Found {total} POIs with uncalculated or outdated ratings')
+
+            cursor.execute(
+                f'SELECT external_id, {avg_rating}, {rating_count} FROM {self.table} '
+                f'WHERE {self.condition} ORDER BY id LIMIT 5'
+            )
+            for external_id, avg, count in cursor.fetchall():
+                avg_display = f'{avg:.2f}' if avg is not None else '-'
+                self.stdout.write(
+                    f'  Would update {external_id}: '
+                    f'avg={avg_display}, count={count}'
+                )
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('poi_manager', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importbatch',
+            name='uncompressed_size',
+            field=models.BigIntegerField(
+                blank=True,
+                help_text='Bytes parsed after decompression; equals the file size for uncompressed files',
+                null=True,
+                verbose_name='Uncompressed Size (bytes)',
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('poi_manager', '0002_importbatch_uncompressed_size'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importbatch',
+            name='file_type',
+            field=models.CharField(
+                choices=[('csv', 'CSV'), ('json', 'JSON'), ('xml', 'XML'), ('parquet', 'Parquet')],
+                max_length=10,
+                verbose_name='File Type',
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('poi_manager', '0003_alter_importbatch_file_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importbatch',
+            name='checkpoint',
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text='Last committed batch and source record position, used to resume the import',
+                verbose_name='Checkpoint',
+            ),
+        ),
+    ]
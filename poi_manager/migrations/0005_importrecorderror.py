@@ -0,0 +1,45 @@
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('poi_manager', '0004_importbatch_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportRecordError',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Created')),
+                ('message', models.TextField(verbose_name='Message')),
+                (
+                    'record',
+                    models.JSONField(
+                        blank=True,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        null=True,
+                        verbose_name='Record',
+                    ),
+                ),
+                (
+                    'import_batch',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='record_errors',
+                        to='poi_manager.importbatch',
+                        verbose_name='Import Batch',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Import Record Error',
+                'verbose_name_plural': 'Import Record Errors',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['import_batch', 'id'], name='poi_manager_import__38b16b_idx')],
+            },
+        ),
+    ]
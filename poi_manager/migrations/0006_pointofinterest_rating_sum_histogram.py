@@ -0,0 +1,44 @@
+import django.contrib.postgres.fields
+import poi_manager.ratings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('poi_manager', '0005_importrecorderror'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pointofinterest',
+            name='rating_sum',
+            field=models.FloatField(default=0, help_text='Running sum of all ratings', verbose_name='Rating Sum'),
+        ),
+        migrations.AddField(
+            model_name='pointofinterest',
+            name='rating_histogram',
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.IntegerField(),
+                default=poi_manager.ratings.empty_histogram,
+                help_text='Number of ratings per whole star, from 0 to 5',
+                size=6,
+                verbose_name='Rating Histogram',
+            ),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE poi_manager_pointofinterest
+            SET rating_sum = COALESCE((SELECT sum(rating) FROM unnest(ratings) AS rating), 0),
+                rating_histogram = ARRAY(
+                    SELECT count(rating)
+                    FROM generate_series(0, 5) AS star
+                    LEFT JOIN unnest(ratings) AS rating
+                        ON LEAST(GREATEST(floor(rating + 0.5)::int, 0), 5) = star
+                    GROUP BY star
+                    ORDER BY star
+                )::int[]
+            WHERE cardinality(ratings) > 0
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
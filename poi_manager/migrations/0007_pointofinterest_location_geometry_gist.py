@@ -0,0 +1,22 @@
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('poi_manager', '0006_pointofinterest_rating_sum_histogram'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pointofinterest',
+            index=django.contrib.postgres.indexes.GistIndex(
+                django.db.models.functions.comparison.Cast(
+                    'location', output_field=django.contrib.gis.db.models.fields.PointField(srid=4326)
+                ),
+                name='poi_location_geometry_gist',
+            ),
+        ),
+    ]
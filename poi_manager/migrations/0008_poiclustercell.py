@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('poi_manager', '0007_pointofinterest_location_geometry_gist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='POIClusterCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.SmallIntegerField(verbose_name='Level')),
+                ('x', models.IntegerField(verbose_name='X')),
+                ('y', models.IntegerField(verbose_name='Y')),
+                ('count', models.IntegerField(help_text='Number of POIs in the cell', verbose_name='Count')),
+                ('longitude_sum', models.FloatField(verbose_name='Longitude Sum')),
+                ('latitude_sum', models.FloatField(verbose_name='Latitude Sum')),
+                ('rating_sum', models.FloatField(help_text='Sum of all ratings in the cell', verbose_name='Rating Sum')),
+                ('rating_count', models.BigIntegerField(help_text='Number of ratings in the cell', verbose_name='Rating Count')),
+            ],
+            options={
+                'verbose_name': 'POI Cluster Cell',
+                'verbose_name_plural': 'POI Cluster Cells',
+                'constraints': [
+                    models.UniqueConstraint(fields=('level', 'x', 'y'), name='poi_cluster_cell_level_x_y'),
+                ],
+            },
+        ),
+    ]
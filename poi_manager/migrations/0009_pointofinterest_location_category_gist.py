@@ -0,0 +1,27 @@
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('poi_manager', '0008_poiclustercell'),
+    ]
+
+    operations = [
+        # GiST operator classes for the category column
+        BtreeGistExtension(),
+        migrations.AddIndex(
+            model_name='pointofinterest',
+            index=django.contrib.postgres.indexes.GistIndex(
+                django.db.models.functions.comparison.Cast(
+                    'location', output_field=django.contrib.gis.db.models.fields.PointField(srid=4326)
+                ),
+                django.db.models.functions.text.Upper('category'),
+                name='poi_location_category_gist',
+            ),
+        ),
+    ]
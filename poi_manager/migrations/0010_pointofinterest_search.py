@@ -0,0 +1,39 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('poi_manager', '0009_pointofinterest_location_category_gist'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='pointofinterest',
+            name='search_vector',
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.contrib.postgres.search.SearchVector('name', config='english', weight='A')
+                + django.contrib.postgres.search.SearchVector('description', config='english', weight='B'),
+                output_field=django.contrib.postgres.search.SearchVectorField(),
+                verbose_name='Search Vector',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='pointofinterest',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='poi_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='pointofinterest',
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'
+                ),
+                name='poi_name_trgm_gin',
+            ),
+        ),
+    ]
@@ -0,0 +1,57 @@
+import django.contrib.postgres.fields
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('poi_manager', '0010_pointofinterest_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('rating', models.FloatField(
+                    validators=[
+                        django.core.validators.MinValueValidator(0),
+                        django.core.validators.MaxValueValidator(5),
+                    ],
+                    verbose_name='Rating',
+                )),
+                ('created', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Created')),
+                ('poi', models.ForeignKey(
+                    db_constraint=False,
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='rating_events',
+                    to='poi_manager.pointofinterest',
+                    verbose_name='Point of Interest',
+                )),
+            ],
+            options={
+                'verbose_name': 'Rating Event',
+                'verbose_name_plural': 'Rating Events',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='pointofinterest',
+            name='ratings',
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.FloatField(
+                    validators=[
+                        django.core.validators.MinValueValidator(0),
+                        django.core.validators.MaxValueValidator(5),
+                    ]
+                ),
+                blank=True,
+                default=list,
+                help_text='Ratings from the source file; ratings added later are kept as rating events',
+                size=None,
+                verbose_name='Ratings',
+            ),
+        ),
+    ]
@@ -1,2 +1,5 @@
 from .poi import *
 from .import_batch import *
+from .import_record_error import *
+from .poi_cluster_cell import *
+from .rating_event import *
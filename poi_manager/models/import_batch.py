@@ -1,6 +1,10 @@
 import uuid
-from django.db import models
+from django.db import connection, models
 from django.utils import timezone
+from django.utils.functional import cached_property
+
+from poi_manager.signals import import_completed
+from .poi import LOCATION_GEOMETRY_SQL
 
 __all__ = ("ImportBatch",)
 
@@ -22,6 +26,7 @@ class ImportBatch(models.Model):
         ("csv", "CSV"),
         ("json", "JSON"),
         ("xml", "XML"),
+        ("parquet", "Parquet"),
     ]
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -38,6 +43,13 @@ class ImportBatch(models.Model):
         null=True, blank=True, verbose_name="File Size (bytes)"
     )
 
+    uncompressed_size = models.BigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Uncompressed Size (bytes)",
+        help_text="Bytes parsed after decompression; equals the file size for uncompressed files",
+    )
+
     status = models.CharField(
         max_length=20,
         choices=STATUS_CHOICES,
@@ -62,6 +74,13 @@ class ImportBatch(models.Model):
 
     error_log = models.JSONField(default=dict, blank=True, verbose_name="Error Log")
 
+    checkpoint = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="Checkpoint",
+        help_text="Last committed batch and source record position, used to resume the import",
+    )
+
     processing_time = models.DurationField(
         null=True, blank=True, verbose_name="Processing Time"
     )
@@ -82,7 +101,7 @@ class ImportBatch(models.Model):
         return f"{self.file_name} - {self.get_status_display()}"
 
     def mark_completed(self):
-        """Mark the batch as completed and calculate processing time"""
+        """Mark the batch as completed, calculate processing time and send import_completed"""
         self.completed_at = timezone.now()
         self.processing_time = self.completed_at - self.started_at
         if self.records_failed > 0:
@@ -90,19 +109,56 @@ class ImportBatch(models.Model):
         else:
             self.status = "completed"
         self.save()
+        import_completed.send(sender=ImportBatch, import_batch=self)
+
+    @cached_property
+    def extent(self):
+        """
+        Bounding box (min lon, min lat, max lon, max lat) of the POIs of this
+        batch, or None without POIs. Cached, since every import_completed
+        receiver needs it.
+        """
+        table = connection.ops.quote_name(self.pois.model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT ST_XMin(extent), ST_YMin(extent), ST_XMax(extent), ST_YMax(extent)
+                FROM (
+                    SELECT ST_Extent({LOCATION_GEOMETRY_SQL}) AS extent
+                    FROM {table} WHERE import_batch_id = %s
+                ) AS batch
+                """,
+                [self.pk],
+            )
+            row = cursor.fetchone()
+        return row if row[0] is not None else None
+
+    def set_checkpoint(self, batch_number, records_read=None):
+        """
+        Record the last committed batch. Save it in the same transaction as the
+        batch itself, so a resumed import neither skips nor repeats records.
+        """
+        self.checkpoint = {
+            **(self.checkpoint or {}),
+            "batch": batch_number,
+            "records": records_read,
+            "updated_at": timezone.now().isoformat(),
+        }
 
-    def add_error(self, error_message, record_data=None):
-        """Add an error to the error log"""
-        if "errors" not in self.error_log:
-            self.error_log["errors"] = []
+    def add_error(self, error_message, record_data=None, failed=1):
+        """
+        Record a single error right away.
 
-        error_entry = {
-            "timestamp": timezone.now().isoformat(),
-            "message": str(error_message),
-        }
-        if record_data:
-            error_entry["record"] = record_data
+        Code that can raise many errors, such as loaders, should buffer them
+        in an ImportErrorSink instead, which writes them in bulk.
+        """
+        from poi_manager.error_sink import ImportErrorSink
 
-        self.error_log["errors"].append(error_entry)
-        self.records_failed += 1
-        self.save()
+        sink = ImportErrorSink(self)
+        sink.add(error_message, record_data, failed=failed)
+        sink.flush()
+
+    def error_count(self):
+        """Total number of recorded errors, including those not in the sample."""
+        error_log = self.error_log or {}
+        return error_log.get("total", len(error_log.get("errors", [])))
@@ -0,0 +1,45 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+__all__ = ("ImportRecordError",)
+
+
+class ImportRecordError(models.Model):
+    """
+    One error raised while importing a file. Written in bulk by
+    ImportErrorSink; ImportBatch.error_log only keeps a small sample.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+
+    import_batch = models.ForeignKey(
+        "ImportBatch",
+        on_delete=models.CASCADE,
+        related_name="record_errors",
+        verbose_name="Import Batch",
+    )
+
+    created = models.DateTimeField(default=timezone.now, verbose_name="Created")
+
+    message = models.TextField(verbose_name="Message")
+
+    record = models.JSONField(
+        null=True, blank=True, encoder=DjangoJSONEncoder, verbose_name="Record"
+    )
+
+    class Meta:
+        ordering = ["id"]
+        verbose_name = "Import Record Error"
+        verbose_name_plural = "Import Record Errors"
+        indexes = [models.Index(fields=["import_batch", "id"])]
+
+    def __str__(self):
+        return self.message[:100]
+
+    def to_log_entry(self):
+        """The entry format used in ImportBatch.error_log."""
+        entry = {"timestamp": self.created.isoformat(), "message": self.message}
+        if self.record:
+            entry["record"] = self.record
+        return entry
@@ -1,13 +1,252 @@
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
 from django.contrib.gis.db import models
+from django.contrib.gis.db.models.functions import GeometryDistance
+from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import Distance
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, GistIndex, OpClass
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField,
+    TrigramSimilarity,
+)
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db.models.signals import post_save, post_delete
+from django.db import connection, transaction
+from django.db.models import DEFERRED, BooleanField, F, Func, Q, Value
+from django.db.models.functions import Cast, Upper
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
 
 from poi_manager.mixins import TimestampMixin, CustomFieldsMixin, CustomValidationMixin
+from poi_manager.models.rating_event import RatingEvent
+from poi_manager.signals import POIState, pois_changed
+from poi_manager.ratings import (
+    ALL_RATINGS_SQL,
+    HISTOGRAM_BUCKETS,
+    RATING_BUCKET_SQL,
+    empty_histogram,
+    rating_columns_sql,
+    rating_histogram,
+)
 
 __all__ = ("PointOfInterest",)
 
+# The location as a lon/lat geometry, matching the expression of the
+# poi_location_geometry_gist index
+LOCATION_GEOMETRY_SQL = "location::geometry(Point,4326)"
+
+# Text search configuration of search_vector and search queries
+SEARCH_CONFIG = "english"
+
+# Maintained in SQL by add_ratings and set_ratings, never by ordinary saves
+RATING_FIELDS = ("ratings", "avg_rating", "rating_count", "rating_sum", "rating_histogram")
+
+
+def category_sql(categories: Sequence[str]) -> Tuple[str, Dict[str, Any]]:
+    """
+    SQL condition matching any of ``categories`` case-insensitively, like the
+    category filter, and its named parameters. A single category is matched
+    with ``=``, which poi_location_category_gist can serve; GiST indexes
+    cannot search arrays.
+    """
+    categories = sorted({category.upper() for category in categories})
+    if len(categories) == 1:
+        return "upper(category) = %(category)s", {"category": categories[0]}
+    return "upper(category) = ANY(%(categories)s)", {"categories": categories}
+
+
+class PointOfInterestManager(models.Manager):
+
+    def nearest(self, point: Point, radius: Optional[Distance] = None, categories: Sequence[str] = ()):
+        """
+        POIs ordered by distance from ``point``, annotated with ``distance``
+        in metres. Ordering by the KNN ``<->`` operator lets the spatial
+        index return the closest rows first, so slicing the queryset reads
+        only those rows whether or not ``radius`` limits the search.
+
+        ``<->`` measures on the sphere, so ``radius`` does too: with the
+        default spheroid, ST_DWithin would keep or drop POIs near the edge
+        whose reported ``distance`` says otherwise.
+        """
+        origin = Value(point, output_field=models.PointField(geography=True, srid=4326))
+        queryset = self.annotate(distance=GeometryDistance("location", origin)).order_by("distance")
+
+        if radius is not None:
+            queryset = queryset.filter(
+                Func(
+                    "location",
+                    origin,
+                    Value(radius.m),
+                    Value(False),
+                    function="ST_DWithin",
+                    output_field=BooleanField(),
+                )
+            )
+        if categories:
+            categories = {category.upper() for category in categories}
+            queryset = queryset.alias(upper_category=Upper("category"))
+            if len(categories) == 1:
+                queryset = queryset.filter(upper_category=categories.pop())
+            else:
+                queryset = queryset.filter(upper_category__in=categories)
+        return queryset
+
+    def search(self, text: str):
+        """
+        POIs matching ``text``, annotated with a relevance ``rank``. Matches
+        are full-text matches on the name and description, names similar to
+        ``text`` by the trigram ``%`` operator, and an exact external id.
+        GIN indexes serve the text conditions, so no row is scored unless it
+        matches.
+        """
+        query = SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+        rank = SearchRank(F("search_vector"), query)
+        condition = Q(search_vector=query) | Q(external_id=text)
+
+        # Shorter strings have no trigrams to look up
+        if len(text) >= 3:
+            rank = rank + TrigramSimilarity("name", text)
+            condition |= Q(upper_name__trigram_similar=text)
+
+        return self.alias(upper_name=Upper("name")).annotate(rank=rank).filter(condition)
+
+    def add_ratings(self, events: Iterable[Tuple[int, float]]) -> int:
+        """
+        Apply ``(poi_id, rating)`` events and return the number of POIs
+        updated. Events for unknown POIs are ignored.
+
+        The events are appended to the rating event table and added to the
+        running sum, count and histogram columns from which ``avg_rating``
+        follows, so neither the existing ratings nor the ``ratings`` array
+        are read or rewritten. The POIs are locked in id order first, so
+        concurrent calls serialize on the row locks without deadlocking and
+        never lose ratings.
+        """
+        poi_ids = []
+        ratings = []
+        for poi_id, rating in events:
+            rating = float(rating)
+            if not 0 <= rating <= 5:
+                raise ValueError(f"Rating must be between 0 and 5: {rating}")
+            poi_ids.append(int(poi_id))
+            ratings.append(rating)
+
+        if not ratings:
+            return 0
+
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        events_table = connection.ops.quote_name(RatingEvent._meta.db_table)
+        bucket = RATING_BUCKET_SQL.format(rating="rating")
+        bucket_counts = ", ".join(
+            f"count(*) FILTER (WHERE bucket = {i}) AS bucket_{i}" for i in range(HISTOGRAM_BUCKETS)
+        )
+        histogram = ", ".join(
+            f"p.rating_histogram[{i + 1}] + e.bucket_{i}" for i in range(HISTOGRAM_BUCKETS)
+        )
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            before = self.states(set(poi_ids), lock=True)
+            if not before:
+                return 0
+
+            cursor.execute(
+                f"""
+                WITH events AS (
+                    SELECT poi_id, rating, position, {bucket} AS bucket
+                    FROM unnest(%s::bigint[], %s::float8[]) WITH ORDINALITY AS event(poi_id, rating, position)
+                    WHERE poi_id = ANY(%s)
+                ), inserted AS (
+                    INSERT INTO {events_table} (poi_id, rating, created)
+                    SELECT poi_id, rating, now() FROM events ORDER BY position
+                ), totals AS (
+                    SELECT
+                        poi_id,
+                        sum(rating) AS rating_sum,
+                        count(*) AS rating_count,
+                        {bucket_counts}
+                    FROM events
+                    GROUP BY poi_id
+                )
+                UPDATE {table} AS p SET
+                    rating_sum = p.rating_sum + e.rating_sum,
+                    rating_count = p.rating_count + e.rating_count,
+                    avg_rating = (p.rating_sum + e.rating_sum) / (p.rating_count + e.rating_count),
+                    rating_histogram = ARRAY[{histogram}],
+                    last_updated = now()
+                FROM totals AS e
+                WHERE p.id = e.poi_id
+                RETURNING p.id, p.rating_sum, p.rating_count
+                """,
+                [poi_ids, ratings, list(before)],
+            )
+            rows = cursor.fetchall()
+
+            pois_changed.send(
+                sender=self.model,
+                removed=[before[poi_id] for poi_id, _, _ in rows],
+                added=[before[poi_id]._replace(rating_sum=total, rating_count=count) for poi_id, total, count in rows],
+            )
+            return len(rows)
+
+    def set_ratings(self, poi_id: int, ratings: Sequence[float]):
+        """
+        Replace the imported ``ratings`` of a POI and derive its aggregates
+        from them and its rating events. The POI is locked before the
+        events are read, so ratings added concurrently are not lost.
+        """
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        all_ratings = ALL_RATINGS_SQL.format(
+            ratings="new.ratings",
+            events=connection.ops.quote_name(RatingEvent._meta.db_table),
+            poi_id="p.id",
+        )
+        assignments = ", ".join(f"{column} = {sql}" for column, sql in rating_columns_sql(all_ratings).items())
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            before = self.states([poi_id], lock=True)
+            if not before:
+                return
+
+            cursor.execute(
+                f"""
+                UPDATE {table} AS p SET ratings = new.ratings, {assignments}, last_updated = now()
+                FROM (SELECT %s::float8[] AS ratings) AS new
+                WHERE p.id = %s
+                RETURNING p.rating_sum, p.rating_count
+                """,
+                [[float(rating) for rating in ratings], poi_id],
+            )
+            total, count = cursor.fetchone()
+
+            pois_changed.send(
+                sender=self.model,
+                removed=[before[poi_id]],
+                added=[before[poi_id]._replace(rating_sum=total, rating_count=count)],
+            )
+
+    def states(self, poi_ids: Iterable[int], lock: bool = False) -> Dict[int, POIState]:
+        """
+        The POIState of each of ``poi_ids`` that exists, by id. With
+        ``lock``, the POIs are locked in id order until the end of the
+        transaction.
+        """
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT id, ST_X({LOCATION_GEOMETRY_SQL}), ST_Y({LOCATION_GEOMETRY_SQL}), rating_sum, rating_count
+                FROM {table}
+                WHERE id = ANY(%s)
+                ORDER BY id
+                {"FOR UPDATE" if lock else ""}
+                """,
+                [sorted(poi_ids)],
+            )
+            return {row[0]: POIState(*row[1:]) for row in cursor.fetchall()}
+
 
 class PointOfInterest(
     TimestampMixin, CustomFieldsMixin, CustomValidationMixin, models.Model
@@ -61,7 +300,7 @@ class PointOfInterest(
         default=list,
         blank=True,
         verbose_name="Ratings",
-        help_text="Array of individual ratings",
+        help_text="Ratings from the source file; ratings added later are kept as rating events",
     )
 
     avg_rating = models.FloatField(
@@ -77,12 +316,32 @@ class PointOfInterest(
         default=0, verbose_name="Rating Count", help_text="Number of ratings"
     )
 
+    rating_sum = models.FloatField(
+        default=0, verbose_name="Rating Sum", help_text="Running sum of all ratings"
+    )
+
+    rating_histogram = ArrayField(
+        models.IntegerField(),
+        size=HISTOGRAM_BUCKETS,
+        default=empty_histogram,
+        verbose_name="Rating Histogram",
+        help_text="Number of ratings per whole star, from 0 to 5",
+    )
+
     description = models.TextField(
         blank=True,
         verbose_name="Description",
         help_text="Additional description from JSON files",
     )
 
+    search_vector = models.GeneratedField(
+        expression=SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="B", config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True,
+        verbose_name="Search Vector",
+    )
+
     source_file = models.CharField(
         max_length=255,
         verbose_name="Source File",
@@ -96,6 +355,8 @@ class PointOfInterest(
         verbose_name="Import Batch",
     )
 
+    objects = PointOfInterestManager()
+
     class Meta:
         ordering = ["name", "category"]
         verbose_name = "Point of Interest"
@@ -104,16 +365,85 @@ class PointOfInterest(
             models.Index(fields=["category", "avg_rating"]),
             models.Index(fields=["external_id"]),
             models.Index(fields=["name"]),
+            # Planar lon/lat boxes such as map tiles are matched against the
+            # location as geometry; geography boxes follow great circles
+            GistIndex(
+                Cast("location", output_field=models.PointField(srid=4326)),
+                name="poi_location_geometry_gist",
+            ),
+            # Viewport queries filtered by category, which matches case-insensitively
+            GistIndex(
+                Cast("location", output_field=models.PointField(srid=4326)),
+                Upper("category"),
+                name="poi_location_category_gist",
+            ),
+            GinIndex(fields=["search_vector"], name="poi_search_vector_gin"),
+            # Serves the trigram % operator of search() and icontains on the name
+            GinIndex(OpClass(Upper("name"), name="gin_trgm_ops"), name="poi_name_trgm_gin"),
         ]
 
     def __str__(self):
         return f"{self.name} ({self.category})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_ratings = instance.__dict__.get("ratings", DEFERRED)
+        return instance
+
     def save(self, *args, **kwargs):
-        if self.ratings:
-            self.avg_rating = sum(self.ratings) / len(self.ratings)
+        if self._state.adding:
+            # A new POI has no rating events yet
+            self.rating_sum = sum(self.ratings)
             self.rating_count = len(self.ratings)
-        super().save(*args, **kwargs)
+            self.avg_rating = self.rating_sum / self.rating_count if self.ratings else None
+            self.rating_histogram = rating_histogram(self.ratings)
+            with transaction.atomic(using=kwargs.get("using")):
+                super().save(*args, **kwargs)
+                added = PointOfInterest.objects.states([self.pk])
+                pois_changed.send(sender=PointOfInterest, removed=[], added=list(added.values()))
+            self._loaded_ratings = list(self.ratings)
+            return
+
+        # Saving a loaded instance must not overwrite ratings added since it
+        # was loaded, so the rating columns are only written by set_ratings,
+        # and only when the ratings were changed
+        update_fields = kwargs.pop("update_fields", None)
+        ratings_changed = (update_fields is None or "ratings" in update_fields) and self.ratings_changed()
+        if update_fields is None:
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and not field.generated and field.attname not in deferred
+            ]
+        update_fields = [name for name in update_fields if name not in RATING_FIELDS]
+
+        with transaction.atomic(using=kwargs.get("using")):
+            before = PointOfInterest.objects.states([self.pk], lock=True)
+            super().save(*args, update_fields=update_fields, **kwargs)
+            after = PointOfInterest.objects.states([self.pk])
+            # Sent even when the state is unchanged, as cached tiles also show the name and category
+            pois_changed.send(sender=PointOfInterest, removed=list(before.values()), added=list(after.values()))
+
+            if ratings_changed:
+                PointOfInterest.objects.set_ratings(self.pk, self.ratings)
+                self.refresh_from_db(fields=[*RATING_FIELDS, "last_updated"])
+                self._loaded_ratings = list(self.ratings)
+
+    def ratings_changed(self) -> bool:
+        """Whether ``ratings`` was assigned a different value since the POI was loaded."""
+        if "ratings" not in self.__dict__:
+            return False
+        return self.ratings != getattr(self, "_loaded_ratings", DEFERRED)
+
+    def add_ratings(self, ratings: Sequence[float]):
+        """
+        Atomically add ``ratings`` as rating events and update the running
+        aggregates without saving the rest of the instance, then reload them.
+        """
+        PointOfInterest.objects.add_ratings((self.pk, rating) for rating in ratings)
+        self.refresh_from_db(fields=["avg_rating", "rating_count", "rating_sum", "rating_histogram", "last_updated"])
 
     def clean(self):
         super().clean()
@@ -123,6 +453,25 @@ class PointOfInterest(
             self.location = Point(float(self.longitude), float(self.latitude))
 
 
+@receiver(pre_delete, sender=PointOfInterest)
+def remove_deleted_poi(sender, instance, origin=None, **kwargs):
+    # POIs deleted along with their import batch are removed all at once below
+    batch_model = sender._meta.get_field("import_batch").related_model
+    if isinstance(origin, batch_model) or getattr(origin, "model", None) is batch_model:
+        return
+    removed = PointOfInterest.objects.states([instance.pk], lock=True)
+    if removed:
+        pois_changed.send(sender=PointOfInterest, removed=list(removed.values()), added=[])
+
+
+@receiver(pre_delete, sender="poi_manager.ImportBatch")
+def remove_deleted_batch_pois(sender, instance, **kwargs):
+    poi_ids = list(instance.pois.values_list("id", flat=True))
+    removed = PointOfInterest.objects.states(poi_ids, lock=True)
+    if removed:
+        pois_changed.send(sender=PointOfInterest, removed=list(removed.values()), added=[])
+
+
 @receiver([post_save, post_delete], sender=PointOfInterest)
 def invalidate_poi_cache(sender, instance, **kwargs):
     from django.core.cache import cache
@@ -0,0 +1,49 @@
+from django.db import models
+
+__all__ = ("POIClusterCell",)
+
+
+class POIClusterCell(models.Model):
+    """
+    Aggregated POIs of one cell of the cluster pyramid. The cells of a level
+    are the Web Mercator tiles of that zoom level. Sums rather than averages
+    are stored, so every level is aggregated from the level below.
+    """
+
+    level = models.SmallIntegerField(verbose_name="Level")
+
+    x = models.IntegerField(verbose_name="X")
+
+    y = models.IntegerField(verbose_name="Y")
+
+    count = models.IntegerField(verbose_name="Count", help_text="Number of POIs in the cell")
+
+    longitude_sum = models.FloatField(verbose_name="Longitude Sum")
+
+    latitude_sum = models.FloatField(verbose_name="Latitude Sum")
+
+    rating_sum = models.FloatField(verbose_name="Rating Sum", help_text="Sum of all ratings in the cell")
+
+    rating_count = models.BigIntegerField(
+        verbose_name="Rating Count", help_text="Number of ratings in the cell"
+    )
+
+    class Meta:
+        verbose_name = "POI Cluster Cell"
+        verbose_name_plural = "POI Cluster Cells"
+        constraints = [
+            models.UniqueConstraint(fields=["level", "x", "y"], name="poi_cluster_cell_level_x_y"),
+        ]
+
+    def __str__(self):
+        return f"{self.level}/{self.x}/{self.y} ({self.count})"
+
+    def to_cluster(self):
+        return {
+            "x": self.x,
+            "y": self.y,
+            "count": self.count,
+            "longitude": self.longitude_sum / self.count,
+            "latitude": self.latitude_sum / self.count,
+            "avg_rating": self.rating_sum / self.rating_count if self.rating_count else None,
+        }
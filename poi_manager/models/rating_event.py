@@ -0,0 +1,40 @@
+from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db import models
+from django.utils import timezone
+
+__all__ = ("RatingEvent",)
+
+
+class RatingEvent(models.Model):
+    """
+    One rating added to a POI after it was imported. Written by
+    PointOfInterestManager.add_ratings and never updated; the running
+    aggregates of the POI already include it.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+
+    # Full reloads swap in a new POI table, which no foreign key constraint
+    # may reference; ORM deletes still cascade
+    poi = models.ForeignKey(
+        "PointOfInterest",
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name="rating_events",
+        verbose_name="Point of Interest",
+    )
+
+    rating = models.FloatField(
+        verbose_name="Rating",
+        validators=[MinValueValidator(0), MaxValueValidator(5)],
+    )
+
+    created = models.DateTimeField(default=timezone.now, verbose_name="Created")
+
+    class Meta:
+        ordering = ["id"]
+        verbose_name = "Rating Event"
+        verbose_name_plural = "Rating Events"
+
+    def __str__(self):
+        return f"{self.rating} for POI {self.poi_id}"
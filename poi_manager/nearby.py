@@ -0,0 +1,170 @@
+import logging
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.core.cache import cache
+from django.db import connection
+
+from poi_manager.models import PointOfInterest
+from poi_manager.models.poi import LOCATION_GEOMETRY_SQL
+from poi_manager.tiles import tile_at, tile_bounds, tile_versions
+
+__all__ = (
+    "CELL_ZOOM",
+    "find_nearest",
+)
+
+logger = logging.getLogger("poi_manager.nearby")
+
+# Candidates are cached per tile of this zoom level, about 2.4 km wide at the
+# equator. Imports and POI changes invalidate them together with the vector tiles.
+CELL_ZOOM = 14
+
+# Denser cells are not cached; queries around them go to the database
+MAX_CELL_CANDIDATES = 5000
+
+NEARBY_CACHE_TIMEOUT = 15 * 60
+
+CELL_KEY = "poi_manager:nearby:{x}:{y}:{version}"
+
+DENSE = "dense"
+
+# Sphere radius PostGIS uses for geography distances, in metres
+EARTH_RADIUS = 6371008.7714
+
+# id, longitude, latitude, category
+Candidate = Tuple[int, float, float, str]
+
+# distance, then the candidate
+Match = Tuple[float, int, float, float, str]
+
+
+def find_nearest(
+    lon: float,
+    lat: float,
+    limit: int,
+    radius: Optional[float] = None,
+    categories: Sequence[str] = (),
+    after: Optional[Tuple[float, int]] = None,
+) -> Optional[List[Match]]:
+    """
+    Up to ``limit`` ``(distance, id, longitude, latitude, category)`` matches
+    of the POIs nearest to ``lon``/``lat``, ordered like
+    PointOfInterestManager.nearest and starting after the ``after``
+    ``(distance, id)`` pair. ``radius`` is in metres. The location and
+    category are those cached, so callers can tell when a POI changed since.
+
+    Only the cached candidates of the 3 x 3 cells around the query point are
+    read, and distances are computed here. Every POI closer than the edge of
+    that block is among the candidates, so the result is exact as long as it
+    does not reach beyond the edge. Returns None when it would, or when a
+    cell is too dense to cache; the caller then queries the database.
+    """
+    x, y = tile_at(lon, lat, CELL_ZOOM)
+    last = 2 ** CELL_ZOOM - 1
+    if not 0 < x < last or not 0 < y < last:
+        return None
+
+    cells = [(cell_x, cell_y) for cell_x in range(x - 1, x + 2) for cell_y in range(y - 1, y + 2)]
+    candidates = get_candidates(cells)
+    if candidates is None:
+        return None
+
+    west, south, _, _ = tile_bounds(CELL_ZOOM, x - 1, y + 1)
+    _, _, east, north = tile_bounds(CELL_ZOOM, x + 1, y - 1)
+    reach = min(
+        EARTH_RADIUS * math.radians(lat - south),
+        EARTH_RADIUS * math.radians(north - lat),
+        meridian_distance(lat, lon - west),
+        meridian_distance(lat, east - lon),
+    )
+
+    categories = {category.upper() for category in categories}
+    matches = []
+    for candidate in candidates.values():
+        poi_id, poi_lon, poi_lat, category = candidate
+        if categories and category.upper() not in categories:
+            continue
+        # The same sphere as the distance and radius of PointOfInterestManager.nearest,
+        # so both paths agree on POIs at the edge of the radius
+        distance = sphere_distance(lon, lat, poi_lon, poi_lat)
+        if radius is not None and distance > radius:
+            continue
+        # The cursor may come from a database distance that differs in the
+        # last digits, so its POI is excluded by id as well
+        if after is not None and (poi_id == after[1] or (distance, poi_id) <= after):
+            continue
+        matches.append((distance, *candidate))
+
+    matches.sort()
+    # Every POI within the reach is a candidate, beyond it others may come first
+    if len(matches) >= limit and matches[limit - 1][0] <= reach:
+        return matches[:limit]
+    if radius is not None and radius <= reach:
+        return matches[:limit]
+    return None
+
+
+def get_candidates(cells: Sequence[Tuple[int, int]]) -> Optional[Dict[int, Candidate]]:
+    """Candidates of all ``cells`` by id, or None if any cell is too dense."""
+    versions = tile_versions(CELL_ZOOM, cells)
+    keys = {cell: CELL_KEY.format(x=cell[0], y=cell[1], version=versions[cell]) for cell in cells}
+    cached = cache.get_many(keys.values())
+
+    missing = {}
+    candidates: Dict[int, Candidate] = {}
+    dense = False
+    for cell, key in keys.items():
+        cell_candidates = cached.get(key)
+        if cell_candidates is None:
+            cell_candidates = missing[key] = load_cell(*cell)
+        if cell_candidates == DENSE:
+            dense = True
+            continue
+        # POIs on a shared edge are in both cells
+        candidates.update((candidate[0], candidate) for candidate in cell_candidates)
+
+    if missing:
+        cache.set_many(missing, NEARBY_CACHE_TIMEOUT)
+    return None if dense else candidates
+
+
+def load_cell(x: int, y: int):
+    """Candidates of one cell, or DENSE if it holds more than MAX_CELL_CANDIDATES."""
+    west, south, east, north = tile_bounds(CELL_ZOOM, x, y)
+    table = connection.ops.quote_name(PointOfInterest._meta.db_table)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT id, ST_X(geom), ST_Y(geom), category
+            FROM (
+                SELECT id, category, {LOCATION_GEOMETRY_SQL} AS geom
+                FROM {table}
+                WHERE {LOCATION_GEOMETRY_SQL} && ST_MakeEnvelope(%s, %s, %s, %s, 4326)
+                LIMIT %s
+            ) AS poi
+            """,
+            [west, south, east, north, MAX_CELL_CANDIDATES + 1],
+        )
+        rows = cursor.fetchall()
+
+    if len(rows) > MAX_CELL_CANDIDATES:
+        logger.debug(f"Nearby cell {CELL_ZOOM}/{x}/{y} has more than {MAX_CELL_CANDIDATES} POIs")
+        return DENSE
+    return [tuple(row) for row in rows]
+
+
+def sphere_distance(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    """Great circle distance in metres."""
+    lat1, lat2 = math.radians(lat1), math.radians(lat2)
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def meridian_distance(lat: float, lon_offset: float) -> float:
+    """Distance in metres from a point to the meridian ``lon_offset`` degrees away."""
+    return EARTH_RADIUS * math.asin(math.cos(math.radians(lat)) * math.sin(math.radians(lon_offset)))
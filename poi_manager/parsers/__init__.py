@@ -1,11 +1,31 @@
 from .base import BaseParser
+from .columnar import ColumnarBatch
 from .csv_parser import CSVParser
 from .json_parser import JSONParser
 from .xml_parser import XMLParser
+from .parquet_parser import ParquetParser
 
 __all__ = (
     "BaseParser",
+    "ColumnarBatch",
     "CSVParser",
     "JSONParser",
     "XMLParser",
+    "ParquetParser",
+    "PARSER_CLASSES",
+    "get_parser_class",
 )
+
+PARSER_CLASSES = {
+    "csv": CSVParser,
+    "json": JSONParser,
+    "xml": XMLParser,
+    "parquet": ParquetParser,
+}
+
+
+def get_parser_class(file_type: str):
+    try:
+        return PARSER_CLASSES[file_type]
+    except KeyError:
+        raise ValueError(f"Unsupported file type: {file_type}")
@@ -1,29 +1,56 @@
 import chardet
+import codecs
+import io
 import os
 from abc import ABC, abstractmethod
-from typing import Generator, Dict, List, Any
+from collections import deque
+from typing import Generator, Dict, List, Any, Optional, Tuple, Union
 import logging
 
+from .columnar import ColumnarBatch, NORMALIZED_FIELDS
+from .compression import CountingReader, get_compression, open_decompressed
+from .vectorized import RawBatch, normalize_batch
+
 logger = logging.getLogger("poi_manager.parsers")
 
+INPUT_BUFFER_SIZE = 1024 * 1024
+
 
 class BaseParser(ABC):
 
-    def __init__(self, file_path: str, batch_size: int = 1000):
+    def __init__(
+        self,
+        file_path: str,
+        batch_size: int = 1000,
+        workers: int = 1,
+        ordered: bool = True,
+        columnar: bool = False,
+        start_record: int = 0,
+    ):
         self.file_path = file_path
         self.batch_size = batch_size
+        self.workers = workers
+        self.ordered = ordered
+        self.columnar = columnar
         self.file_size = os.path.getsize(file_path)
+        self.compression = get_compression(file_path)
+        self.input_reader = None
         self.encoding = None
         self.records_processed = 0
         self.errors = []
+        # Source records to skip when resuming an import from a checkpoint
+        self.start_record = start_record
+        # Source records read so far, and the value it had when each batch
+        # was emitted, so the consumer can checkpoint the batches it commits
+        self.records_read = 0
+        self.positions = deque()
 
     def detect_encoding(self) -> str:
         if self.encoding:
             return self.encoding
 
-        with open(self.file_path, "rb") as f:
-            raw_data = f.read(10240)
-            result = chardet.detect(raw_data)
+        raw_data = self.read_head(10240)
+        result = chardet.detect(raw_data)
 
         self.encoding = result.get("encoding", "utf-8")
         confidence = result.get("confidence", 0)
@@ -39,9 +66,110 @@ class BaseParser(ABC):
         return self.encoding
 
     @abstractmethod
-    def parse(self) -> Generator[List[Dict[str, Any]], None, None]:
+    def parse(self) -> Generator[Union[List[Dict[str, Any]], ColumnarBatch], None, None]:
         pass
 
+    def open_input(self) -> io.BufferedReader:
+        """
+        Open the file for binary reading, decompressing it on the fly if it is
+        compressed. Bytes read are counted towards ``uncompressed_size``.
+        """
+        self.input_reader = CountingReader(open_decompressed(self.file_path, self.compression))
+        return io.BufferedReader(self.input_reader, INPUT_BUFFER_SIZE)
+
+    def open_text(self, encoding: str) -> io.TextIOWrapper:
+        return io.TextIOWrapper(self.open_input(), encoding=encoding, errors="replace")
+
+    def read_head(self, size: int) -> bytes:
+        """Return the first ``size`` bytes of the (decompressed) file."""
+        with io.BufferedReader(CountingReader(open_decompressed(self.file_path, self.compression))) as f:
+            return f.read(size)
+
+    @property
+    def uncompressed_size(self) -> Optional[int]:
+        """Bytes of decompressed input, known once a compressed file was parsed."""
+        if self.compression is None:
+            return self.file_size
+        return self.input_reader.bytes_read if self.input_reader else None
+
+    @property
+    def bytes_consumed(self) -> Optional[int]:
+        """
+        Bytes of the file read so far while parsing serially, used to report
+        progress. Unknown for compressed input and parallel parsing.
+        """
+        if self.compression is None and self.input_reader:
+            return self.input_reader.bytes_read
+        return None
+
+    def use_parallel(self) -> bool:
+        if self.workers <= 1:
+            return False
+        if self.start_record:
+            logger.info(f"Resuming at record {self.start_record}, parsing serially")
+            return False
+        return self.supports_parallel()
+
+    def skip_record(self) -> bool:
+        """Count a source record and tell whether it precedes the resume point."""
+        self.records_read += 1
+        return self.records_read <= self.start_record
+
+    def supports_parallel(self) -> bool:
+        if self.compression:
+            logger.info(f"Parallel parsing is not available for {self.compression} input, parsing serially")
+            return False
+
+        # Byte-range splitting relies on b"\n" only ever marking a line end,
+        # which does not hold for UTF-16/UTF-32 input.
+        encoding = codecs.lookup(self.detect_encoding()).name
+        if encoding.startswith(("utf-16", "utf-32")):
+            logger.info(f"Parallel parsing is not available for {encoding}, parsing serially")
+            return False
+        return True
+
+    def split_chunks(self, chunk_bytes: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Split the file into record-aligned chunks of about ``chunk_bytes`` that
+        can be parsed independently with ``parse_chunk``, e.g. by separate RQ
+        jobs. Returns None if the file cannot be split.
+        """
+        return None
+
+    def parse_chunk(self, chunk: Dict[str, Any]) -> Generator[Union[List[Dict[str, Any]], ColumnarBatch], None, None]:
+        raise NotImplementedError(f"{type(self).__name__} cannot parse chunks")
+
+    def new_raw_batch(self) -> RawBatch:
+        return RawBatch()
+
+    def normalize_raw_batch(self, raw: RawBatch) -> Union[List[Dict[str, Any]], ColumnarBatch]:
+        """
+        Validate and normalize a whole raw batch with the vectorized kernel,
+        reporting rejected rows through the parser's hooks.
+        """
+        result = normalize_batch(raw, columnar=self.columnar)
+
+        for i in result.rejected:
+            self.on_invalid_record(raw.context[i])
+        for i, message in result.errors:
+            self.on_record_error(raw.context[i], message)
+
+        self.records_processed += len(result.batch)
+        return result.batch
+
+    def emit(self, raw: RawBatch) -> Generator[Union[List[Dict[str, Any]], ColumnarBatch], None, None]:
+        batch = self.normalize_raw_batch(raw)
+        if batch:
+            self.positions.append(self.records_read)
+            yield batch
+
+    def on_invalid_record(self, context: Any):
+        logger.warning("Skipping invalid record")
+
+    def on_record_error(self, context: Any, message: str):
+        logger.error(f"Error processing record: {message}")
+        self.errors.append({"error": message})
+
     def validate_record(self, record: Dict[str, Any]) -> bool:
         required_fields = ["id", "name", "latitude", "longitude", "category"]
 
@@ -68,17 +196,19 @@ class BaseParser(ABC):
         return True
 
     def normalize_record(self, record: Dict[str, Any]) -> Dict[str, Any]:
-        normalized = {
-            "external_id": str(record.get("id", "")),
-            "name": self.clean_string(record.get("name", "")),
-            "category": self.clean_string(record.get("category", "")),
-            "latitude": float(record.get("latitude", 0)),
-            "longitude": float(record.get("longitude", 0)),
-            "ratings": self.parse_ratings(record.get("ratings", [])),
-            "description": self.clean_string(record.get("description", "")),
-        }
-
-        return normalized
+        return dict(zip(NORMALIZED_FIELDS, self.normalize_values(record)))
+
+    def normalize_values(self, record: Dict[str, Any]) -> Tuple[Any, ...]:
+        """Normalized field values, ordered like ``NORMALIZED_FIELDS``."""
+        return (
+            str(record.get("id", "")),
+            self.clean_string(record.get("name", "")),
+            self.clean_string(record.get("category", "")),
+            float(record.get("latitude", 0)),
+            float(record.get("longitude", 0)),
+            self.parse_ratings(record.get("ratings", [])),
+            self.clean_string(record.get("description", "")),
+        )
 
     def clean_string(self, value: Any) -> str:
         if value is None:
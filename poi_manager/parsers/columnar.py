@@ -0,0 +1,143 @@
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+__all__ = ("ColumnarBatch", "NORMALIZED_FIELDS", "iter_row_tuples")
+
+NORMALIZED_FIELDS = (
+    "external_id",
+    "name",
+    "category",
+    "latitude",
+    "longitude",
+    "ratings",
+    "description",
+)
+
+
+class ColumnarBatch:
+    """
+    Struct-of-arrays batch of normalized records.
+
+    Strings are kept in one list per column, coordinates in float64 arrays and
+    ratings as a flat float64 array plus offsets, so row ``i`` owns
+    ``rating_values[rating_offsets[i]:rating_offsets[i + 1]]``. Iterating the
+    batch yields the same dicts the row-based parsers produce.
+    """
+
+    __slots__ = (
+        "external_id",
+        "name",
+        "category",
+        "description",
+        "latitude",
+        "longitude",
+        "rating_offsets",
+        "rating_values",
+    )
+
+    def __init__(self):
+        self.external_id: List[str] = []
+        self.name: List[str] = []
+        self.category: List[str] = []
+        self.description: List[str] = []
+        self.latitude = array("d")
+        self.longitude = array("d")
+        self.rating_offsets = array("q", [0])
+        self.rating_values = array("d")
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "ColumnarBatch":
+        batch = cls()
+        for row in iter_row_tuples(records):
+            batch.append(*row)
+        return batch
+
+    def append(
+        self,
+        external_id: str,
+        name: str,
+        category: str,
+        latitude: float,
+        longitude: float,
+        ratings: Sequence[float],
+        description: str = "",
+    ):
+        self.external_id.append(external_id)
+        self.name.append(name)
+        self.category.append(sys.intern(category))
+        self.latitude.append(latitude)
+        self.longitude.append(longitude)
+        self.rating_values.extend(ratings)
+        self.rating_offsets.append(len(self.rating_values))
+        self.description.append(description)
+
+    def __len__(self) -> int:
+        return len(self.external_id)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for values in self.row_tuples():
+            yield dict(zip(NORMALIZED_FIELDS, values))
+
+    def ratings(self, index: int) -> List[float]:
+        return self.rating_values[self.rating_offsets[index]:self.rating_offsets[index + 1]].tolist()
+
+    def row_tuples(self) -> Iterator[Tuple[Any, ...]]:
+        """Yield rows as tuples ordered like ``NORMALIZED_FIELDS``."""
+        offsets = self.rating_offsets
+        values = self.rating_values
+        for i in range(len(self)):
+            yield (
+                self.external_id[i],
+                self.name[i],
+                self.category[i],
+                self.latitude[i],
+                self.longitude[i],
+                values[offsets[i]:offsets[i + 1]].tolist(),
+                self.description[i],
+            )
+
+    def take(self, indices: Iterable[int]) -> "ColumnarBatch":
+        batch = ColumnarBatch()
+        for i in indices:
+            batch.append(
+                self.external_id[i],
+                self.name[i],
+                self.category[i],
+                self.latitude[i],
+                self.longitude[i],
+                self.rating_values[self.rating_offsets[i]:self.rating_offsets[i + 1]],
+                self.description[i],
+            )
+        return batch
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the batch, including string payloads."""
+        size = sum(
+            sys.getsizeof(column) + sum(sys.getsizeof(value) for value in column)
+            for column in (self.external_id, self.name, self.category, self.description)
+        )
+        size += sum(
+            sys.getsizeof(column)
+            for column in (self.latitude, self.longitude, self.rating_offsets, self.rating_values)
+        )
+        return size
+
+
+def iter_row_tuples(records) -> Iterator[Tuple[Any, ...]]:
+    """Yield normalized rows as tuples from either a ColumnarBatch or a list of dicts."""
+    if isinstance(records, ColumnarBatch):
+        yield from records.row_tuples()
+        return
+
+    for record in records:
+        yield (
+            record["external_id"],
+            record["name"],
+            record["category"],
+            record["latitude"],
+            record["longitude"],
+            record["ratings"],
+            record.get("description", ""),
+        )
@@ -0,0 +1,130 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from typing import BinaryIO, Optional
+import logging
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+__all__ = (
+    "COMPRESSION_SUFFIXES",
+    "CountingReader",
+    "get_compression",
+    "open_decompressed",
+)
+
+logger = logging.getLogger("poi_manager.parsers.compression")
+
+COMPRESSION_SUFFIXES = {
+    ".gz": "gzip",
+    ".bz2": "bz2",
+    ".xz": "xz",
+    ".zst": "zstd",
+}
+
+# Multi-threaded command line decompressors, preferred over the Python codecs
+# when installed. Decompression then also runs outside the GIL.
+DECOMPRESS_COMMANDS = {
+    "gzip": [("pigz", "-dc", "-p", "{threads}")],
+    "bz2": [("lbzip2", "-dc", "-n", "{threads}"), ("pbzip2", "-dc", "-p{threads}")],
+    "xz": [("xz", "-dc", "-T", "{threads}")],
+    "zstd": [("zstd", "-dc", "-q")],
+}
+
+
+def get_compression(file_path: str) -> Optional[str]:
+    return COMPRESSION_SUFFIXES.get(Path(file_path).suffix.lower())
+
+
+def open_decompressed(file_path: str, compression: Optional[str]) -> BinaryIO:
+    """Open ``file_path`` for binary reading, decompressing on the fly."""
+    if compression is None:
+        return open(file_path, "rb")
+
+    if compression not in DECOMPRESS_COMMANDS:
+        raise ValueError(f"Unsupported compression: {compression}")
+
+    threads = str(os.cpu_count() or 1)
+    for command in DECOMPRESS_COMMANDS[compression]:
+        if shutil.which(command[0]):
+            args = [arg.format(threads=threads) for arg in command]
+            return ProcessReader([*args, file_path])
+
+    if compression == "gzip":
+        return gzip.open(file_path, "rb")
+    if compression == "bz2":
+        return bz2.open(file_path, "rb")
+    if compression == "xz":
+        return lzma.open(file_path, "rb")
+
+    if zstandard is None:
+        raise ValueError(
+            "Reading .zst files requires the zstd command line tool or the zstandard package"
+        )
+    return zstandard.ZstdDecompressor().stream_reader(open(file_path, "rb"), closefd=True)
+
+
+class ProcessReader(io.RawIOBase):
+    """Read the standard output of a decompressor process."""
+
+    def __init__(self, args):
+        self.args = args
+        self.process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self.eof = False
+        logger.debug(f"Decompressing with {args[0]}")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = self.process.stdout.readinto(buffer)
+        if not count and len(buffer):
+            self.eof = True
+            self.check()
+        return count
+
+    def check(self):
+        if self.process.wait() != 0:
+            message = self.process.stderr.read().decode(errors="replace").strip()
+            raise OSError(f"{self.args[0]} exited with status {self.process.returncode}: {message}")
+
+    def close(self):
+        if self.closed:
+            return
+        # Stopping before the end of the stream is fine, e.g. when only the
+        # head of the file is read to detect its encoding.
+        if not self.eof:
+            self.process.kill()
+        self.process.wait()
+        self.process.stdout.close()
+        self.process.stderr.close()
+        super().close()
+
+
+class CountingReader(io.RawIOBase):
+    """Pass reads through to ``stream`` and count the bytes returned."""
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = self.stream.readinto(buffer)
+        self.bytes_read += count or 0
+        return count
+
+    def close(self):
+        if not self.closed:
+            self.stream.close()
+        super().close()
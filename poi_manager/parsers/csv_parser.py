@@ -1,56 +1,235 @@
 import csv
-from typing import Generator, List, Dict, Any
+import io
+import math
+from typing import Generator, List, Dict, Any, Optional, Union
 import logging
 
 from .base import BaseParser
+from .columnar import ColumnarBatch
+from .vectorized import normalize_batch
+from .parallel import chunk_count, dump_batches, load_batch, run_parallel, split_byte_ranges
 
 logger = logging.getLogger("poi_manager.parsers.csv")
 
 
 class CSVParser(BaseParser):
 
-    def parse(self) -> Generator[List[Dict[str, Any]], None, None]:
+    def parse(self) -> Generator[Union[List[Dict[str, Any]], ColumnarBatch], None, None]:
+        if self.use_parallel():
+            yield from self.parse_parallel()
+            return
+
         encoding = self.detect_encoding()
-        batch = []
+        raw = self.new_raw_batch()
 
         try:
-            with open(self.file_path, "r", encoding=encoding, errors="replace") as f:
+            with self.open_text(encoding) as f:
                 reader = csv.DictReader(f)
 
                 for row_num, row in enumerate(reader, start=2):
+                    if self.skip_record():
+                        continue
+
                     try:
                         row = {k: v for k, v in row.items() if k and k.strip()}
-                        record = {
-                            "id": row.get("poi_id"),
-                            "name": row.get("poi_name"),
-                            "category": row.get("poi_category"),
-                            "latitude": row.get("poi_latitude"),
-                            "longitude": row.get("poi_longitude"),
-                            "ratings": row.get("poi_ratings"),
-                        }
-
-                        if self.validate_record(record):
-                            normalized = self.normalize_record(record)
-                            batch.append(normalized)
-                            self.records_processed += 1
-
-                            if len(batch) >= self.batch_size:
-                                yield batch
-                                batch = []
-                        else:
-                            logger.warning(f"Skipping invalid record at row {row_num}")
+                        raw.append(self.row_to_record(row), (row_num, row))
 
                     except Exception as e:
-                        logger.error(f"Error processing row {row_num}: {e}")
-                        self.errors.append(
-                            {"row": row_num, "error": str(e), "data": row}
-                        )
+                        self.on_record_error((row_num, row), str(e))
 
-                if batch:
-                    yield batch
+                    if len(raw) >= self.batch_size:
+                        yield from self.emit(raw)
+                        raw = self.new_raw_batch()
+
+                if raw:
+                    yield from self.emit(raw)
 
         except Exception as e:
             logger.error(f"Fatal error parsing CSV file: {e}")
             raise
 
         logger.info(f"CSV parsing complete. Processed {self.records_processed} records")
+
+    def on_invalid_record(self, context):
+        row_num, _ = context
+        logger.warning(f"Skipping invalid record at row {row_num}")
+
+    def on_record_error(self, context, message: str):
+        row_num, row = context
+        logger.error(f"Error processing row {row_num}: {message}")
+        self.errors.append({"row": row_num, "error": message, "data": row})
+
+    def row_to_record(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": row.get("poi_id"),
+            "name": row.get("poi_name"),
+            "category": row.get("poi_category"),
+            "latitude": row.get("poi_latitude"),
+            "longitude": row.get("poi_longitude"),
+            "ratings": row.get("poi_ratings"),
+        }
+
+    def read_header(self):
+        """Return the field names and the byte offset where the data rows start."""
+        with open(self.file_path, "rb") as f:
+            header = f.readline()
+            data_start = f.tell()
+
+        fieldnames = next(csv.reader([header.decode(self.detect_encoding(), errors="replace")]), [])
+        return fieldnames, data_start
+
+    def split_chunks(self, chunk_bytes: int) -> Optional[List[Dict[str, Any]]]:
+        if not self.supports_parallel():
+            return None
+
+        fieldnames, data_start = self.read_header()
+        ranges = split_byte_ranges(
+            self.file_path,
+            data_start,
+            self.file_size,
+            max(1, math.ceil((self.file_size - data_start) / chunk_bytes)),
+        )
+        return [
+            {"start": start, "end": end, "encoding": self.detect_encoding(), "fieldnames": fieldnames}
+            for start, end in ranges
+        ]
+
+    def parse_chunk(self, chunk: Dict[str, Any]) -> Generator[Union[List[Dict[str, Any]], ColumnarBatch], None, None]:
+        self.encoding = chunk["encoding"]
+        report = self.new_range_report()
+
+        for batch in self.iter_range(chunk["start"], chunk["end"], chunk["fieldnames"], report):
+            self.records_processed += len(batch)
+            yield batch
+
+        # Absolute row numbers are unknown without counting the rows of all
+        # earlier chunks, so rows are reported relative to the chunk.
+        for row_num in report["invalid_rows"]:
+            logger.warning(f"Skipping invalid record at row {row_num} of chunk at byte {chunk['start']}")
+        for error in report["errors"]:
+            error["offset"] = chunk["start"]
+            logger.error(f"Error processing row {error['row']} of chunk at byte {chunk['start']}: {error['error']}")
+            self.errors.append(error)
+
+    def parse_parallel(self) -> Generator[Union[List[Dict[str, Any]], ColumnarBatch], None, None]:
+        """
+        Split the file into newline-aligned byte ranges and parse them in worker
+        processes. Records must not contain embedded newlines.
+        """
+        encoding = self.detect_encoding()
+        fieldnames, data_start = self.read_header()
+        ranges = split_byte_ranges(
+            self.file_path,
+            data_start,
+            self.file_size,
+            chunk_count(self.file_size - data_start, self.workers),
+        )
+        tasks = [
+            (self.file_path, self.batch_size, self.columnar, encoding, fieldnames, index, start, end)
+            for index, (start, end) in enumerate(ranges)
+        ]
+
+        logger.info(
+            f"Parsing {len(ranges)} CSV chunks with {self.workers} worker processes"
+        )
+
+        # Row numbers are only known once every earlier chunk has reported its
+        # row count, so errors from chunks finishing out of order wait here.
+        row_counts = {}
+        pending_errors = {}
+        next_index = 0
+        row_base = 1
+
+        for result in run_parallel(parse_csv_range, tasks, self.workers, self.ordered):
+            row_counts[result["index"]] = result["rows"]
+            pending_errors[result["index"]] = (result["invalid_rows"], result["errors"])
+
+            while next_index in row_counts:
+                invalid_rows, errors = pending_errors.pop(next_index)
+                for row_num in invalid_rows:
+                    logger.warning(f"Skipping invalid record at row {row_base + row_num}")
+                for error in errors:
+                    error["row"] += row_base
+                    logger.error(f"Error processing row {error['row']}: {error['error']}")
+                    self.errors.append(error)
+                row_base += row_counts.pop(next_index)
+                next_index += 1
+
+            for data in result["batches"]:
+                batch = load_batch(data)
+                self.records_processed += len(batch)
+                yield batch
+
+        logger.info(f"CSV parsing complete. Processed {self.records_processed} records")
+
+    def new_range_report(self) -> Dict[str, Any]:
+        return {"rows": 0, "invalid_rows": [], "errors": []}
+
+    def parse_range(
+        self, start: int, end: int, fieldnames: List[str], index: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Parse the records in ``[start, end)``. Row numbers in the result are
+        relative to the start of the range, starting at 1.
+        """
+        report = self.new_range_report()
+        batches = list(self.iter_range(start, end, fieldnames, report))
+        return {"index": index, "batches": batches, **report}
+
+    def iter_range(
+        self, start: int, end: int, fieldnames: List[str], report: Dict[str, Any]
+    ) -> Generator[Union[List[Dict[str, Any]], ColumnarBatch], None, None]:
+        """
+        Yield the batches of ``[start, end)``, collecting row counts, invalid
+        rows and errors in ``report``.
+        """
+        encoding = self.detect_encoding()
+
+        with open(self.file_path, "rb") as f:
+            f.seek(start)
+            text = f.read(end - start).decode(encoding, errors="replace")
+
+        raw = self.new_raw_batch()
+        invalid_rows = report["invalid_rows"]
+        errors = report["errors"]
+
+        def flush(raw):
+            result = normalize_batch(raw, columnar=self.columnar)
+            invalid_rows.extend(raw.context[i][0] for i in result.rejected)
+            for i, message in result.errors:
+                local_row, row = raw.context[i]
+                errors.append({"row": local_row, "error": message, "data": row})
+            return result.batch
+
+        for values in csv.reader(io.StringIO(text, newline="")):
+            # csv.DictReader skips blank lines without counting them as rows
+            if not values:
+                continue
+
+            report["rows"] += 1
+            row_num = report["rows"]
+            row = {k: v for k, v in zip(fieldnames, values) if k and k.strip()}
+            try:
+                raw.append(self.row_to_record(row), (row_num, row))
+            except Exception as e:
+                errors.append({"row": row_num, "error": str(e), "data": row})
+
+            if len(raw) >= self.batch_size:
+                batch = flush(raw)
+                if batch:
+                    yield batch
+                raw = self.new_raw_batch()
+
+        if raw:
+            batch = flush(raw)
+            if batch:
+                yield batch
+
+
+def parse_csv_range(task) -> Dict[str, Any]:
+    file_path, batch_size, columnar, encoding, fieldnames, index, start, end = task
+    parser = CSVParser(file_path, batch_size, columnar=columnar)
+    parser.encoding = encoding
+    result = parser.parse_range(start, end, fieldnames, index=index)
+    result["batches"] = dump_batches(result["batches"])
+    return result
@@ -1,107 +1,90 @@
+import codecs
 import json
+import math
 import ijson
-from typing import Generator, List, Dict, Any
+from typing import Generator, List, Dict, Any, Optional, Union
 import logging
 
 from .base import BaseParser
+from .columnar import ColumnarBatch
+from .vectorized import RawBatch, normalize_batch
+from .parallel import chunk_count, dump_batches, load_batch, run_parallel, split_byte_ranges
 
 logger = logging.getLogger("poi_manager.parsers.json")
 
+# Fastest first; yajl2_c ships as a compiled extension in the ijson wheels.
+IJSON_BACKENDS = ("yajl2_c", "yajl2_cffi", "yajl2", "python")
 
-class JSONParser(BaseParser):
+JSON_ARRAY = "array"
+JSON_LINES = "lines"
 
-    def parse(self) -> Generator[List[Dict[str, Any]], None, None]:
-        encoding = self.detect_encoding()
-        batch = []
 
+def select_backend():
+    for name in IJSON_BACKENDS:
         try:
-            with open(self.file_path, "rb") as f:
-                parser = ijson.items(f, "item")
-
-                for item in parser:
-                    try:
-                        coords = item.get("coordinates", {})
-                        record = {
-                            "id": item.get("id"),
-                            "name": item.get("name"),
-                            "category": item.get("category"),
-                            "latitude": coords.get("latitude"),
-                            "longitude": coords.get("longitude"),
-                            "ratings": item.get("ratings"),
-                            "description": item.get("description"),
-                        }
-
-                        if self.validate_record(record):
-                            normalized = self.normalize_record(record)
-                            batch.append(normalized)
-                            self.records_processed += 1
-
-                            if len(batch) >= self.batch_size:
-                                yield batch
-                                batch = []
-                        else:
-                            logger.warning(
-                                f"Skipping invalid JSON record: {item.get('id')}"
-                            )
-
-                    except Exception as e:
-                        logger.error(f"Error processing JSON item: {e}")
-                        self.errors.append(
-                            {"item_id": item.get("id"), "error": str(e), "data": item}
-                        )
+            return ijson.get_backend(name)
+        except ImportError:
+            continue
+    return ijson
 
-                if batch:
-                    yield batch
 
-        except ijson.JSONError:
-            logger.info("Streaming failed, attempting standard JSON parsing")
-            with open(self.file_path, "r", encoding=encoding) as f:
-                try:
-                    data = json.load(f)
-                    if not isinstance(data, list):
-                        logger.error(
-                            "JSON file does not contain an array at root level"
-                        )
-                        raise ValueError("Expected JSON array at root level")
-
-                    for item in data:
-                        try:
-                            coords = item.get("coordinates", {})
-                            record = {
-                                "id": item.get("id"),
-                                "name": item.get("name"),
-                                "category": item.get("category"),
-                                "latitude": coords.get("latitude"),
-                                "longitude": coords.get("longitude"),
-                                "ratings": item.get("ratings"),
-                                "description": item.get("description"),
-                            }
-
-                            if self.validate_record(record):
-                                normalized = self.normalize_record(record)
-                                batch.append(normalized)
-                                self.records_processed += 1
-
-                                if len(batch) >= self.batch_size:
-                                    yield batch
-                                    batch = []
-
-                        except Exception as e:
-                            logger.error(f"Error processing JSON item: {e}")
-                            self.errors.append(
-                                {
-                                    "item_id": item.get("id"),
-                                    "error": str(e),
-                                    "data": item,
-                                }
-                            )
-
-                    if batch:
-                        yield batch
-
-                except json.JSONDecodeError as e:
-                    logger.error(f"Invalid JSON file: {e}")
-                    raise
+backend = select_backend()
+
+
+class Utf8Reader:
+    """
+    Minimal binary reader that re-encodes a file in another encoding to UTF-8,
+    the only input the ijson backends accept.
+    """
+
+    def __init__(self, f, encoding: str):
+        self.f = f
+        self.decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+
+    def read(self, size: int = -1) -> bytes:
+        while True:
+            data = self.f.read(size)
+            text = self.decoder.decode(data, final=not data)
+            # An empty result means end of file to ijson, so keep reading
+            # while a chunk only held part of a character.
+            if text or not data:
+                return text.encode("utf-8")
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class JSONParser(BaseParser):
+    """
+    Streaming parser for a top-level JSON array of POIs or for JSON Lines
+    (one POI object per line). The document is never loaded as a whole.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.json_format = None
+
+    def parse(self) -> Generator[Union[List[Dict[str, Any]], ColumnarBatch], None, None]:
+        json_format = self.detect_format()
+
+        try:
+            if json_format == JSON_LINES:
+                if self.use_parallel():
+                    yield from self.parse_parallel()
+                    return
+                yield from self.parse_lines()
+            else:
+                yield from self.parse_array()
+
+        except ijson.JSONError as e:
+            logger.error(f"Invalid JSON file: {e}")
+            raise
 
         except Exception as e:
             logger.error(f"Fatal error parsing JSON file: {e}")
@@ -110,3 +93,211 @@ class JSONParser(BaseParser):
         logger.info(
             f"JSON parsing complete. Processed {self.records_processed} records"
         )
+
+    def detect_format(self) -> str:
+        """
+        Tell a top-level array from JSON Lines by the first non-whitespace
+        character of the file.
+        """
+        if self.json_format:
+            return self.json_format
+
+        head = self.read_head(4096)
+        text = head.decode(self.detect_encoding(), errors="ignore").lstrip("\ufeff \t\r\n")
+        self.json_format = JSON_LINES if text.startswith("{") else JSON_ARRAY
+
+        logger.info(f"Detected JSON format: {self.json_format} (ijson backend: {backend.backend_name})")
+        return self.json_format
+
+    def open_utf8(self):
+        """Open the file as a UTF-8 byte stream, transcoding on the fly if needed."""
+        encoding = codecs.lookup(self.detect_encoding()).name
+        f = self.open_input()
+        if encoding in ("utf-8", "ascii"):
+            return f
+        return Utf8Reader(f, encoding)
+
+    def parse_array(self) -> Generator[Union[List[Dict[str, Any]], ColumnarBatch], None, None]:
+        raw = self.new_raw_batch()
+
+        with self.open_utf8() as f:
+            for item in backend.items(f, "item", use_float=True):
+                if self.skip_record():
+                    continue
+
+                try:
+                    raw.append(self.item_to_record(item), item)
+
+                except Exception as e:
+                    self.on_record_error(item, str(e))
+
+                if len(raw) >= self.batch_size:
+                    yield from self.emit(raw)
+                    raw = self.new_raw_batch()
+
+        if raw:
+            yield from self.emit(raw)
+
+    def parse_lines(self) -> Generator[Union[List[Dict[str, Any]], ColumnarBatch], None, None]:
+        raw = self.new_raw_batch()
+
+        with self.open_text(self.detect_encoding()) as f:
+            for line in f:
+                line = line.strip().lstrip("\ufeff")
+                if not line or self.skip_record():
+                    continue
+
+                try:
+                    item = json.loads(line)
+                    raw.append(self.item_to_record(item), item)
+
+                except Exception as e:
+                    self.on_record_error(line, str(e))
+
+                if len(raw) >= self.batch_size:
+                    yield from self.emit(raw)
+                    raw = self.new_raw_batch()
+
+        if raw:
+            yield from self.emit(raw)
+
+    def parse_parallel(self) -> Generator[Union[List[Dict[str, Any]], ColumnarBatch], None, None]:
+        """
+        Split a JSON Lines file into newline-aligned byte ranges and parse them
+        in worker processes.
+        """
+        encoding = self.detect_encoding()
+        ranges = split_byte_ranges(
+            self.file_path, 0, self.file_size, chunk_count(self.file_size, self.workers)
+        )
+        tasks = [
+            (self.file_path, self.batch_size, self.columnar, encoding, start, end)
+            for start, end in ranges
+        ]
+
+        logger.info(
+            f"Parsing {len(ranges)} JSON Lines chunks with {self.workers} worker processes"
+        )
+
+        for result in run_parallel(parse_json_lines_range, tasks, self.workers, self.ordered):
+            for item_id in result["invalid_ids"]:
+                logger.warning(f"Skipping invalid JSON record: {item_id}")
+            for error in result["errors"]:
+                logger.error(f"Error processing JSON item: {error['error']}")
+                self.errors.append(error)
+
+            for data in result["batches"]:
+                batch = load_batch(data)
+                self.records_processed += len(batch)
+                yield batch
+
+    def split_chunks(self, chunk_bytes: int) -> Optional[List[Dict[str, Any]]]:
+        # A top-level array cannot be cut at byte offsets, only JSON Lines can
+        if self.detect_format() != JSON_LINES or not self.supports_parallel():
+            return None
+
+        ranges = split_byte_ranges(
+            self.file_path, 0, self.file_size, max(1, math.ceil(self.file_size / chunk_bytes))
+        )
+        return [{"start": start, "end": end, "encoding": self.detect_encoding()} for start, end in ranges]
+
+    def parse_chunk(self, chunk: Dict[str, Any]) -> Generator[Union[List[Dict[str, Any]], ColumnarBatch], None, None]:
+        self.encoding = chunk["encoding"]
+        report = self.new_range_report()
+
+        for batch in self.iter_range(chunk["start"], chunk["end"], report):
+            self.records_processed += len(batch)
+            yield batch
+
+        for item_id in report["invalid_ids"]:
+            logger.warning(f"Skipping invalid JSON record: {item_id}")
+        for error in report["errors"]:
+            logger.error(f"Error processing JSON item: {error['error']}")
+            self.errors.append(error)
+
+    def new_range_report(self) -> Dict[str, Any]:
+        return {"invalid_ids": [], "errors": []}
+
+    def parse_range(self, start: int, end: int) -> Dict[str, Any]:
+        """Parse the JSON Lines records in ``[start, end)``."""
+        report = self.new_range_report()
+        batches = list(self.iter_range(start, end, report))
+        return {"batches": batches, **report}
+
+    def iter_range(
+        self, start: int, end: int, report: Dict[str, Any]
+    ) -> Generator[Union[List[Dict[str, Any]], ColumnarBatch], None, None]:
+        """
+        Yield the batches of the JSON Lines records in ``[start, end)``,
+        collecting invalid records and errors in ``report``.
+        """
+        with open(self.file_path, "rb") as f:
+            f.seek(start)
+            text = f.read(end - start).decode(self.detect_encoding(), errors="replace")
+
+        raw = self.new_raw_batch()
+        invalid_ids = report["invalid_ids"]
+        errors = report["errors"]
+
+        def flush(raw: RawBatch):
+            result = normalize_batch(raw, columnar=self.columnar)
+            invalid_ids.extend(raw.context[i].get("id") for i in result.rejected)
+            for i, message in result.errors:
+                errors.append(self.error_entry(raw.context[i], message))
+            return result.batch
+
+        # Only "\n" delimits records; str.splitlines() would also split on
+        # characters that may appear unescaped inside JSON strings.
+        for line in text.split("\n"):
+            line = line.strip().lstrip("\ufeff")
+            if not line:
+                continue
+
+            try:
+                item = json.loads(line)
+                raw.append(self.item_to_record(item), item)
+            except Exception as e:
+                errors.append(self.error_entry(line, str(e)))
+
+            if len(raw) >= self.batch_size:
+                batch = flush(raw)
+                if batch:
+                    yield batch
+                raw = self.new_raw_batch()
+
+        if raw:
+            batch = flush(raw)
+            if batch:
+                yield batch
+
+    def item_to_record(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        coords = item.get("coordinates", {})
+        return {
+            "id": item.get("id"),
+            "name": item.get("name"),
+            "category": item.get("category"),
+            "latitude": coords.get("latitude"),
+            "longitude": coords.get("longitude"),
+            "ratings": item.get("ratings"),
+            "description": item.get("description"),
+        }
+
+    def error_entry(self, item, message: str) -> Dict[str, Any]:
+        item_id = item.get("id") if isinstance(item, dict) else None
+        return {"item_id": item_id, "error": message, "data": item}
+
+    def on_invalid_record(self, item):
+        logger.warning(f"Skipping invalid JSON record: {item.get('id')}")
+
+    def on_record_error(self, item, message: str):
+        logger.error(f"Error processing JSON item: {message}")
+        self.errors.append(self.error_entry(item, message))
+
+
+def parse_json_lines_range(task) -> Dict[str, Any]:
+    file_path, batch_size, columnar, encoding, start, end = task
+    parser = JSONParser(file_path, batch_size, columnar=columnar)
+    parser.encoding = encoding
+    result = parser.parse_range(start, end)
+    result["batches"] = dump_batches(result["batches"])
+    return result
@@ -0,0 +1,135 @@
+import gc
+import math
+import pickle
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Generator, Iterable, List, Tuple
+import logging
+
+logger = logging.getLogger("poi_manager.parsers.parallel")
+
+CHUNK_BYTES = 32 * 1024 * 1024
+
+
+def split_byte_ranges(
+    file_path: str,
+    start: int,
+    end: int,
+    chunks: int,
+    delimiter: bytes = b"\n",
+) -> List[Tuple[int, int]]:
+    """
+    Split ``[start, end)`` of a file into at most ``chunks`` ranges whose
+    boundaries fall right after ``delimiter``.
+    """
+    if end <= start:
+        return []
+
+    step = max(1, math.ceil((end - start) / max(1, chunks)))
+    ranges = []
+
+    with open(file_path, "rb") as f:
+        range_start = start
+        while range_start < end:
+            target = range_start + step
+            if target >= end:
+                ranges.append((range_start, end))
+                break
+
+            range_end = find_delimiter(f, target, end, delimiter)
+            ranges.append((range_start, range_end))
+            range_start = range_end
+
+    return ranges
+
+
+def find_delimiter(f, offset: int, end: int, delimiter: bytes, block_size: int = 65536) -> int:
+    """
+    Return the offset just past the first ``delimiter`` at or after ``offset``,
+    or ``end`` if there is none.
+    """
+    f.seek(offset)
+    position = offset
+    tail = b""
+
+    while position < end:
+        block = f.read(min(block_size, end - position))
+        if not block:
+            break
+
+        data = tail + block
+        index = data.find(delimiter)
+        if index != -1:
+            return position - len(tail) + index + len(delimiter)
+
+        tail = data[-(len(delimiter) - 1):] if len(delimiter) > 1 else b""
+        position += len(block)
+
+    return end
+
+
+def chunk_count(size: int, workers: int) -> int:
+    return max(workers, math.ceil(size / CHUNK_BYTES))
+
+
+def dump_batches(batches: List[Any]) -> List[bytes]:
+    """
+    Pickle each batch separately inside the worker so the parent only pays for
+    unpickling a batch when it is consumed.
+    """
+    return [pickle.dumps(batch, protocol=pickle.HIGHEST_PROTOCOL) for batch in batches]
+
+
+def load_batch(data: bytes) -> Any:
+    # Unpickling a batch allocates thousands of container objects at once; the
+    # cyclic GC passes this triggers cost more than the unpickling itself.
+    gc.disable()
+    try:
+        return pickle.loads(data)
+    finally:
+        gc.enable()
+
+
+def run_parallel(
+    func: Callable[[Any], Any],
+    tasks: Iterable[Any],
+    workers: int,
+    ordered: bool = True,
+) -> Generator[Any, None, None]:
+    """
+    Run ``func`` over ``tasks`` in a process pool and yield the results.
+
+    At most ``2 * workers`` tasks are in flight, so a slow consumer applies
+    backpressure instead of letting finished results pile up in memory.
+    """
+    tasks = iter(tasks)
+    workers = max(1, workers)
+    in_flight = deque()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+
+        def submit_next():
+            for task in tasks:
+                in_flight.append(executor.submit(func, task))
+                return True
+            return False
+
+        for _ in range(workers * 2):
+            if not submit_next():
+                break
+
+        try:
+            while in_flight:
+                if ordered:
+                    future = in_flight.popleft()
+                else:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    future = next(iter(done))
+                    in_flight.remove(future)
+
+                result = future.result()
+                submit_next()
+                yield result
+        finally:
+            for future in in_flight:
+                future.cancel()
@@ -0,0 +1,223 @@
+from typing import Any, Dict, Generator, List, Optional, Union
+import logging
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from .base import BaseParser
+from .columnar import ColumnarBatch
+from .vectorized import REQUIRED_FIELDS, RawBatch, build_columnar, clean_strings
+
+logger = logging.getLogger("poi_manager.parsers.parquet")
+
+# Raw record field -> accepted Parquet column names, in order of preference
+COLUMN_NAMES = {
+    "id": ("id", "external_id", "poi_id"),
+    "name": ("name", "poi_name"),
+    "category": ("category", "poi_category"),
+    "latitude": ("latitude", "poi_latitude"),
+    "longitude": ("longitude", "poi_longitude"),
+    "ratings": ("ratings", "poi_ratings"),
+    "description": ("description", "poi_description"),
+}
+
+
+class ParquetParser(BaseParser):
+    """
+    Reads Parquet files one record batch at a time with pyarrow.
+
+    Numeric coordinates and list-typed ratings are validated and converted
+    straight from the Arrow buffers, and batches are always emitted as
+    ColumnarBatch, so no per-row dicts are built. Columns with other types
+    (e.g. coordinates stored as strings) go through the generic batch
+    normalization used by the text parsers.
+    """
+
+    def __init__(self, *args, **kwargs):
+        if pa is None:
+            raise ImportError("Parsing Parquet files requires the pyarrow package")
+
+        super().__init__(*args, **kwargs)
+        self.columnar = True
+
+        if self.compression:
+            raise ValueError(
+                "Compressed Parquet files are not supported, Parquet already compresses its column chunks"
+            )
+
+    def parse(self) -> Generator[Union[List[Dict[str, Any]], ColumnarBatch], None, None]:
+        try:
+            parquet_file = pq.ParquetFile(self.file_path)
+            columns = self.resolve_columns(parquet_file.schema_arrow)
+
+            logger.info(
+                f"Reading {parquet_file.metadata.num_rows} rows in "
+                f"{parquet_file.num_row_groups} row groups"
+            )
+
+            row_groups, skip = self.resume_row_groups(parquet_file)
+
+            for record_batch in parquet_file.iter_batches(
+                batch_size=self.batch_size, row_groups=row_groups, columns=sorted(set(columns.values()))
+            ):
+                if skip:
+                    skipped = min(skip, record_batch.num_rows)
+                    record_batch = record_batch.slice(skipped)
+                    self.records_read += skipped
+                    skip -= skipped
+                    if not record_batch.num_rows:
+                        continue
+
+                self.records_read += record_batch.num_rows
+                batch = self.normalize_record_batch(record_batch, columns)
+                if batch:
+                    self.positions.append(self.records_read)
+                    yield batch
+
+        except Exception as e:
+            logger.error(f"Fatal error parsing Parquet file: {e}")
+            raise
+
+        logger.info(f"Parquet parsing complete. Processed {self.records_processed} records")
+
+    def resume_row_groups(self, parquet_file):
+        """
+        Return the row groups to read and the rows still to skip in the first
+        of them, so resuming never decodes the row groups before the resume point.
+        """
+        skip = self.start_record
+        first = 0
+        while first < parquet_file.num_row_groups:
+            rows = parquet_file.metadata.row_group(first).num_rows
+            if skip < rows:
+                break
+            skip -= rows
+            self.records_read += rows
+            first += 1
+
+        return list(range(first, parquet_file.num_row_groups)), skip
+
+    def resolve_columns(self, schema) -> Dict[str, str]:
+        """Map raw record fields to the Parquet columns that hold them."""
+        columns = {}
+        for field, candidates in COLUMN_NAMES.items():
+            for name in candidates:
+                if schema.get_field_index(name) != -1:
+                    columns[field] = name
+                    break
+        return columns
+
+    def normalize_record_batch(self, record_batch, columns: Dict[str, str]) -> Optional[ColumnarBatch]:
+        data = {field: record_batch.column(name) for field, name in columns.items()}
+        n = record_batch.num_rows
+
+        if not self.supports_fast_path(data):
+            return self.normalize_generic(data, n)
+
+        valid = np.ones(n, dtype=bool)
+        for field in REQUIRED_FIELDS:
+            if field in data:
+                missing = valid & data[field].is_null().to_numpy(zero_copy_only=False)
+            else:
+                missing = valid.copy()
+            for _ in np.flatnonzero(missing):
+                logger.warning(f"Record missing required field: {field}")
+            valid &= ~missing
+
+        latitude = self.float_column(data["latitude"])
+        longitude = self.float_column(data["longitude"])
+
+        with np.errstate(invalid="ignore"):
+            bad_latitude = valid & ~((latitude >= -90) & (latitude <= 90))
+            valid &= ~bad_latitude
+            bad_longitude = valid & ~((longitude >= -180) & (longitude <= 180))
+            valid &= ~bad_longitude
+
+        for i in np.flatnonzero(bad_latitude):
+            logger.warning(f"Invalid latitude: {latitude[i]}")
+        for i in np.flatnonzero(bad_longitude):
+            logger.warning(f"Invalid longitude: {longitude[i]}")
+
+        ids = data["id"].to_pylist() if "id" in data else [None] * n
+        for i in np.flatnonzero(~valid):
+            self.on_invalid_record(ids[i])
+
+        indices = np.flatnonzero(valid)
+        if not len(indices):
+            return None
+
+        take = pa.array(indices)
+        if "ratings" in data:
+            ratings = data["ratings"].take(take)
+            counts = pc.list_value_length(ratings).fill_null(0).to_numpy(zero_copy_only=False)
+            values = ratings.flatten().cast(pa.float64()).to_numpy(zero_copy_only=False)
+        else:
+            counts = np.zeros(len(indices), dtype=np.int64)
+            values = np.zeros(0, dtype=np.float64)
+
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        batch = build_columnar(
+            [str(ids[i]) for i in indices.tolist()],
+            clean_strings(data["name"].take(take).to_pylist()),
+            clean_strings(data["category"].take(take).to_pylist()),
+            latitude[indices],
+            longitude[indices],
+            offsets,
+            np.ascontiguousarray(values, dtype=np.float64),
+            clean_strings(
+                data["description"].take(take).to_pylist() if "description" in data else [None] * len(indices)
+            ),
+        )
+
+        self.records_processed += len(batch)
+        return batch
+
+    def supports_fast_path(self, data: Dict[str, Any]) -> bool:
+        for field in ("latitude", "longitude"):
+            column_type = data[field].type if field in data else None
+            if column_type is None or not (pa.types.is_floating(column_type) or pa.types.is_integer(column_type)):
+                return False
+
+        ratings = data.get("ratings")
+        if ratings is None:
+            return True
+        if not (pa.types.is_list(ratings.type) or pa.types.is_large_list(ratings.type)):
+            return False
+        value_type = ratings.type.value_type
+        if not (pa.types.is_floating(value_type) or pa.types.is_integer(value_type)):
+            return False
+        # Null entries inside a ratings list are dropped per row by the
+        # generic path; the flat conversion cannot do that.
+        return ratings.flatten().null_count == 0
+
+    def float_column(self, column) -> np.ndarray:
+        return column.cast(pa.float64()).fill_null(np.nan).to_numpy(zero_copy_only=False)
+
+    def normalize_generic(self, data: Dict[str, Any], n: int) -> Optional[ColumnarBatch]:
+        raw = RawBatch()
+        for field in RawBatch.__slots__:
+            if field == "context":
+                continue
+            if field in data:
+                setattr(raw, field, data[field].to_pylist())
+            else:
+                setattr(raw, field, [None] * n)
+        raw.context = raw.id
+
+        batch = self.normalize_raw_batch(raw)
+        return batch or None
+
+    def on_invalid_record(self, record_id):
+        logger.warning(f"Skipping invalid Parquet record: {record_id}")
+
+    def on_record_error(self, record_id, message: str):
+        logger.error(f"Error processing Parquet record {record_id}: {message}")
+        self.errors.append({"item_id": record_id, "error": message})
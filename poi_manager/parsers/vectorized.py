@@ -0,0 +1,275 @@
+import re
+import sys
+from array import array
+from typing import Any, Dict, List, Tuple
+import logging
+
+import numpy as np
+
+from .columnar import ColumnarBatch
+
+__all__ = ("RawBatch", "NormalizedBatch", "normalize_batch", "clean_strings", "build_columnar", "build_records")
+
+logger = logging.getLogger("poi_manager.parsers")
+
+REQUIRED_FIELDS = ("id", "name", "latitude", "longitude", "category")
+
+# Joins a whole string column so whitespace can be collapsed with one regex
+# pass; a private-use code point that real data is not expected to contain.
+_SEPARATOR = "\ue000"
+_WHITESPACE = re.compile(r"\s+")
+
+
+class RawBatch:
+    """
+    Unvalidated records collected column by column, plus a per-row ``context``
+    the parser uses to report rejected rows (row number, source item, ...).
+    """
+
+    __slots__ = (
+        "id",
+        "name",
+        "category",
+        "latitude",
+        "longitude",
+        "ratings",
+        "description",
+        "context",
+    )
+
+    def __init__(self):
+        for column in self.__slots__:
+            setattr(self, column, [])
+
+    def append(self, record: Dict[str, Any], context: Any = None):
+        self.id.append(record.get("id"))
+        self.name.append(record.get("name"))
+        self.category.append(record.get("category"))
+        self.latitude.append(record.get("latitude"))
+        self.longitude.append(record.get("longitude"))
+        self.ratings.append(record.get("ratings"))
+        self.description.append(record.get("description"))
+        self.context.append(context)
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+
+class NormalizedBatch:
+    def __init__(self, batch, rejected: List[int], errors: List[Tuple[int, str]]):
+        self.batch = batch
+        # Row indices that failed validation, in row order
+        self.rejected = rejected
+        # (row index, message) for rows that passed validation but could not be normalized
+        self.errors = errors
+
+
+def normalize_batch(raw: RawBatch, columnar: bool = False) -> NormalizedBatch:
+    """
+    Validate and normalize a whole batch at once.
+
+    Coordinates are converted and range-checked as float64 arrays and ratings
+    are parsed into one flat array with per-row counts. Rows are accepted or
+    rejected exactly as ``BaseParser.validate_record``/``normalize_record``
+    would, and the same warnings are logged.
+    """
+    n = len(raw)
+    valid = np.ones(n, dtype=bool)
+
+    for field in REQUIRED_FIELDS:
+        missing = valid & np.array([v is None for v in getattr(raw, field)], dtype=bool)
+        for _ in np.flatnonzero(missing):
+            logger.warning(f"Record missing required field: {field}")
+        valid &= ~missing
+
+    latitude, lat_errors = to_float_array(raw.latitude, valid)
+    longitude, lon_errors = to_float_array(raw.longitude, valid)
+    for i in np.flatnonzero(valid).tolist():
+        if i in lat_errors or i in lon_errors:
+            logger.warning(f"Invalid coordinates: {lat_errors.get(i, lon_errors.get(i))}")
+            valid[i] = False
+
+    with np.errstate(invalid="ignore"):
+        bad_latitude = valid & ~((latitude >= -90) & (latitude <= 90))
+        valid &= ~bad_latitude
+        bad_longitude = valid & ~((longitude >= -180) & (longitude <= 180))
+        valid &= ~bad_longitude
+
+    for i in np.flatnonzero(bad_latitude):
+        logger.warning(f"Invalid latitude: {latitude[i]}")
+    for i in np.flatnonzero(bad_longitude):
+        logger.warning(f"Invalid longitude: {longitude[i]}")
+
+    rejected = np.flatnonzero(~valid).tolist()
+    indices = np.flatnonzero(valid)
+
+    counts, values, rating_errors = parse_ratings_column(raw.ratings, indices)
+    errors = sorted(rating_errors.items())
+    if rating_errors:
+        keep = np.array([i not in rating_errors for i in indices.tolist()], dtype=bool)
+        indices = indices[keep]
+        counts = counts[keep]
+
+    offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    rows = indices.tolist()
+    columns = (
+        [str(raw.id[i]) for i in rows],
+        clean_strings([raw.name[i] for i in rows]),
+        clean_strings([raw.category[i] for i in rows]),
+        latitude[indices],
+        longitude[indices],
+        offsets,
+        values,
+        clean_strings([raw.description[i] for i in rows]),
+    )
+
+    batch = build_columnar(*columns) if columnar else build_records(*columns)
+    return NormalizedBatch(batch, rejected, errors)
+
+
+def to_float_array(values: List[Any], mask: np.ndarray) -> Tuple[np.ndarray, Dict[int, str]]:
+    """
+    Convert ``values`` to float64 like ``float()`` would. Rows outside ``mask``
+    are ignored. Returns the array and a map of row index to conversion error.
+    """
+    data = [v if m else 0.0 for v, m in zip(values, mask.tolist())]
+
+    try:
+        result = np.array(data, dtype=np.float64)
+        if result.shape == (len(data),):
+            return result, {}
+    except (ValueError, TypeError):
+        pass
+
+    result = np.zeros(len(data), dtype=np.float64)
+    errors = {}
+    for i, value in enumerate(data):
+        try:
+            result[i] = float(value)
+        except (ValueError, TypeError) as e:
+            errors[i] = str(e)
+    return result, errors
+
+
+def parse_ratings_column(
+    ratings: List[Any], indices: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, Dict[int, str]]:
+    """
+    Parse the ratings of the rows in ``indices`` into per-row counts and one
+    flat float64 array, converting every rating of the batch in a single call.
+    """
+    values = [ratings[i] for i in indices.tolist()]
+
+    if all(type(value) is str for value in values):
+        stripped = [value.strip("{}[]") for value in values]
+        counts = np.array([s.count(",") + 1 if s else 0 for s in stripped], dtype=np.int64)
+        joined = ",".join(s for s in stripped if s)
+        tokens = joined.split(",") if joined else []
+    else:
+        counts = np.zeros(len(values), dtype=np.int64)
+        tokens = []
+        for position, value in enumerate(values):
+            if isinstance(value, list):
+                items = [r for r in value if r is not None]
+            elif isinstance(value, str):
+                stripped = value.strip("{}[]")
+                items = stripped.split(",") if stripped else []
+            else:
+                items = []
+            counts[position] = len(items)
+            tokens.extend(items)
+
+    try:
+        values = np.array(tokens, dtype=np.float64)
+        if values.shape == (len(tokens),):
+            return counts, values, {}
+    except (ValueError, TypeError):
+        pass
+
+    return parse_ratings_rowwise(ratings, indices)
+
+
+def parse_ratings_rowwise(
+    ratings: List[Any], indices: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, Dict[int, str]]:
+    """Fallback for batches with unparsable ratings, mirroring ``BaseParser.parse_ratings``."""
+    counts = np.zeros(len(indices), dtype=np.int64)
+    parsed = []
+    errors = {}
+
+    for position, i in enumerate(indices.tolist()):
+        value = ratings[i]
+        row = []
+        if isinstance(value, list):
+            try:
+                row = [float(r) for r in value if r is not None]
+            except Exception as e:
+                errors[i] = str(e)
+        elif isinstance(value, str):
+            stripped = value.strip("{}[]")
+            if stripped:
+                try:
+                    row = [float(r.strip()) for r in stripped.split(",")]
+                except ValueError:
+                    logger.warning(f"Could not parse ratings: {value}")
+        counts[position] = len(row)
+        parsed.extend(row)
+
+    return counts, np.array(parsed, dtype=np.float64), errors
+
+
+def clean_strings(values: List[Any]) -> List[str]:
+    """
+    Column-wide equivalent of ``BaseParser.clean_string``: drop NUL bytes,
+    collapse whitespace runs and truncate to 500 characters.
+    """
+    if not values:
+        return []
+
+    texts = ["" if value is None else str(value) for value in values]
+    joined = _SEPARATOR.join(texts)
+
+    if joined.count(_SEPARATOR) != len(texts) - 1:
+        return [" ".join(text.replace("\x00", "").split())[:500] for text in texts]
+
+    joined = _WHITESPACE.sub(" ", joined.replace("\x00", ""))
+    return [piece.strip()[:500] for piece in joined.split(_SEPARATOR)]
+
+
+def build_columnar(
+    external_id, name, category, latitude, longitude, offsets, values, description
+) -> ColumnarBatch:
+    batch = ColumnarBatch()
+    batch.external_id = external_id
+    batch.name = name
+    batch.category = [sys.intern(value) for value in category]
+    batch.description = description
+    batch.latitude = array("d", latitude.tobytes())
+    batch.longitude = array("d", longitude.tobytes())
+    batch.rating_offsets = array("q", offsets.tobytes())
+    batch.rating_values = array("d", values.tobytes())
+    return batch
+
+
+def build_records(
+    external_id, name, category, latitude, longitude, offsets, values, description
+) -> List[Dict[str, Any]]:
+    latitude = latitude.tolist()
+    longitude = longitude.tolist()
+    offsets = offsets.tolist()
+    values = values.tolist()
+
+    return [
+        {
+            "external_id": external_id[i],
+            "name": name[i],
+            "category": category[i],
+            "latitude": latitude[i],
+            "longitude": longitude[i],
+            "ratings": values[offsets[i]:offsets[i + 1]],
+            "description": description[i],
+        }
+        for i in range(len(external_id))
+    ]
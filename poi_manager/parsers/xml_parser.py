@@ -1,52 +1,54 @@
+import io
+import math
+import re
 from lxml import etree
-from typing import Generator, List, Dict, Any
+from typing import Generator, List, Dict, Any, Optional, Union
 import logging
 
 from .base import BaseParser
+from .columnar import ColumnarBatch
+from .vectorized import RawBatch, normalize_batch
+from .parallel import chunk_count, dump_batches, load_batch, run_parallel, split_byte_ranges
 
 logger = logging.getLogger("poi_manager.parsers.xml")
 
+RECORD_TAGS = ("DATA_RECORD", "poi")
+
+# Child element tag -> raw record field
+FIELD_TAGS = {
+    "pid": "id",
+    "pname": "name",
+    "pcategory": "category",
+    "platitude": "latitude",
+    "plongitude": "longitude",
+    "pratings": "ratings",
+    "description": "description",
+}
+
+XML_DECLARATION = re.compile(rb"""<\?xml[^>]*encoding\s*=\s*["']([A-Za-z0-9._-]+)["']""")
+
 
 class XMLParser(BaseParser):
 
-    def parse(self) -> Generator[List[Dict[str, Any]], None, None]:
-        batch = []
+    def parse(self) -> Generator[Union[List[Dict[str, Any]], ColumnarBatch], None, None]:
+        if self.use_parallel():
+            record_tag = self.detect_record_tag()
+            if record_tag:
+                yield from self.parse_parallel(record_tag)
+                return
+            logger.info("No record element found near the start of the file, parsing serially")
+
+        raw = self.new_raw_batch()
 
         try:
-            context = etree.iterparse(
-                self.file_path, events=("start", "end")
-            )
-            context = iter(context)
+            with self.open_input() as f:
+                for elem in self.iter_elements(f):
+                    if self.skip_record():
+                        continue
 
-            for event, elem in context:
-                if event == "end" and elem.tag in ["DATA_RECORD", "poi"]:
                     try:
-                        record = {
-                            "id": self.get_text(elem, "pid"),
-                            "name": self.get_text(elem, "pname"),
-                            "category": self.get_text(elem, "pcategory"),
-                            "latitude": self.get_text(elem, "platitude"),
-                            "longitude": self.get_text(elem, "plongitude"),
-                            "ratings": self.get_text(elem, "pratings"),
-                            "description": self.get_text(elem, "description"),
-                        }
-
-                        if self.validate_record(record):
-                            normalized = self.normalize_record(record)
-                            batch.append(normalized)
-                            self.records_processed += 1
-
-                            if len(batch) >= self.batch_size:
-                                yield batch
-                                batch = []
-                        else:
-                            logger.warning(
-                                f"Skipping invalid XML record: {record.get('id')}"
-                            )
-
-                        elem.clear()
-                        while elem.getprevious() is not None:
-                            del elem.getparent()[0]
+                        record = self.element_to_record(elem)
+                        raw.append(record, record)
 
                     except Exception as e:
                         logger.error(f"Error processing XML element: {e}")
@@ -57,8 +59,12 @@ class XMLParser(BaseParser):
                             }
                         )
 
-            if batch:
-                yield batch
+                    if len(raw) >= self.batch_size:
+                        yield from self.emit(raw)
+                        raw = self.new_raw_batch()
+
+            if raw:
+                yield from self.emit(raw)
 
         except Exception as e:
             logger.error(f"Fatal error parsing XML file: {e}")
@@ -66,9 +72,173 @@ class XMLParser(BaseParser):
 
         logger.info(f"XML parsing complete. Processed {self.records_processed} records")
 
-    def get_text(self, element, tag):
-        child = element.find(tag)
-        if child is not None and child.text:
-            return child.text.strip()
-        return None
+    def iter_elements(self, source) -> Generator[Any, None, None]:
+        """
+        Yield each record element once it is complete. Only end events for the
+        record tags are reported, and each record is freed after it is consumed.
+        """
+        for _, elem in etree.iterparse(source, events=("end",), tag=RECORD_TAGS):
+            yield elem
+
+            elem.clear(keep_tail=True)
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+    def element_to_record(self, elem) -> Dict[str, Any]:
+        """Extract the raw fields in a single pass over the record's children."""
+        record = {}
+        for child in elem:
+            field = FIELD_TAGS.get(child.tag)
+            # Like element.find(), the first matching child wins
+            if field is not None and field not in record:
+                text = child.text
+                record[field] = text.strip() if text else None
+        return record
+
+    def detect_record_tag(self) -> Optional[str]:
+        head = self.read_head(65536)
+        match = re.search(rb"<(%s)[\s/>]" % b"|".join(tag.encode() for tag in RECORD_TAGS), head)
+        return match.group(1).decode() if match else None
+
+    def declared_encoding(self) -> str:
+        head = self.read_head(1024)
+        match = XML_DECLARATION.match(head.lstrip(b"\xef\xbb\xbf \t\r\n"))
+        return match.group(1).decode() if match else "utf-8"
+
+    def parse_parallel(self, record_tag: str) -> Generator[Union[List[Dict[str, Any]], ColumnarBatch], None, None]:
+        """
+        Split the file right after closing record tags and parse the chunks in
+        worker processes. Record elements must not be nested in one another and
+        the closing tag must not appear inside comments or CDATA sections.
+        """
+        ranges = split_byte_ranges(
+            self.file_path,
+            0,
+            self.file_size,
+            chunk_count(self.file_size, self.workers),
+            delimiter=f"</{record_tag}>".encode(),
+        )
+        encoding = self.declared_encoding()
+        tasks = [
+            (self.file_path, self.batch_size, self.columnar, record_tag, encoding, start, end)
+            for start, end in ranges
+        ]
+
+        logger.info(f"Parsing {len(ranges)} XML chunks with {self.workers} worker processes")
+
+        for result in run_parallel(parse_xml_range, tasks, self.workers, self.ordered):
+            for record_id in result["invalid_ids"]:
+                logger.warning(f"Skipping invalid XML record: {record_id}")
+            for error in result["errors"]:
+                logger.error(f"Error processing XML element: {error['error']}")
+                self.errors.append(error)
+
+            for data in result["batches"]:
+                batch = load_batch(data)
+                self.records_processed += len(batch)
+                yield batch
+
+        logger.info(f"XML parsing complete. Processed {self.records_processed} records")
+
+    def split_chunks(self, chunk_bytes: int) -> Optional[List[Dict[str, Any]]]:
+        record_tag = self.detect_record_tag() if self.supports_parallel() else None
+        if not record_tag:
+            return None
+
+        ranges = split_byte_ranges(
+            self.file_path,
+            0,
+            self.file_size,
+            max(1, math.ceil(self.file_size / chunk_bytes)),
+            delimiter=f"</{record_tag}>".encode(),
+        )
+        encoding = self.declared_encoding()
+        return [
+            {"start": start, "end": end, "encoding": encoding, "record_tag": record_tag}
+            for start, end in ranges
+        ]
+
+    def parse_chunk(self, chunk: Dict[str, Any]) -> Generator[Union[List[Dict[str, Any]], ColumnarBatch], None, None]:
+        report = self.new_range_report()
+
+        for batch in self.iter_range(chunk["start"], chunk["end"], chunk["record_tag"], chunk["encoding"], report):
+            self.records_processed += len(batch)
+            yield batch
+
+        for record_id in report["invalid_ids"]:
+            logger.warning(f"Skipping invalid XML record: {record_id}")
+        for error in report["errors"]:
+            logger.error(f"Error processing XML element: {error['error']}")
+            self.errors.append(error)
+
+    def new_range_report(self) -> Dict[str, Any]:
+        return {"invalid_ids": [], "errors": []}
+
+    def parse_range(self, start: int, end: int, record_tag: str, encoding: str) -> Dict[str, Any]:
+        report = self.new_range_report()
+        batches = list(self.iter_range(start, end, record_tag, encoding, report))
+        return {"batches": batches, **report}
+
+    def iter_range(
+        self, start: int, end: int, record_tag: str, encoding: str, report: Dict[str, Any]
+    ) -> Generator[Union[List[Dict[str, Any]], ColumnarBatch], None, None]:
+        """
+        Yield the batches of the complete ``record_tag`` elements in
+        ``[start, end)``. They are cut out of the surrounding document and
+        wrapped in a synthetic root.
+        """
+        with open(self.file_path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+
+        tag = record_tag.encode()
+        elements = re.findall(
+            rb"<%s(?:\s[^>]*)?(?<!/)>.*?</%s>|<%s(?:\s[^>]*)?/>" % (tag, tag, tag), data, re.DOTALL
+        )
+        document = b"".join(
+            [f'<?xml version="1.0" encoding="{encoding}"?><RECORDS>'.encode(), *elements, b"</RECORDS>"]
+        )
+
+        raw = self.new_raw_batch()
+        invalid_ids = report["invalid_ids"]
+        errors = report["errors"]
+
+        def flush(raw: RawBatch):
+            result = normalize_batch(raw, columnar=self.columnar)
+            invalid_ids.extend(raw.context[i].get("id") for i in result.rejected)
+            for i, message in result.errors:
+                errors.append({"error": message, "data": raw.context[i]})
+            return result.batch
+
+        for elem in self.iter_elements(io.BytesIO(document)):
+            try:
+                record = self.element_to_record(elem)
+                raw.append(record, record)
+            except Exception as e:
+                errors.append({"error": str(e), "element": etree.tostring(elem, encoding="unicode")})
+
+            if len(raw) >= self.batch_size:
+                batch = flush(raw)
+                if batch:
+                    yield batch
+                raw = self.new_raw_batch()
+
+        if raw:
+            batch = flush(raw)
+            if batch:
+                yield batch
+
+    def on_invalid_record(self, record):
+        logger.warning(f"Skipping invalid XML record: {record.get('id')}")
+
+    def on_record_error(self, record, message: str):
+        logger.error(f"Error processing XML element: {message}")
+        self.errors.append({"error": message, "data": record})
+
 
+def parse_xml_range(task) -> Dict[str, Any]:
+    file_path, batch_size, columnar, record_tag, encoding, start, end = task
+    parser = XMLParser(file_path, batch_size, columnar=columnar)
+    result = parser.parse_range(start, end, record_tag, encoding)
+    result["batches"] = dump_batches(result["batches"])
+    return result
@@ -0,0 +1,64 @@
+import queue
+import threading
+from typing import Any, Generator, Iterable
+import logging
+
+logger = logging.getLogger("poi_manager.pipeline")
+
+_DONE = object()
+
+
+class _ProducerError:
+    def __init__(self, exception: BaseException):
+        self.exception = exception
+
+
+def pipelined(batches: Iterable[Any], max_in_flight: int = 2) -> Generator[Any, None, None]:
+    """
+    Consume ``batches`` in a background thread and hand them over through a
+    bounded queue, so parsing the next batch overlaps with writing the current
+    one.
+
+    At most ``max_in_flight`` parsed batches wait in the queue; the producer
+    blocks once it is full. Exceptions raised while producing are re-raised in
+    the consuming thread. Only the consuming thread may touch the database.
+    """
+    if max_in_flight < 1:
+        yield from batches
+        return
+
+    handoff = queue.Queue(maxsize=max_in_flight)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                handoff.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for batch in batches:
+                if not put(batch):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(_ProducerError(e))
+
+    producer = threading.Thread(target=produce, name="poi-import-producer", daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            item = handoff.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _ProducerError):
+                raise item.exception
+            yield item
+    finally:
+        stop.set()
+        producer.join()
@@ -0,0 +1,142 @@
+import logging
+import time
+from typing import Any, Dict, Optional
+
+import django_rq
+from redis.exceptions import RedisError
+
+__all__ = ("ImportProgress",)
+
+logger = logging.getLogger("poi_manager.progress")
+
+PROGRESS_KEY = "poi_manager:import:{}:progress"
+
+# Progress of finished or abandoned imports expires after a day
+PROGRESS_TTL = 24 * 60 * 60
+
+COUNTERS = ("parsed", "written", "failed", "skipped", "bytes_consumed")
+
+
+class ImportProgress:
+    """
+    Live counters of one import, kept in a Redis hash.
+
+    Every loaded batch increments the counters with one pipelined round trip.
+    Unlike the counters saved to ImportBatch, they include records parsed
+    and bytes consumed, from which the rate and ETA follow. Chunk jobs of the same import increment the same hash.
+    Redis errors disable progress tracking for the import instead of failing it.
+    """
+
+    def __init__(self, batch_id, connection=None):
+        self.batch_id = batch_id
+        self.key = PROGRESS_KEY.format(batch_id)
+        self.connection = connection
+        self.enabled = True
+        self.bytes_reported = 0
+
+    def get_connection(self):
+        if self.connection is None:
+            self.connection = django_rq.get_connection("default")
+        return self.connection
+
+    def start(self, total_bytes: Optional[int] = None, reset: bool = True, **counters):
+        """
+        Start tracking an import. ``counters`` restore the counts of a resumed
+        import. With ``reset=False`` an existing hash is kept, so the chunk jobs
+        of one import can all call it.
+        """
+        now = time.time()
+        if reset:
+            mapping = {name: counters.get(name, 0) for name in COUNTERS}
+            mapping.update(started_at=now, updated_at=now, status="processing")
+            if total_bytes:
+                mapping["total_bytes"] = total_bytes
+            self.execute(lambda pipe: (pipe.delete(self.key), pipe.hset(self.key, mapping=mapping)))
+        else:
+            def init(pipe):
+                pipe.hsetnx(self.key, "started_at", now)
+                if total_bytes:
+                    pipe.hsetnx(self.key, "total_bytes", total_bytes)
+                pipe.hset(self.key, mapping={"updated_at": now, "status": "processing"})
+
+            self.execute(init)
+
+    def add(
+        self,
+        parsed: int = 0,
+        written: int = 0,
+        failed: int = 0,
+        skipped: int = 0,
+        bytes_consumed: Optional[int] = None,
+    ):
+        """
+        Add the counts of one batch. ``bytes_consumed`` is the total number
+        of input bytes this worker has read so far, when known.
+        """
+        increments = {"parsed": parsed, "written": written, "failed": failed, "skipped": skipped}
+        if bytes_consumed is not None:
+            increments["bytes_consumed"] = bytes_consumed - self.bytes_reported
+            self.bytes_reported = bytes_consumed
+
+        def update(pipe):
+            for name, value in increments.items():
+                if value:
+                    pipe.hincrby(self.key, name, value)
+            pipe.hset(self.key, "updated_at", time.time())
+
+        self.execute(update)
+
+    def finish(self, status: str):
+        self.execute(lambda pipe: pipe.hset(self.key, mapping={"status": status, "updated_at": time.time()}))
+
+    def execute(self, commands):
+        if not self.enabled:
+            return
+
+        try:
+            with self.get_connection().pipeline(transaction=False) as pipe:
+                commands(pipe)
+                pipe.expire(self.key, PROGRESS_TTL)
+                pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Disabling progress tracking for import {self.batch_id}: {e}")
+            self.enabled = False
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        """
+        Return the counters with the average rate (records written per
+        second since the import started or resumed) and, when the input size
+        is known, the completed fraction and ETA in seconds. Returns None when
+        no progress is stored for the import.
+        """
+        values = self.get_connection().hgetall(self.key)
+        if not values:
+            return None
+
+        values = {key.decode(): value.decode() for key, value in values.items()}
+        progress = {name: int(values.get(name, 0)) for name in COUNTERS}
+        started_at = float(values["started_at"])
+        updated_at = float(values["updated_at"])
+        total_bytes = int(values["total_bytes"]) if "total_bytes" in values else None
+
+        status = values.get("status", "processing")
+        elapsed = (time.time() if status == "processing" else updated_at) - started_at
+        rate = progress["written"] / elapsed if elapsed > 0 else None
+
+        fraction = None
+        eta = None
+        if total_bytes and progress["bytes_consumed"]:
+            fraction = min(progress["bytes_consumed"] / total_bytes, 1.0)
+            if status == "processing":
+                eta = elapsed * (1 - fraction) / fraction
+
+        progress.update(
+            status=status,
+            total_bytes=total_bytes,
+            started_at=started_at,
+            updated_at=updated_at,
+            rate=rate,
+            fraction=fraction,
+            eta_seconds=eta,
+        )
+        return progress
@@ -0,0 +1,62 @@
+import math
+from typing import Dict, List, Sequence
+
+__all__ = (
+    "HISTOGRAM_BUCKETS",
+    "rating_bucket",
+    "rating_histogram",
+    "empty_histogram",
+    "AVG_RATING_SQL",
+    "RATING_COUNT_SQL",
+    "RATING_SUM_SQL",
+    "RATING_HISTOGRAM_SQL",
+    "RATING_BUCKET_SQL",
+    "ALL_RATINGS_SQL",
+    "rating_columns_sql",
+)
+
+# One histogram bucket per whole star, 0 to 5; ratings are rounded half up
+HISTOGRAM_BUCKETS = 6
+
+# SQL expressions deriving the rating aggregates; format ``ratings`` with a
+# float8[] expression and ``rating`` with a float8 expression
+RATING_BUCKET_SQL = "LEAST(GREATEST(floor({rating} + 0.5)::int, 0), 5)"
+AVG_RATING_SQL = "(SELECT avg(rating) FROM unnest({ratings}) AS rating)"
+RATING_COUNT_SQL = "COALESCE(cardinality({ratings}), 0)"
+RATING_SUM_SQL = "COALESCE((SELECT sum(rating) FROM unnest({ratings}) AS rating), 0)"
+RATING_HISTOGRAM_SQL = (
+    "ARRAY(SELECT count(rating) FROM generate_series(0, 5) AS star "
+    "LEFT JOIN unnest({ratings}) AS rating ON "
+    + RATING_BUCKET_SQL.format(rating="rating")
+    + " = star GROUP BY star ORDER BY star)::int[]"
+)
+
+# All ratings of a POI as a float8[]: those imported with it, followed by its
+# rating events. Format ``ratings``, the rating event table ``events`` and the
+# POI ``poi_id``; the result can be passed as ``ratings`` to the above.
+ALL_RATINGS_SQL = "({ratings} || ARRAY(SELECT rating FROM {events} WHERE poi_id = {poi_id} ORDER BY id))"
+
+
+def rating_columns_sql(ratings: str) -> Dict[str, str]:
+    """SQL for each rating aggregate column, derived from the float8[] ``ratings``."""
+    return {
+        "avg_rating": AVG_RATING_SQL.format(ratings=ratings),
+        "rating_count": RATING_COUNT_SQL.format(ratings=ratings),
+        "rating_sum": RATING_SUM_SQL.format(ratings=ratings),
+        "rating_histogram": RATING_HISTOGRAM_SQL.format(ratings=ratings),
+    }
+
+
+def rating_bucket(rating: float) -> int:
+    return min(max(math.floor(rating + 0.5), 0), HISTOGRAM_BUCKETS - 1)
+
+
+def rating_histogram(ratings: Sequence[float]) -> List[int]:
+    histogram = empty_histogram()
+    for rating in ratings:
+        histogram[rating_bucket(rating)] += 1
+    return histogram
+
+
+def empty_histogram() -> List[int]:
+    return [0] * HISTOGRAM_BUCKETS
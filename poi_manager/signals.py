@@ -0,0 +1,25 @@
+from typing import NamedTuple
+
+from django.dispatch import Signal
+
+__all__ = ("POIState", "import_completed", "pois_changed")
+
+
+class POIState(NamedTuple):
+    """What the cluster pyramid and the map caches know of a POI."""
+
+    longitude: float
+    latitude: float
+    rating_sum: float
+    rating_count: int
+
+
+# Sent with ``import_batch`` once the POIs of an import are committed, and
+# with ``import_batch=None`` when the whole POI table was cleared or replaced
+import_completed = Signal()
+
+# Sent inside the transaction that changes POIs outside of imports, and for
+# POIs an import moved away from where they were, with the POIStates of the
+# changed POIs before (``removed``) and after (``added``) the change. New
+# POIs are only in ``added`` and deleted POIs only in ``removed``.
+pois_changed = Signal()
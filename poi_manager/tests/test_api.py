@@ -1,10 +1,11 @@
 from decimal import Decimal
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from poi_manager.api.serializers import BulkRatingsSerializer
 from poi_manager.models import ImportBatch, PointOfInterest
 
 User = get_user_model()
@@ -64,6 +65,304 @@ class PointOfInterestAPITestCase(TestCase):
         )
         self.assertEqual(nearby.count(), 1)
     
+    def test_nearest_pois(self):
+        """Test KNN ordering, distances and filters of nearest POIs"""
+        # Would test: /api/pois/nearby/?latitude=...&longitude=...
+        from django.contrib.gis.measure import Distance
+        from django.contrib.gis.geos import Point
+        
+        far = PointOfInterest(
+            external_id='POI002',
+            name='Brooklyn Bridge',
+            category='landmark',
+            latitude=Decimal('40.706086'),
+            longitude=Decimal('-73.996864'),
+            source_file='test.csv',
+            import_batch=self.batch
+        )
+        far.clean()
+        far.save()
+        
+        origin = Point(-73.968285, 40.785091, srid=4326)
+        nearest = list(PointOfInterest.objects.nearest(origin))
+        self.assertEqual([poi.external_id for poi in nearest], ['POI001', 'POI002'])
+        self.assertAlmostEqual(nearest[0].distance, 0, places=3)
+        self.assertAlmostEqual(nearest[1].distance, 9100, delta=200)
+        
+        within = PointOfInterest.objects.nearest(origin, radius=Distance(km=5))
+        self.assertEqual([poi.external_id for poi in within], ['POI001'])
+        landmarks = PointOfInterest.objects.nearest(origin, categories=['Landmark'])
+        self.assertEqual([poi.external_id for poi in landmarks], ['POI002'])
+        both = PointOfInterest.objects.nearest(origin, categories=['landmark', 'PARK'])
+        self.assertEqual([poi.external_id for poi in both], ['POI001', 'POI002'])
+    
+    def test_nearest_radius_edge(self):
+        """Test that the radius and the reported distance use the same sphere"""
+        import math
+        from django.contrib.gis.measure import Distance
+        from django.contrib.gis.geos import Point
+        from poi_manager.nearby import EARTH_RADIUS
+        
+        # Due north, 5 m inside and 5 m outside a 5 km radius on the sphere;
+        # the spheroid puts both inside
+        for external_id, metres in [('POI002', 4995), ('POI003', 5005)]:
+            latitude = 40.785091 + math.degrees(metres / EARTH_RADIUS)
+            poi = PointOfInterest(
+                external_id=external_id,
+                name=external_id,
+                category='park',
+                latitude=Decimal(f'{latitude:.7f}'),
+                longitude=Decimal('-73.968285'),
+                source_file='test.csv',
+                import_batch=self.batch
+            )
+            poi.clean()
+            poi.save()
+        
+        origin = Point(-73.968285, 40.785091, srid=4326)
+        within = list(PointOfInterest.objects.nearest(origin, radius=Distance(km=5)))
+        self.assertEqual([poi.external_id for poi in within], ['POI001', 'POI002'])
+        self.assertAlmostEqual(within[1].distance, 4995, delta=0.1)
+        self.assertTrue(all(poi.distance <= 5000 for poi in within))
+    
+    def test_nearby_pagination(self):
+        """Test keyset pagination of nearby POIs by distance and id"""
+        # Would test: /api/pois/nearby/?...&limit=2 followed by the next links
+        from django.contrib.gis.geos import Point
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+        from poi_manager.api.views import DistanceCursorPagination
+        
+        # POI002 and POI003 share a location, so their order falls back to the id
+        for external_id, longitude in [('POI002', '-73.958285'), ('POI003', '-73.958285'), ('POI004', '-73.948285')]:
+            poi = PointOfInterest(
+                external_id=external_id,
+                name=external_id,
+                category='park',
+                latitude=Decimal('40.785091'),
+                longitude=Decimal(longitude),
+                source_file='test.csv',
+                import_batch=self.batch
+            )
+            poi.clean()
+            poi.save()
+        
+        queryset = PointOfInterest.objects.nearest(Point(-73.968285, 40.785091, srid=4326))
+        url = '/api/pois/nearby/?latitude=40.785091&longitude=-73.968285&limit=2'
+        pages = []
+        while url:
+            paginator = DistanceCursorPagination()
+            page = paginator.paginate_queryset(queryset, Request(APIRequestFactory().get(url)))
+            pages.append([poi.external_id for poi in page])
+            url = paginator.get_next_link()
+        
+        self.assertEqual(pages, [['POI001', 'POI002'], ['POI003', 'POI004']])
+    
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_nearby_cell_cache(self):
+        """Test nearby queries answered from cached cell candidates"""
+        from poi_manager.nearby import find_nearest
+        
+        lon, lat = -73.968285, 40.785091
+        nearest = find_nearest(lon, lat, 20, radius=1000)
+        self.assertEqual([match[1] for match in nearest], [self.poi.pk])
+        self.assertAlmostEqual(nearest[0][0], 0, places=3)
+        
+        # A POI outside the cached cells may be closer than the 2nd result
+        self.assertIsNone(find_nearest(lon, lat, 2))
+        self.assertEqual(find_nearest(lon, lat, 20, radius=1000, categories=['beach']), [])
+        
+        # Completing an import replaces the versions of the cells it touched
+        other = PointOfInterest(
+            external_id='POI002',
+            name='Reservoir',
+            category='park',
+            latitude=Decimal('40.785591'),
+            longitude=Decimal('-73.968285'),
+            source_file='test.csv',
+            import_batch=self.batch
+        )
+        other.clean()
+        other.save()
+        self.assertEqual(len(find_nearest(lon, lat, 20, radius=1000)), 1)
+        self.batch.mark_completed()
+        self.assertEqual(
+            [match[1] for match in find_nearest(lon, lat, 20, radius=1000)], [self.poi.pk, other.pk]
+        )
+        
+        # Saving a POI replaces the versions of its old and new cells on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            other.latitude = Decimal('48.858370')
+            other.longitude = Decimal('2.294481')
+            other.clean()
+            other.save()
+        self.assertEqual([match[1] for match in find_nearest(lon, lat, 20, radius=1000)], [self.poi.pk])
+    
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_nearby_cell_cache_radius_edge(self):
+        """Test that cached and database nearby queries agree at the radius edge"""
+        import math
+        from django.contrib.gis.measure import Distance
+        from django.contrib.gis.geos import Point
+        from poi_manager.nearby import EARTH_RADIUS, find_nearest
+        
+        # Due north and due east, 2 m inside and 2 m outside a 1 km radius
+        lon, lat = -73.968285, 40.785091
+        for external_id, metres, bearing in [
+            ('POI002', 998, 'north'), ('POI003', 1002, 'north'), ('POI004', 998, 'east'), ('POI005', 1002, 'east'),
+        ]:
+            angle = math.degrees(metres / EARTH_RADIUS)
+            if bearing == 'north':
+                latitude, longitude = lat + angle, lon
+            else:
+                latitude, longitude = lat, lon + angle / math.cos(math.radians(lat))
+            poi = PointOfInterest(
+                external_id=external_id,
+                name=external_id,
+                category='park',
+                latitude=Decimal(f'{latitude:.7f}'),
+                longitude=Decimal(f'{longitude:.7f}'),
+                source_file='test.csv',
+                import_batch=self.batch
+            )
+            poi.clean()
+            poi.save()
+        
+        cached = find_nearest(lon, lat, 20, radius=1000)
+        database = PointOfInterest.objects.nearest(Point(lon, lat, srid=4326), radius=Distance(km=1))
+        self.assertEqual([match[1] for match in cached], [poi.pk for poi in database])
+        inside = PointOfInterest.objects.filter(pk__in=[match[1] for match in cached])
+        self.assertEqual(set(inside.values_list('external_id', flat=True)), {'POI001', 'POI002', 'POI004'})
+    
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_nearby_stale_candidates(self):
+        """Test that cached candidates of changed POIs are not paginated"""
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+        from poi_manager.api.views import DistanceCursorPagination
+        from poi_manager.nearby import find_nearest
+        
+        lon, lat = -73.968285, 40.785091
+        request = Request(APIRequestFactory().get('/api/pois/nearby/?limit=1'))
+        nearest = find_nearest(lon, lat, 2, radius=1000)
+        page = DistanceCursorPagination().paginate_nearest(nearest, PointOfInterest.objects.all(), request)
+        self.assertEqual(page, [self.poi])
+        
+        # Changed without committing, so the cached cells are still current
+        PointOfInterest.objects.filter(pk=self.poi.pk).update(category='museum')
+        self.assertEqual(find_nearest(lon, lat, 2, radius=1000), nearest)
+        self.assertIsNone(DistanceCursorPagination().paginate_nearest(nearest, PointOfInterest.objects.all(), request))
+        
+        PointOfInterest.objects.filter(pk=self.poi.pk).delete()
+        self.assertIsNone(DistanceCursorPagination().paginate_nearest(nearest, PointOfInterest.objects.all(), request))
+    
+    def test_bbox_filter(self):
+        """Test bounding box filters, including boxes crossing the antimeridian"""
+        # Would test: /api/pois/?bbox=minLon,minLat,maxLon,maxLat
+        from poi_manager.filtersets import PointOfInterestFilterSet
+        
+        fiji = PointOfInterest(
+            external_id='POI002',
+            name='Taveuni',
+            category='island',
+            latitude=Decimal('-16.85'),
+            longitude=Decimal('179.95'),
+            source_file='test.csv',
+            import_batch=self.batch
+        )
+        fiji.clean()
+        fiji.save()
+        
+        def filtered(**params):
+            filterset = PointOfInterestFilterSet(params, queryset=PointOfInterest.objects.all())
+            self.assertTrue(filterset.is_valid(), filterset.errors)
+            return sorted(filterset.qs.values_list('external_id', flat=True))
+        
+        self.assertEqual(filtered(bbox='-74.1,40.6,-73.8,40.9'), ['POI001'])
+        self.assertEqual(filtered(bbox='179,-20,-179,-10'), ['POI002'])
+        self.assertEqual(filtered(bbox='-180,-90,180,90', category='PARK'), ['POI001'])
+        self.assertEqual(filtered(min_latitude='0'), ['POI001'])
+        self.assertEqual(filtered(min_longitude='-74.1', max_longitude='-73.8'), ['POI001'])
+        
+        invalid = PointOfInterestFilterSet({'bbox': '1,2,3'}, queryset=PointOfInterest.objects.all())
+        self.assertFalse(invalid.is_valid())
+    
+    def test_search(self):
+        """Test ranked full-text, trigram and external id search"""
+        # Would test: /api/pois/?search=...
+        museum = PointOfInterest(
+            external_id='POI002',
+            name='Metropolitan Museum',
+            category='museum',
+            latitude=Decimal('40.779437'),
+            longitude=Decimal('-73.963244'),
+            description='Art museum on the edge of Central Park',
+            source_file='test.csv',
+            import_batch=self.batch
+        )
+        museum.clean()
+        museum.save()
+        
+        def search(text):
+            return list(PointOfInterest.objects.search(text).order_by('-rank').values_list('external_id', flat=True))
+        
+        # Name matches rank above description matches
+        self.assertEqual(search('central park'), ['POI001', 'POI002'])
+        self.assertEqual(search('museums'), ['POI002'])
+        self.assertEqual(search('Metropolitn Museum'), ['POI002'])
+        self.assertEqual(search('POI001'), ['POI001'])
+        self.assertEqual(search('aquarium'), [])
+    
+    @override_settings(ROOT_URLCONF='poi_manager.urls')
+    def test_add_ratings_endpoint(self):
+        """Test adding ratings to one POI and validating them"""
+        url = f'/api/pois/{self.poi.pk}/ratings/'
+        
+        response = self.client.post(url, {'ratings': [3.0, 2.0]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['rating_count'], 5)
+        self.assertEqual(response.data['avg_rating'], 3.7)
+        self.assertEqual(response.data['rating_histogram'], [0, 0, 1, 1, 1, 2])
+        
+        for ratings in ([5.5], [-1], [], [4.0] * 10001):
+            response = self.client.post(url, {'ratings': ratings}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response = self.client.post('/api/pois/0/ratings/', {'ratings': [4.0]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        
+        self.poi.refresh_from_db()
+        self.assertEqual(self.poi.rating_count, 5)
+    
+    @override_settings(ROOT_URLCONF='poi_manager.urls')
+    def test_bulk_add_ratings_endpoint(self):
+        """Test applying bulk rating events and rejecting invalid batches as a whole"""
+        url = '/api/pois/ratings/'
+        events = [{'poi': self.poi.pk, 'rating': 1.0}, {'poi': self.poi.pk, 'rating': 2.0}]
+        
+        response = self.client.post(url, {'events': events}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'events': 2, 'updated_pois': 1})
+        
+        invalid_batches = (
+            [{'poi': self.poi.pk, 'rating': 6.0}],
+            [{'poi': self.poi.pk}],
+            [],
+            [{'poi': self.poi.pk, 'rating': 4.0}, {'poi': 0, 'rating': 4.0}],
+        )
+        for invalid in invalid_batches:
+            response = self.client.post(url, {'events': invalid}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Unknown POI ids: 0', str(response.data))
+        
+        # A request this large exceeds Django's upload limit before reaching the serializer
+        too_many = BulkRatingsSerializer(data={'events': [{'poi': self.poi.pk, 'rating': 4.0}] * 100001})
+        self.assertFalse(too_many.is_valid())
+        
+        self.poi.refresh_from_db()
+        self.assertEqual(self.poi.rating_count, 5)
+        self.assertEqual(self.poi.rating_sum, 16.5)
+    
     def test_categories_endpoint(self):
         """Test categories aggregation logic"""
         # Would test: /api/pois/categories/
@@ -72,6 +371,93 @@ class PointOfInterestAPITestCase(TestCase):
         categories = PointOfInterest.objects.values('category').annotate(count=Count('id'))
         self.assertEqual(len(categories), 1)
         self.assertEqual(categories[0]['category'], 'park')
+    
+    def test_vector_tiles(self):
+        """Test vector tile rendering for the tile containing a POI"""
+        # Would test: /api/pois/tiles/{z}/{x}/{y}.mvt
+        from poi_manager.tiles import render_tile, tile_range
+        
+        lon, lat = -73.968285, 40.785091
+        x, y, max_x, max_y = tile_range((lon, lat, lon, lat), 12)
+        self.assertEqual((x, y), (max_x, max_y))
+        self.assertEqual(tile_range((lon, lat, lon, lat), 0), (0, 0, 0, 0))
+        
+        self.assertGreater(len(render_tile(12, x, y)), 0)
+        self.assertGreater(len(render_tile(12, x, y, ['park'])), 0)
+        self.assertGreater(len(render_tile(12, x, y, ['Park', 'beach'])), 0)
+        self.assertEqual(render_tile(12, x, y, ['beach']), b'')
+        self.assertEqual(render_tile(12, x + 1, y), b'')
+    
+    def test_moved_poi_invalidates_tiles(self):
+        """Test that moving a POI invalidates the tiles it left and entered"""
+        from poi_manager.tiles import tile_range, tile_versions
+        
+        old_tile = tile_range((-73.968285, 40.785091, -73.968285, 40.785091), 12)[:2]
+        new_tile = tile_range((2.294481, 48.858370, 2.294481, 48.858370), 12)[:2]
+        other_tile = (old_tile[0] + 1, old_tile[1])
+        before = tile_versions(12, [old_tile, new_tile, other_tile])
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.poi.latitude = Decimal('48.858370')
+            self.poi.longitude = Decimal('2.294481')
+            self.poi.clean()
+            self.poi.save()
+        
+        after = tile_versions(12, [old_tile, new_tile, other_tile])
+        self.assertNotEqual(after[old_tile], before[old_tile])
+        self.assertNotEqual(after[new_tile], before[new_tile])
+        self.assertEqual(after[other_tile], before[other_tile])
+    
+    def test_clusters(self):
+        """Test cluster aggregation from the pyramid and by category"""
+        # Would test: /api/pois/clusters/?bbox=...&zoom=...
+        from poi_manager.clusters import get_clusters, rebuild_clusters
+        
+        bbox = (-74.1, 40.6, -73.8, 40.9)
+        # Saving the POI already added it to the pyramid
+        clusters = get_clusters(bbox, 10)
+        rebuild_clusters()
+        self.assertEqual(get_clusters(bbox, 10), clusters)
+        self.assertEqual(len(clusters), 1)
+        self.assertEqual(clusters[0]['count'], 1)
+        self.assertAlmostEqual(clusters[0]['avg_rating'], 4.5)
+        self.assertAlmostEqual(clusters[0]['latitude'], 40.785091, places=5)
+        
+        # Refreshing part of the pyramid yields the same cells
+        rebuild_clusters(bbox)
+        self.assertEqual(get_clusters(bbox, 2), get_clusters((-180, -85, 180, 85), 2))
+        self.assertEqual(get_clusters(bbox, 10, ['park']), clusters)
+        self.assertEqual(get_clusters(bbox, 10, ['beach']), [])
+        
+        with self.assertRaises(ValueError):
+            get_clusters((-180, -85, 180, 85), 14)
+    
+    def test_clusters_follow_poi_changes(self):
+        """Test that moves, new ratings and deletes adjust the pyramid"""
+        from poi_manager.clusters import get_clusters, rebuild_clusters
+        
+        old_bbox = (-74.1, 40.6, -73.8, 40.9)
+        new_bbox = (2.2, 48.8, 2.4, 48.9)
+        
+        self.poi.latitude = Decimal('48.858370')
+        self.poi.longitude = Decimal('2.294481')
+        self.poi.clean()
+        self.poi.save()
+        self.poi.add_ratings([1.0])
+        
+        self.assertEqual(get_clusters(old_bbox, 10), [])
+        clusters = get_clusters(new_bbox, 10)
+        self.assertEqual(len(clusters), 1)
+        self.assertAlmostEqual(clusters[0]['avg_rating'], 3.625)
+        self.assertAlmostEqual(clusters[0]['latitude'], 48.85837, places=5)
+        
+        # The adjusted cells match a rebuild from the POIs
+        rebuild_clusters()
+        self.assertEqual(get_clusters(new_bbox, 10), clusters)
+        
+        self.poi.delete()
+        self.assertEqual(get_clusters(new_bbox, 10), [])
+        self.assertEqual(get_clusters((-180, -85, 180, 85), 0), [])
 
 
 class ImportBatchAPITestCase(TestCase):
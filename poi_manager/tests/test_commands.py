@@ -1,10 +1,13 @@
 import os
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 from django.core.management import call_command
 from django.core.management.base import CommandError
 from io import StringIO
 
-from poi_manager.models import ImportBatch
+from poi_manager.jobs import import_poi_chunk_async
+from poi_manager.models import ImportBatch, PointOfInterest
+from poi_manager.parsers.csv_parser import CSVParser
+from poi_manager.pipeline import pipelined
 
 
 class ImportPOIsCommandTestCase(TestCase):
@@ -31,4 +34,143 @@ class ImportPOIsCommandTestCase(TestCase):
     def test_import_command_invalid_file(self):
         """Test import command with non-existent file"""
         with self.assertRaises(CommandError):
-            call_command('import_pois', '/non/existent/file.csv')
\ No newline at end of file
+            call_command('import_pois', '/non/existent/file.csv')
+    
+    def test_import_command_copy_loader(self):
+        """Test COPY loader imports records and counts duplicates as skipped"""
+        csv_file = os.path.join(self.fixtures_dir, 'test_pois.csv')
+        
+        call_command('import_pois', csv_file, loader='copy', stdout=StringIO())
+        call_command('import_pois', csv_file, loader='copy', stdout=StringIO())
+        
+        self.assertEqual(PointOfInterest.objects.count(), 5)
+        first, second = ImportBatch.objects.order_by('started_at')
+        self.assertEqual(first.records_processed, 5)
+        self.assertEqual(second.records_processed, 0)
+        self.assertEqual(second.records_skipped, 5)
+        
+        poi = PointOfInterest.objects.get(external_id='1806848972')
+        self.assertAlmostEqual(poi.location.y, 40.785091, places=5)
+        self.assertEqual(poi.rating_count, 5)
+    
+    def test_loaders_derive_identical_aggregates(self):
+        """Test SQL-derived locations and rating aggregates match the ORM loader"""
+        csv_file = os.path.join(self.fixtures_dir, 'test_pois.csv')
+        fields = ('external_id', 'avg_rating', 'rating_count', 'location')
+        
+        call_command('import_pois', csv_file, loader='orm', stdout=StringIO())
+        orm_rows = list(PointOfInterest.objects.order_by('external_id').values_list(*fields))
+        PointOfInterest.objects.all().delete()
+        call_command('import_pois', csv_file, loader='copy', stdout=StringIO())
+        copy_rows = list(PointOfInterest.objects.order_by('external_id').values_list(*fields))
+        
+        self.assertEqual(len(copy_rows), 5)
+        for orm_row, copy_row in zip(orm_rows, copy_rows):
+            self.assertEqual(orm_row[:1] + orm_row[2:3], copy_row[:1] + copy_row[2:3])
+            self.assertAlmostEqual(orm_row[1] or 0, copy_row[1] or 0)
+            self.assertTrue(orm_row[3].equals_exact(copy_row[3], 1e-9))
+    
+    def test_import_command_update_existing_upsert(self):
+        """Test upsert mode only rewrites changed records"""
+        csv_file = os.path.join(self.fixtures_dir, 'test_pois.csv')
+        
+        call_command('import_pois', csv_file, stdout=StringIO())
+        PointOfInterest.objects.filter(external_id='428667258').update(name='Old Name')
+        call_command('import_pois', csv_file, update_existing=True, stdout=StringIO())
+        
+        batch = ImportBatch.objects.order_by('started_at').last()
+        self.assertEqual(batch.records_processed, 1)
+        self.assertEqual(batch.records_skipped, 4)
+        poi = PointOfInterest.objects.get(external_id='428667258')
+        self.assertEqual(poi.name, 'Times Square')
+        self.assertEqual(poi.import_batch, batch)
+    
+    def test_import_command_saves_checkpoints(self):
+        """Test counters and checkpoint are saved with the batches they cover"""
+        csv_file = os.path.join(self.fixtures_dir, 'test_pois.csv')
+        
+        call_command('import_pois', csv_file, batch_size=2, stdout=StringIO())
+        
+        batch = ImportBatch.objects.get()
+        self.assertEqual(batch.records_processed, 5)
+        self.assertEqual(batch.checkpoint['batch'], 3)
+        self.assertEqual(batch.checkpoint['records'], 5)
+        self.assertEqual(batch.checkpoint['options']['batch_size'], 2)
+    
+    def test_import_command_full_reload(self):
+        """Test full reload replaces all POIs, keeping the ids of those still present"""
+        csv_file = os.path.join(self.fixtures_dir, 'test_pois.csv')
+        
+        call_command('import_pois', csv_file, stdout=StringIO())
+        PointOfInterest.objects.filter(external_id='428667258').update(external_id='stale')
+        ids = dict(PointOfInterest.objects.values_list('external_id', 'id'))
+        
+        call_command('import_pois', csv_file, full_reload=True, stdout=StringIO())
+        
+        self.assertEqual(PointOfInterest.objects.count(), 5)
+        self.assertFalse(PointOfInterest.objects.filter(external_id='stale').exists())
+        self.assertEqual(PointOfInterest.objects.get(external_id='1806848972').id, ids['1806848972'])
+        self.assertGreater(PointOfInterest.objects.get(external_id='428667258').id, max(ids.values()))
+        
+        # New rows still get ids from the table's identity column
+        poi = PointOfInterest.objects.first()
+        poi.pk = None
+        poi.external_id = 'NEW001'
+        poi.save()
+        self.assertGreater(poi.id, max(ids.values()))
+    
+    def test_recalculate_ratings_command(self):
+        """Test missing ratings are filled in and --all fixes outdated ones"""
+        csv_file = os.path.join(self.fixtures_dir, 'test_pois.csv')
+        call_command('import_pois', csv_file, stdout=StringIO())
+        expected = dict(PointOfInterest.objects.values_list('external_id', 'avg_rating'))
+        
+        PointOfInterest.objects.update(avg_rating=None)
+        call_command('recalculate_ratings', batch_size=2, stdout=StringIO())
+        self.assertEqual(dict(PointOfInterest.objects.values_list('external_id', 'avg_rating')), expected)
+        
+        PointOfInterest.objects.filter(external_id='1806848972').update(avg_rating=1.0, rating_count=0)
+        call_command('recalculate_ratings', batch_size=2, stdout=StringIO())
+        self.assertEqual(PointOfInterest.objects.get(external_id='1806848972').avg_rating, 1.0)
+        
+        call_command('recalculate_ratings', batch_size=2, recalculate_all=True, stdout=StringIO())
+        poi = PointOfInterest.objects.get(external_id='1806848972')
+        self.assertEqual(poi.avg_rating, expected['1806848972'])
+        self.assertEqual(poi.rating_count, 5)
+    
+    def test_chunk_jobs_aggregate_into_one_batch(self):
+        """Test chunk jobs of one file add their counts to the shared batch"""
+        csv_file = os.path.join(self.fixtures_dir, 'test_pois.csv')
+        batch = ImportBatch.objects.create(
+            file_path=csv_file,
+            file_name='test_pois.csv',
+            file_type='csv',
+            file_size=os.path.getsize(csv_file),
+        )
+        
+        chunks = CSVParser(csv_file).split_chunks(100)
+        self.assertGreater(len(chunks), 1)
+        for index, chunk in enumerate(chunks):
+            import_poi_chunk_async(batch.id, csv_file, {**chunk, 'index': index}, {'loader': 'copy'})
+        
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, 'processing')
+        self.assertEqual(batch.records_processed, 5)
+        self.assertEqual(PointOfInterest.objects.filter(import_batch=batch).count(), 5)
+
+
+
+class PipelineTestCase(SimpleTestCase):
+    
+    def test_pipelined_preserves_order(self):
+        """Test batches come out of the pipeline in production order"""
+        self.assertEqual(list(pipelined(iter(range(50)), max_in_flight=2)), list(range(50)))
+    
+    def test_pipelined_reraises_producer_errors(self):
+        """Test parser errors in the producer thread reach the consumer"""
+        def failing():
+            yield [1]
+            raise ValueError('bad file')
+        
+        with self.assertRaises(ValueError):
+            list(pipelined(failing()))
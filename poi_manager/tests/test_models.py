@@ -2,7 +2,8 @@ from decimal import Decimal
 from django.test import TestCase
 from django.utils import timezone
 
-from poi_manager.models import ImportBatch, PointOfInterest
+from poi_manager.error_sink import ImportErrorSink
+from poi_manager.models import ImportBatch, ImportRecordError, PointOfInterest, RatingEvent
 
 
 class ImportBatchTestCase(TestCase):
@@ -54,6 +55,27 @@ class ImportBatchTestCase(TestCase):
         self.assertEqual(batch.records_failed, 1)
         self.assertIn('errors', batch.error_log)
         self.assertEqual(len(batch.error_log['errors']), 1)
+    
+    def test_error_sink_keeps_sample_and_all_rows(self):
+        """Test buffered errors are written in bulk with a capped sample in error_log"""
+        batch = ImportBatch.objects.create(
+            file_path='/test/data.csv',
+            file_name='data.csv',
+            file_type='csv'
+        )
+        sink = ImportErrorSink(batch, buffer_size=10, sample_size=5)
+        for i in range(25):
+            sink.add(f'Error {i}', {'id': i})
+        
+        # Two full buffers were flushed automatically
+        self.assertEqual(ImportRecordError.objects.filter(import_batch=batch).count(), 20)
+        sink.flush()
+        
+        batch.refresh_from_db()
+        self.assertEqual(ImportRecordError.objects.filter(import_batch=batch).count(), 25)
+        self.assertEqual(batch.records_failed, 25)
+        self.assertEqual(batch.error_count(), 25)
+        self.assertEqual([e['message'] for e in batch.error_log['errors']], [f'Error {i}' for i in range(5)])
 
 
 class PointOfInterestTestCase(TestCase):
@@ -100,6 +122,79 @@ class PointOfInterestTestCase(TestCase):
         self.assertEqual(poi.avg_rating, 4.0)
         self.assertEqual(poi.rating_count, 3)
     
+    def test_poi_add_ratings_updates_running_aggregates(self):
+        """Test added ratings are kept as events and update the sum, count, average and histogram"""
+        pois = []
+        for external_id in ('POI004', 'POI005'):
+            poi = PointOfInterest(
+                external_id=external_id,
+                name='Test Cafe',
+                category='cafe',
+                latitude=Decimal('40.7128'),
+                longitude=Decimal('-74.0060'),
+                ratings=[4.0, 5.0],
+                source_file='test.csv',
+                import_batch=self.batch
+            )
+            poi.clean()
+            poi.save()
+            pois.append(poi)
+        
+        pois[0].add_ratings([3.0, 2.5])
+        
+        self.assertEqual(pois[0].ratings, [4.0, 5.0])
+        self.assertEqual(list(pois[0].rating_events.values_list('rating', flat=True)), [3.0, 2.5])
+        self.assertEqual(pois[0].rating_count, 4)
+        self.assertEqual(pois[0].rating_sum, 14.5)
+        self.assertEqual(pois[0].avg_rating, 3.625)
+        self.assertEqual(pois[0].rating_histogram, [0, 0, 0, 2, 1, 1])
+        
+        updated = PointOfInterest.objects.add_ratings([(pois[0].pk, 5.0), (pois[1].pk, 1.0), (pois[1].pk, 0.0)])
+        
+        self.assertEqual(updated, 2)
+        pois[1].refresh_from_db()
+        self.assertEqual(list(pois[1].rating_events.values_list('rating', flat=True)), [1.0, 0.0])
+        self.assertEqual(pois[1].avg_rating, 2.5)
+        self.assertEqual(pois[1].rating_histogram, [1, 1, 0, 0, 1, 1])
+        with self.assertRaises(ValueError):
+            PointOfInterest.objects.add_ratings([(pois[1].pk, 6.0)])
+        
+        # Events for unknown POIs are dropped
+        self.assertEqual(PointOfInterest.objects.add_ratings([(0, 4.0)]), 0)
+        self.assertEqual(RatingEvent.objects.count(), 5)
+    
+    def test_poi_save_keeps_added_ratings(self):
+        """Test saving a loaded POI neither drops concurrent ratings nor keeps stale aggregates"""
+        poi = PointOfInterest(
+            external_id='POI006',
+            name='Test Bakery',
+            category='bakery',
+            latitude=Decimal('40.7128'),
+            longitude=Decimal('-74.0060'),
+            ratings=[4.0, 5.0],
+            source_file='test.csv',
+            import_batch=self.batch
+        )
+        poi.clean()
+        poi.save()
+        
+        loaded = PointOfInterest.objects.get(pk=poi.pk)
+        poi.add_ratings([3.0])
+        loaded.name = 'Renamed Bakery'
+        loaded.save()
+        
+        poi.refresh_from_db()
+        self.assertEqual(poi.name, 'Renamed Bakery')
+        self.assertEqual(poi.rating_count, 3)
+        self.assertEqual(poi.rating_sum, 12.0)
+        
+        # Replacing the imported ratings keeps the rating events
+        loaded.ratings = []
+        loaded.save()
+        self.assertEqual(loaded.rating_count, 1)
+        self.assertEqual(loaded.avg_rating, 3.0)
+        self.assertEqual(loaded.rating_histogram, [0, 0, 0, 1, 0, 0])
+    
     def test_poi_location_from_coordinates(self):
         """Test location point is created from lat/lon"""
         poi = PointOfInterest(
@@ -1,8 +1,15 @@
+import gzip
 import os
+import shutil
+import tempfile
+from unittest import skipIf
 from django.test import TestCase
 
+from poi_manager.parsers.columnar import ColumnarBatch
 from poi_manager.parsers.csv_parser import CSVParser
 from poi_manager.parsers.json_parser import JSONParser
+from poi_manager.parsers.parquet_parser import ParquetParser, pa
+from poi_manager.parsers.vectorized import RawBatch, normalize_batch
 from poi_manager.parsers.xml_parser import XMLParser
 
 
@@ -39,6 +46,53 @@ class ParsersTestCase(TestCase):
         self.assertIsInstance(first['ratings'], list)
         self.assertTrue(len(first['ratings']) > 0)
     
+    def test_csv_parser_parallel_matches_serial(self):
+        """Test parallel CSV parsing yields the same records as serial parsing"""
+        csv_file = os.path.join(self.fixtures_dir, 'test_pois.csv')
+        serial = [r for batch in CSVParser(csv_file).parse() for r in batch]
+        
+        parser = CSVParser(csv_file, batch_size=2, workers=2)
+        parallel = [r for batch in parser.parse() for r in batch]
+        
+        self.assertEqual(parallel, serial)
+        self.assertEqual(parser.records_processed, 5)
+    
+    def test_columnar_batches_match_dict_batches(self):
+        """Test columnar output carries the same records as dict output"""
+        cases = [
+            (CSVParser, 'test_pois.csv'),
+            (JSONParser, 'test_pois.json'),
+            (XMLParser, 'test_pois.xml'),
+        ]
+        for parser_class, name in cases:
+            path = os.path.join(self.fixtures_dir, name)
+            rows = [r for batch in parser_class(path).parse() for r in batch]
+            batches = list(parser_class(path, columnar=True).parse())
+            
+            self.assertTrue(all(isinstance(batch, ColumnarBatch) for batch in batches))
+            self.assertEqual([r for batch in batches for r in batch], rows)
+    
+    def test_normalize_batch_matches_record_validation(self):
+        """Test batch normalization accepts and rejects rows like the per-record path"""
+        records = [
+            {'id': '1', 'name': ' A  b ', 'category': 'park', 'latitude': '10', 'longitude': '20', 'ratings': '{4,5}'},
+            {'id': '2', 'name': 'B', 'category': 'park', 'latitude': '95', 'longitude': '20'},
+            {'id': '3', 'name': 'C', 'category': 'park', 'latitude': 'x', 'longitude': '20'},
+            {'id': '4', 'name': 'D', 'latitude': '1', 'longitude': '2'},
+            {'id': '5', 'name': 'E', 'category': 'cafe', 'latitude': 1, 'longitude': 2, 'ratings': ['a']},
+            {'id': '6', 'name': 'F', 'category': 'cafe', 'latitude': 1, 'longitude': 2, 'ratings': 'bad'},
+        ]
+        raw = RawBatch()
+        for record in records:
+            raw.append(record)
+    
+        result = normalize_batch(raw)
+        parser = CSVParser(os.path.join(self.fixtures_dir, 'test_pois.csv'))
+    
+        self.assertEqual(result.rejected, [1, 2, 3])
+        self.assertEqual([index for index, _ in result.errors], [4])
+        self.assertEqual(result.batch, [parser.normalize_record(records[0]), parser.normalize_record(records[5])])
+    
     def test_json_parser_parse(self):
         """Test JSON parser can parse real data format"""
         json_file = os.path.join(self.fixtures_dir, 'test_pois.json')
@@ -65,6 +119,20 @@ class ParsersTestCase(TestCase):
         self.assertIsInstance(first['ratings'], list)
         self.assertEqual(len(first['ratings']), 10)
     
+    def test_json_lines_match_json_array(self):
+        """Test JSON Lines input is detected and parsed like a JSON array"""
+        array_file = os.path.join(self.fixtures_dir, 'test_pois.json')
+        lines_file = os.path.join(self.fixtures_dir, 'test_pois.jsonl')
+        expected = [r for batch in JSONParser(array_file).parse() for r in batch]
+        
+        parser = JSONParser(lines_file, batch_size=2)
+        self.assertEqual([r for batch in parser.parse() for r in batch], expected)
+        self.assertEqual(parser.detect_format(), 'lines')
+        
+        parser = JSONParser(lines_file, batch_size=2, workers=2)
+        self.assertEqual([r for batch in parser.parse() for r in batch], expected)
+        self.assertEqual(parser.records_processed, 5)
+    
     def test_xml_parser_parse(self):
         """Test XML parser can parse real data format"""
         xml_file = os.path.join(self.fixtures_dir, 'test_pois.xml')
@@ -88,4 +156,73 @@ class ParsersTestCase(TestCase):
         self.assertAlmostEqual(float(first['longitude']), -73.968285, places=5)
         # Check ratings were parsed from comma-separated format
         self.assertIsInstance(first['ratings'], list)
-        self.assertTrue(len(first['ratings']) > 0)
\ No newline at end of file
+        self.assertTrue(len(first['ratings']) > 0)
+    
+    def test_xml_parser_parallel_matches_serial(self):
+        """Test parallel XML parsing yields the same records as serial parsing"""
+        xml_file = os.path.join(self.fixtures_dir, 'test_pois.xml')
+        serial = [r for batch in XMLParser(xml_file).parse() for r in batch]
+        
+        parser = XMLParser(xml_file, batch_size=2, workers=2)
+        parallel = [r for batch in parser.parse() for r in batch]
+        
+        self.assertEqual(parallel, serial)
+        self.assertEqual(parser.records_processed, 5)
+    
+    def test_parsers_resume_after_start_record(self):
+        """Test parsers skip records before start_record and track positions"""
+        for parser_class, name in [(CSVParser, 'test_pois.csv'), (JSONParser, 'test_pois.json'), (XMLParser, 'test_pois.xml')]:
+            path = os.path.join(self.fixtures_dir, name)
+            expected = [r for batch in parser_class(path).parse() for r in batch]
+            
+            parser = parser_class(path, batch_size=2, workers=2, start_record=2)
+            batches = list(parser.parse())
+            
+            self.assertEqual([r for batch in batches for r in batch], expected[2:])
+            self.assertEqual(list(parser.positions), [4, 5])
+    
+    def test_parsers_read_compressed_files(self):
+        """Test gzip-compressed files parse like the uncompressed originals"""
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        
+        for parser_class, name in [(CSVParser, 'test_pois.csv'), (JSONParser, 'test_pois.json'), (XMLParser, 'test_pois.xml')]:
+            path = os.path.join(self.fixtures_dir, name)
+            compressed = os.path.join(tmp_dir, name + '.gz')
+            with open(path, 'rb') as src, gzip.open(compressed, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            
+            expected = [r for batch in parser_class(path).parse() for r in batch]
+            parser = parser_class(compressed)
+            
+            self.assertEqual([r for batch in parser.parse() for r in batch], expected)
+            self.assertEqual(parser.uncompressed_size, os.path.getsize(path))
+    
+    @skipIf(pa is None, 'pyarrow is not installed')
+    def test_parquet_parser_matches_json_parser(self):
+        """Test Parquet input yields the same columnar records as the JSON fixture"""
+        import pyarrow.parquet as pq
+        
+        json_file = os.path.join(self.fixtures_dir, 'test_pois.json')
+        expected = [r for batch in JSONParser(json_file).parse() for r in batch]
+        
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        parquet_file = os.path.join(tmp_dir, 'test_pois.parquet')
+        table = pa.table({
+            'id': [r['external_id'] for r in expected],
+            'name': [r['name'] for r in expected],
+            'category': [r['category'] for r in expected],
+            'latitude': [r['latitude'] for r in expected],
+            'longitude': [r['longitude'] for r in expected],
+            'ratings': [r['ratings'] for r in expected],
+            'description': [r['description'] for r in expected],
+        })
+        pq.write_table(table, parquet_file)
+        
+        parser = ParquetParser(parquet_file, batch_size=2)
+        batches = list(parser.parse())
+        
+        self.assertTrue(all(isinstance(batch, ColumnarBatch) for batch in batches))
+        self.assertEqual([r for batch in batches for r in batch], expected)
+        self.assertEqual(parser.records_processed, 5)
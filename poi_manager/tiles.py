@@ -0,0 +1,224 @@
+import hashlib
+import logging
+import math
+import uuid
+from typing import Dict, Optional, Sequence, Set, Tuple
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.dispatch import receiver
+from redis.exceptions import RedisError
+
+from poi_manager.models import PointOfInterest
+from poi_manager.models.poi import LOCATION_GEOMETRY_SQL, category_sql
+from poi_manager.signals import import_completed, pois_changed
+
+__all__ = (
+    "MAX_ZOOM",
+    "get_tile",
+    "tile_versions",
+    "render_tile",
+    "invalidate_tiles",
+    "tile_range",
+    "tile_bounds",
+    "tile_at",
+)
+
+logger = logging.getLogger("poi_manager.tiles")
+
+MAX_ZOOM = 22
+
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+
+# Low zoom tiles cover many POIs; cap the features encoded per tile
+TILE_FEATURE_LIMIT = 50000
+
+# Invalidation is explicit, the timeout only bounds staleness from changes
+# made in raw SQL, such as recalculate_ratings
+TILE_CACHE_TIMEOUT = 60 * 60
+
+# Above this many tiles per zoom level, invalidate the whole zoom level
+MAX_INVALIDATED_TILES = 256
+
+TILE_KEY = "poi_manager:tile:{z}:{x}:{y}:{version}:{layer}"
+ZOOM_VERSION_KEY = "poi_manager:tile_version:{z}"
+TILE_VERSION_KEY = "poi_manager:tile_version:{z}:{x}:{y}"
+
+# Web Mercator stops short of the poles
+MAX_LATITUDE = 85.0511287798
+
+Bounds = Tuple[float, float, float, float]
+
+
+def render_tile(z: int, x: int, y: int, categories: Sequence[str] = ()) -> bytes:
+    """
+    Encode the POIs in tile ``z/x/y`` as a Mapbox Vector Tile with a single
+    ``pois`` layer. Returns an empty bytestring for tiles without POIs.
+    """
+    table = connection.ops.quote_name(PointOfInterest._meta.db_table)
+    params = {
+        "z": z,
+        "x": x,
+        "y": y,
+        "extent": TILE_EXTENT,
+        "buffer": TILE_BUFFER,
+        "limit": TILE_FEATURE_LIMIT,
+    }
+
+    category_condition = ""
+    if categories:
+        condition, category_params = category_sql(categories)
+        category_condition = f"AND {condition}"
+        params.update(category_params)
+
+    # Tiles never cross the antimeridian, so the envelope can be matched in
+    # plain lon/lat against the geometry index
+    sql = f"""
+        WITH bounds AS (
+            SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS tile,
+                   ST_Transform(ST_TileEnvelope(%(z)s, %(x)s, %(y)s), 4326) AS area
+        )
+        SELECT ST_AsMVT(features, 'pois', %(extent)s, 'geom', 'id')
+        FROM (
+            SELECT id, external_id, name, category, avg_rating, rating_count,
+                   ST_AsMVTGeom(
+                       ST_Transform({LOCATION_GEOMETRY_SQL}, 3857),
+                       bounds.tile, %(extent)s, %(buffer)s, true
+                   ) AS geom
+            FROM {table}, bounds
+            WHERE {LOCATION_GEOMETRY_SQL} && bounds.area {category_condition}
+            LIMIT %(limit)s
+        ) AS features
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        tile = cursor.fetchone()[0]
+
+    return bytes(tile) if tile else b""
+
+
+def get_tile(z: int, x: int, y: int, categories: Sequence[str] = ()) -> bytes:
+    """Return tile ``z/x/y`` from the cache, rendering and caching it on a miss."""
+    # Categories match case-insensitively, so differently cased requests share tiles
+    categories = sorted({category.upper() for category in categories})
+    layer = hashlib.md5(",".join(categories).encode()).hexdigest()[:16] if categories else "all"
+
+    version = tile_versions(z, [(x, y)])[x, y]
+    key = TILE_KEY.format(z=z, x=x, y=y, version=version, layer=layer)
+    tile = cache.get(key)
+    if tile is None:
+        tile = render_tile(z, x, y, categories)
+        cache.set(key, tile, TILE_CACHE_TIMEOUT)
+    return tile
+
+
+def tile_versions(z: int, tiles: Sequence[Tuple[int, int]]) -> Dict[Tuple[int, int], str]:
+    """
+    Current version of each ``(x, y)`` tile at zoom ``z``, combining a token
+    for the tile and one for its zoom level. Data cached per tile embeds the
+    version in its key, so invalidation only replaces tokens; stale entries
+    are never read again and expire on their own.
+    """
+    zoom_key = ZOOM_VERSION_KEY.format(z=z)
+    tile_keys = {tile: TILE_VERSION_KEY.format(z=z, x=tile[0], y=tile[1]) for tile in tiles}
+
+    tokens = cache.get_many([zoom_key, *tile_keys.values()])
+    for key in (zoom_key, *tile_keys.values()):
+        if key not in tokens:
+            tokens[key] = cache.get_or_set(key, new_version, timeout=None)
+
+    return {tile: f"{tokens[zoom_key]}.{tokens[key]}" for tile, key in tile_keys.items()}
+
+
+def invalidate_tiles(areas: Optional[Sequence[Bounds]] = None):
+    """
+    Invalidate the cached tiles intersecting any of ``areas`` (min lon, min
+    lat, max lon, max lat) at every zoom level, or all cached tiles without
+    areas. Zoom levels where the areas span too many tiles are invalidated
+    whole.
+    """
+    versions: Dict[str, str] = {}
+    zoom_levels = 0
+
+    for z in range(MAX_ZOOM + 1):
+        if areas is not None:
+            tiles: Set[Tuple[int, int]] = set()
+            for bounds in areas:
+                min_x, min_y, max_x, max_y = tile_range(bounds, z)
+                if len(tiles) + (max_x - min_x + 1) * (max_y - min_y + 1) > MAX_INVALIDATED_TILES:
+                    break
+                tiles.update((x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1))
+            else:
+                versions.update((TILE_VERSION_KEY.format(z=z, x=x, y=y), new_version()) for x, y in tiles)
+                continue
+
+        versions[ZOOM_VERSION_KEY.format(z=z)] = new_version()
+        zoom_levels += 1
+
+    cache.set_many(versions, timeout=None)
+    logger.info(
+        f"Invalidated {len(versions) - zoom_levels} tiles and {zoom_levels} zoom levels"
+    )
+
+
+def tile_range(bounds: Bounds, z: int) -> Tuple[int, int, int, int]:
+    """Min x, min y, max x and max y of the tiles at zoom ``z`` covering ``bounds``."""
+    min_lon, min_lat, max_lon, max_lat = bounds
+    # Points on a tile edge are inside both tiles
+    epsilon = 1e-9
+    min_x, max_y = tile_at(min_lon - epsilon, min_lat - epsilon, z)
+    max_x, min_y = tile_at(max_lon + epsilon, max_lat + epsilon, z)
+    return min_x, min_y, max_x, max_y
+
+
+def tile_at(lon: float, lat: float, z: int) -> Tuple[int, int]:
+    n = 2 ** z
+    lat = math.radians(min(max(lat, -MAX_LATITUDE), MAX_LATITUDE))
+    x = math.floor((lon + 180) / 360 * n)
+    y = math.floor((1 - math.asinh(math.tan(lat)) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bounds(z: int, x: int, y: int) -> Bounds:
+    """Min lon, min lat, max lon and max lat of tile ``z/x/y``."""
+    n = 2 ** z
+
+    def latitude(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return x / n * 360 - 180, latitude(y + 1), (x + 1) / n * 360 - 180, latitude(y)
+
+
+def new_version() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+@receiver(import_completed)
+def invalidate_imported_tiles(sender, import_batch=None, **kwargs):
+    try:
+        if import_batch is None:
+            invalidate_tiles()
+            return
+
+        if import_batch.extent is not None:
+            invalidate_tiles([import_batch.extent])
+    except RedisError as e:
+        logger.warning(f"Could not invalidate cached tiles: {e}")
+
+
+@receiver(pois_changed)
+def invalidate_changed_tiles(sender, removed=(), added=(), **kwargs):
+    # Both where the POIs were and where they are now, once the change is
+    # committed so no tile is rendered from the old rows after invalidation
+    areas = [(state.longitude, state.latitude, state.longitude, state.latitude) for state in {*removed, *added}]
+
+    def invalidate():
+        try:
+            invalidate_tiles(areas)
+        except RedisError as e:
+            logger.warning(f"Could not invalidate cached tiles: {e}")
+
+    if areas:
+        transaction.on_commit(invalidate)
@@ -5,6 +5,8 @@ from typing import Optional, Tuple
 
 from django.core.serializers.json import DjangoJSONEncoder
 
+from poi_manager.parsers.compression import COMPRESSION_SUFFIXES
+
 
 class CustomFieldJSONEncoder(DjangoJSONEncoder):
     """
@@ -18,17 +20,24 @@ class CustomFieldJSONEncoder(DjangoJSONEncoder):
 
 def get_file_type(file_path: str) -> Optional[str]:
     """
-    Determine file type from extension.
+    Determine file type from extension, ignoring a trailing compression
+    extension (e.g. ``data.csv.gz``).
 
     Returns:
-        'csv', 'json', 'xml', or None
+        'csv', 'json', 'xml', 'parquet', or None
     """
-    ext = Path(file_path).suffix.lower()
+    path = Path(file_path)
+    if path.suffix.lower() in COMPRESSION_SUFFIXES:
+        path = path.with_suffix("")
+    ext = path.suffix.lower()
 
     mapping = {
         ".csv": "csv",
         ".json": "json",
+        ".jsonl": "json",
+        ".ndjson": "json",
         ".xml": "xml",
+        ".parquet": "parquet",
     }
 
     return mapping.get(ext)
@@ -48,3 +57,25 @@ def format_duration(seconds: float) -> str:
         return f"{hours:.1f} hours"
 
 
+def parse_bbox(value: Optional[str]) -> Tuple[float, float, float, float]:
+    """
+    Parse a ``minLon,minLat,maxLon,maxLat`` bounding box. ``minLon`` is
+    greater than ``maxLon`` for boxes crossing the antimeridian.
+
+    Raises:
+        ValueError: if the value is missing or not a valid bounding box
+    """
+    if not value:
+        raise ValueError("Missing bbox")
+
+    parts = [float(part) for part in value.split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox must have four values: minLon,minLat,maxLon,maxLat")
+
+    min_lon, min_lat, max_lon, max_lat = parts
+    if not all(-180 <= lon <= 180 for lon in (min_lon, max_lon)):
+        raise ValueError("bbox longitudes must be between -180 and 180")
+    if not -90 <= min_lat <= max_lat <= 90:
+        raise ValueError("bbox latitudes must be between -90 and 90, minLat first")
+
+    return min_lon, min_lat, max_lon, max_lat